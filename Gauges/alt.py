@@ -32,9 +32,6 @@ class EnhancedAltitudeIndicator(QWidget):
             border-radius: 10px;
         """)
         
-        # Set up timer for random updates
-        self.timer = QTimer(self)
-        self.timer.start(1000)  # Update every 1 second
         
         
     def paintEvent(self, event):
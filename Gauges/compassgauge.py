@@ -6,6 +6,7 @@ from PyQt6.QtCore import Qt, QPointF, QRectF
 from PyQt6.QtGui import QPainter, QColor, QFont, QPen, QBrush, QRadialGradient, QPainterPath, QLinearGradient
 import sys
 import math
+from frameclock import request_paint
 
 class FuturisticCompass(QWidget):
     def __init__(self, parent=None):
@@ -57,7 +58,7 @@ class CompassDisplay(QWidget):
     
     def set_direction(self, direction):
         self.direction = direction
-        self.update()
+        request_paint(self)
     
     def paintEvent(self, event):
         painter = QPainter(self)
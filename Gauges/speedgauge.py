@@ -32,9 +32,6 @@ class EnhancedSpeedIndicator(QWidget):
             border-radius: 10px;
         """)
         
-        # Set up timer for random updates
-        self.timer = QTimer(self)
-        self.timer.start(1500)  # Update every 1.5 seconds
             
     def paintEvent(self, event):
         painter = QPainter(self)
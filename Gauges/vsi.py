@@ -32,9 +32,6 @@ class EnhancedVSI(QWidget):
             border-radius: 10px;
         """)
         
-        # Set up timer for random updates
-        self.timer = QTimer(self)
-        self.timer.start(100)  # Update every 1.5 seconds
 
         
     def paintEvent(self, event):
@@ -0,0 +1,380 @@
+import asyncio
+import threading
+import time
+from pymavlink import mavutil
+from transport import LinkReader
+from mission import MissionDownload, REQUEST_LIST, REQUEST_ITEM, SEND_ACK
+
+MAV_RESULT_ACCEPTED = 0
+MAV_RESULT_IN_PROGRESS = 5
+MAV_CMD_REQUEST_MESSAGE = 512
+
+
+class LoopThread(threading.Thread):
+    """A daemon thread running one asyncio event loop for every link and protocol"""
+
+    def __init__(self):
+        super().__init__(name="mavlink-asyncio", daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self.started = threading.Event()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self.started.set)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule a coroutine from any thread; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, callback, *args):
+        """Run a plain callback on the loop from any thread"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(2)
+
+
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def loop_thread():
+    """The process-wide loop thread, started on first use"""
+    global _loop_thread
+    with _loop_lock:
+        if _loop_thread is None:
+            _loop_thread = LoopThread()
+            _loop_thread.start()
+            _loop_thread.started.wait()
+        return _loop_thread
+
+
+class AsyncLink:
+    """asyncio front end for one MAVLink connection.
+
+    Messages come either from a MessageBus that another thread already
+    publishes into (attach_bus), or straight off the connection's file
+    descriptor when this link owns the reading (open). Coroutines wait for
+    messages with recv_match() or iterate them with messages(); request()
+    and the helpers built on it send, wait for the matching reply and
+    retry on timeout. All coroutines run on the shared loop thread.
+    When several vehicles share the connection, for_vehicle() gives a link
+    that addresses and listens to just one of them.
+    """
+
+    def __init__(self, mavlink_connection, loop=None, target=None):
+        self.connection = mavlink_connection
+        self.loop_thread = loop_thread() if loop is None else None
+        self.loop = loop if loop is not None else self.loop_thread.loop
+        self.bus = None
+        self.reader = None
+        # msg_type -> list of [condition, future or asyncio.Queue]
+        self.waiters = {}
+        self.bus_types = set()
+        # (sysid, compid) requests go to; replies from other systems are
+        # ignored. None follows the connection's target_system/component.
+        self.target = target
+
+    def for_vehicle(self, sysid, compid=1):
+        """A link on the same connection and bus that only talks to one vehicle"""
+        link = AsyncLink(self.connection, self.loop, (sysid, compid))
+        if self.bus is not None:
+            link.attach_bus(self.bus)
+        return link
+
+    def targets(self):
+        """(target_system, target_component) for outgoing requests"""
+        if self.target is not None:
+            return self.target
+        return self.connection.target_system, self.connection.target_component
+
+    def hears(self, msg):
+        return self.target is None or msg.get_srcSystem() == self.target[0]
+
+    def submit(self, coro):
+        """Run a coroutine on this link's loop from another thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def attach_bus(self, bus):
+        """Take messages from a MessageBus; types are subscribed only while awaited"""
+        self.bus = bus
+
+    def open(self):
+        """Read the connection on the event loop itself instead of through a bus"""
+        self.reader = LinkReader(self.connection)
+        fd = self.connection.fd
+        if fd is not None:
+            self.loop.call_soon_threadsafe(self.loop.add_reader, fd, self.on_readable)
+        else:
+            self.loop.call_soon_threadsafe(self.poll)
+
+    def close(self):
+        if self.reader is not None and self.connection.fd is not None:
+            self.loop.call_soon_threadsafe(self.loop.remove_reader, self.connection.fd)
+        self.reader = None
+        if self.bus is not None:
+            self.bus.unsubscribe(self.on_bus_message)
+            self.bus_types = set()
+
+    def on_readable(self):
+        self.read_frames(0)
+
+    def poll(self):
+        if self.reader is None:
+            return
+        self.read_frames(0)
+        self.loop.call_later(0.01, self.poll)
+
+    def read_frames(self, timeout):
+        conn = self.connection
+        try:
+            frames = self.reader.read_batch(timeout)
+        except Exception as e:
+            print(f"Error reading MAVLink link: {e}")
+            return
+        for msgid, frame in frames:
+            try:
+                msg = conn.mav.decode(bytearray(frame))
+            except Exception as e:
+                print(f"Error decoding message {msgid}: {e}")
+                continue
+            conn.post_message(msg)
+            if self.hears(msg):
+                self.dispatch(msg)
+
+    def on_bus_message(self, msg):
+        """Bus callback, called on the publishing thread"""
+        if self.hears(msg):
+            self.loop.call_soon_threadsafe(self.dispatch, msg)
+
+    def dispatch(self, msg):
+        msg_type = msg.get_type()
+        for waiter in list(self.waiters.get(msg_type, ())):
+            condition, target = waiter
+            if condition is not None and not condition(msg):
+                continue
+            if isinstance(target, asyncio.Queue):
+                target.put_nowait(msg)
+            elif not target.done():
+                target.set_result(msg)
+
+    def add_waiter(self, msg_types, waiter):
+        for msg_type in msg_types:
+            self.waiters.setdefault(msg_type, []).append(waiter)
+        self.update_bus_types()
+
+    def remove_waiter(self, msg_types, waiter):
+        for msg_type in msg_types:
+            waiters = self.waiters.get(msg_type)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self.waiters[msg_type]
+        self.update_bus_types()
+
+    def update_bus_types(self):
+        if self.bus is None:
+            return
+        wanted = set(self.waiters)
+        if wanted == self.bus_types:
+            return
+        stale = self.bus_types - wanted
+        if stale:
+            self.bus.unsubscribe(self.on_bus_message, stale)
+        if wanted - self.bus_types:
+            self.bus.subscribe(wanted - self.bus_types, self.on_bus_message)
+        self.bus_types = wanted
+
+    async def recv_match(self, msg_types, condition=None, timeout=None):
+        """Wait for the next message of one of msg_types that satisfies condition"""
+        if isinstance(msg_types, str):
+            msg_types = [msg_types]
+        waiter = [condition, self.loop.create_future()]
+        self.add_waiter(msg_types, waiter)
+        try:
+            return await asyncio.wait_for(waiter[1], timeout)
+        finally:
+            self.remove_waiter(msg_types, waiter)
+
+    async def messages(self, msg_types, condition=None):
+        """Async iterator over every message of msg_types from now on"""
+        if isinstance(msg_types, str):
+            msg_types = [msg_types]
+        waiter = [condition, asyncio.Queue()]
+        self.add_waiter(msg_types, waiter)
+        try:
+            while True:
+                yield await waiter[1].get()
+        finally:
+            self.remove_waiter(msg_types, waiter)
+
+    async def request(self, send, msg_types, condition=None, timeout=1.0, retries=3):
+        """Call send() and wait for the reply, resending up to retries times.
+
+        The waiter is registered before sending so a fast reply cannot be
+        missed. Raises TimeoutError when no attempt gets an answer.
+        """
+        if isinstance(msg_types, str):
+            msg_types = [msg_types]
+        for attempt in range(retries + 1):
+            waiter = [condition, self.loop.create_future()]
+            self.add_waiter(msg_types, waiter)
+            try:
+                send()
+                return await asyncio.wait_for(waiter[1], timeout)
+            except asyncio.TimeoutError:
+                continue
+            finally:
+                self.remove_waiter(msg_types, waiter)
+        raise TimeoutError(f"No {'/'.join(msg_types)} reply after {retries + 1} attempts")
+
+    async def command_long(self, command, *params, timeout=1.0, retries=3):
+        """Send COMMAND_LONG and return its COMMAND_ACK result, bumping confirmation on each retry"""
+        conn = self.connection
+        params = (list(params) + [0] * 7)[:7]
+        attempt = [0]
+
+        def send():
+            conn.mav.command_long_send(*self.targets(), command, attempt[0], *params)
+            attempt[0] = min(attempt[0] + 1, 255)
+
+        ack = await self.request(send, 'COMMAND_ACK', lambda m: m.command == command, timeout, retries)
+        while ack.result == MAV_RESULT_IN_PROGRESS:
+            ack = await self.recv_match('COMMAND_ACK', lambda m: m.command == command, timeout * 10)
+        return ack.result
+
+    async def request_message(self, msg_id, timeout=1.0, retries=3):
+        """Ask the vehicle to send one instance of a message with MAV_CMD_REQUEST_MESSAGE"""
+        return await self.command_long(MAV_CMD_REQUEST_MESSAGE, msg_id, timeout=timeout, retries=retries)
+
+    async def param_read(self, name, timeout=1.0, retries=3):
+        """Read a parameter by name and return its value"""
+        conn = self.connection
+        encoded = name.encode('utf-8')
+
+        def send():
+            conn.mav.param_request_read_send(*self.targets(), encoded, -1)
+
+        msg = await self.request(send, 'PARAM_VALUE', lambda m: param_id(m) == name, timeout, retries)
+        return msg.param_value
+
+    async def param_set(self, name, value, param_type=mavutil.mavlink.MAV_PARAM_TYPE_REAL32, timeout=1.0, retries=3):
+        """Set a parameter and return the value the vehicle echoes back"""
+        conn = self.connection
+        encoded = name.encode('utf-8')
+
+        def send():
+            conn.mav.param_set_send(*self.targets(), encoded, value, param_type)
+
+        msg = await self.request(send, 'PARAM_VALUE', lambda m: param_id(m) == name, timeout, retries)
+        return msg.param_value
+
+    async def mission_count(self, timeout=1.0, retries=3):
+        """Number of mission items on the vehicle"""
+        conn = self.connection
+
+        def send():
+            conn.mav.mission_request_list_send(*self.targets())
+
+        msg = await self.request(send, 'MISSION_COUNT', None, timeout, retries)
+        return msg.count
+
+    async def mission_item(self, seq, timeout=1.0, retries=3):
+        """Fetch one mission item as a MISSION_ITEM_INT (or MISSION_ITEM from older autopilots)"""
+        conn = self.connection
+
+        def send():
+            conn.mav.mission_request_int_send(*self.targets(), seq)
+
+        return await self.request(send, ['MISSION_ITEM_INT', 'MISSION_ITEM'], lambda m: m.seq == seq, timeout, retries)
+
+    async def mission_download(self, window=8, item_timeout=0.5, retries=5, progress=None, cache=None):
+        """Download the whole mission and return its items in order.
+
+        Drives a mission.MissionDownload state machine; progress, if given,
+        is called with (received, count) after every new item. With a
+        MissionCache, a mission the vehicle confirms is unchanged is taken
+        from disk instead of being transferred, and new ones are stored.
+        """
+        conn = self.connection
+        download = MissionDownload(window, item_timeout, retries=retries)
+        msg_types = ['MISSION_COUNT', 'MISSION_ITEM_INT', 'MISSION_ITEM']
+        waiter = [None, asyncio.Queue()]
+        self.add_waiter(msg_types, waiter)
+        count_msg = None
+        from_cache = False
+        try:
+            actions = download.start(time.monotonic())
+            while True:
+                for action in actions:
+                    if action[0] == REQUEST_LIST:
+                        conn.mav.mission_request_list_send(*self.targets())
+                    elif action[0] == REQUEST_ITEM:
+                        conn.mav.mission_request_int_send(*self.targets(), action[1])
+                    elif action[0] == SEND_ACK:
+                        conn.mav.mission_ack_send(*self.targets(), action[1])
+                if download.done:
+                    items = download.result()
+                    if (cache is not None and count_msg is not None and not from_cache and items
+                            and mission_opaque_id(count_msg)):
+                        cache.store(count_msg.get_srcSystem(), mission_opaque_id(count_msg), items)
+                    return items
+                deadline = download.next_deadline()
+                if deadline is None:
+                    deadline = time.monotonic() + item_timeout
+                try:
+                    msg = await asyncio.wait_for(waiter[1].get(), max(0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    actions = download.poll(time.monotonic())
+                    continue
+                now = time.monotonic()
+                if msg.get_type() == 'MISSION_COUNT':
+                    if count_msg is not None:
+                        actions = []
+                        continue
+                    count_msg = msg
+                    cached = None
+                    if cache is not None and msg.count > 0:
+                        cached = self.cached_mission(cache, msg)
+                    if cached is not None:
+                        from_cache = True
+                        actions = download.complete(cached)
+                        if progress is not None:
+                            progress(download.received, download.count)
+                    else:
+                        actions = download.on_count(msg.count, time.monotonic())
+                else:
+                    received = download.received
+                    actions = download.on_item(msg.seq, msg, now)
+                    if progress is not None and download.received != received:
+                        progress(download.received, download.count)
+                actions += download.poll(now)
+        finally:
+            self.remove_waiter(msg_types, waiter)
+
+    def cached_mission(self, cache, count_msg):
+        """Cached items for the mission count_msg announces, if the vehicle still has that mission"""
+        opaque_id = mission_opaque_id(count_msg)
+        if not opaque_id:
+            # Only the vehicle's opaque_id says the mission is unchanged; without one an
+            # edit that keeps the count is invisible short of downloading every item
+            return None
+        try:
+            return cache.load(self.connection.mav, count_msg.get_srcSystem(), opaque_id, count_msg.count)
+        except Exception as e:
+            print(f"Error reading mission cache: {e}")
+            return None
+
+
+def mission_opaque_id(count_msg):
+    """MISSION_COUNT.opaque_id, 0 when the autopilot (or a MAVLink 1 link) leaves it out"""
+    return getattr(count_msg, 'opaque_id', 0) or 0
+
+
+def param_id(msg):
+    name = msg.param_id
+    if isinstance(name, bytes):
+        name = name.decode('utf-8', 'ignore')
+    return name.rstrip('\0')
@@ -0,0 +1,382 @@
+"""Offscreen render benchmark for the HUDs and gauges.
+
+    python benchmark.py [--frames=N] [--dpr=1,2] [--only=hud,compass]
+                        [--json=results.json] [--baseline=old.json] [--threshold=0.15]
+
+Each widget is rendered into a QImage at every size and device pixel
+ratio while its values follow a scripted sweep (roll, pitch, heading,
+speeds, altitude, climb), one sweep step per frame. Per-frame render
+times are reported as percentiles, and one extra pass through a
+counting paint engine reports the draw calls a frame makes. --json
+writes the results, and --baseline compares against an earlier run:
+a p50 or p95 that is more than --threshold slower, or more draw calls,
+is a regression and makes the exit status 1.
+
+Every pixel ratio runs in its own process under the offscreen platform
+with QT_SCALE_FACTOR set, so widgets see the ratio as they would on a
+real screen.
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPaintDevice, QPaintEngine
+from PyQt6.QtWidgets import QApplication, QWidget
+import vehiclestate as vs
+from vehiclestate import VehicleState
+from interpolation import DELAY
+
+FRAMES = 300
+# Frames rendered before timing starts, so caches are warm
+WARMUP = 10
+DPRS = (1.0, 2.0)
+THRESHOLD = 0.15
+HUD_SIZES = ((400, 400), (600, 400))
+GAUGE_SIZES = ((145, 160), (250, 250))
+
+
+def sweep(i, frames):
+    """Scripted flight values for frame i of frames"""
+    phase = i / frames
+    wave = math.sin(2 * math.pi * phase)
+    airspeed = 25 + 20 * math.sin(4 * math.pi * phase)
+    return {
+        'roll': 45 * math.sin(4 * math.pi * phase),
+        'pitch': 20 * wave,
+        'heading': 720 * phase % 360,
+        'airspeed': airspeed,
+        'groundspeed': airspeed * 0.95,
+        'alt': 120 * wave,
+        'relative_alt': 120 * abs(wave),
+        'climb': 8 * math.cos(2 * math.pi * phase),
+        'battery': 100 - 90 * phase,
+    }
+
+
+def feed_hud(widget, values):
+    # Through update_hud, so interpolation and every other per-frame step is included
+    state = VehicleState()
+    for name, value in values.items():
+        setattr(state, name, value)
+    mask = (vs.ATTITUDE | vs.HEADING | vs.AIRSPEED | vs.GROUNDSPEED | vs.ALT
+            | vs.RELATIVE_ALT | vs.CLIMB | vs.BATTERY)
+    # Stamped so the interpolator is due to show exactly these values now
+    state.mark(mask, time.monotonic() - DELAY)
+    widget.update_hud(state.frame())
+
+
+def feed_newhud(widget, values):
+    widget.roll = values['roll']
+    widget.pitch = values['pitch'] * 0.45
+    widget.heading = values['heading']
+    widget.airspeed = values['airspeed']
+    widget.groundspeed = values['groundspeed']
+    widget.altitude = values['alt']
+    widget.battery_percent = values['battery']
+
+
+def make_newhud():
+    widget = make('newhud', 'EnhancedHUDWidget')()
+    # Its demo timer would change the values under us
+    widget.timer.stop()
+    return widget
+
+
+def make(module, name):
+    def factory():
+        return getattr(__import__(module, fromlist=[name]), name)()
+    return factory
+
+
+def setter(attribute, field):
+    def feed(widget, values):
+        setattr(widget, attribute, values[field])
+    return feed
+
+
+# name -> (factory, sizes, feed(widget, values))
+WIDGETS = {
+    'hud': (make('hud', 'EnhancedHUDWidget'), HUD_SIZES, feed_hud),
+    'newhud': (make_newhud, HUD_SIZES, feed_newhud),
+    'altitude': (make('Gauges.alt', 'EnhancedAltitudeIndicator'), GAUGE_SIZES, setter('altitude', 'alt')),
+    'compass': (make('Gauges.compassgauge', 'FuturisticCompass'), GAUGE_SIZES,
+                lambda widget, values: widget.set_direction(values['heading'])),
+    'speed': (make('Gauges.speedgauge', 'EnhancedSpeedIndicator'), GAUGE_SIZES, setter('speed', 'groundspeed')),
+    'vsi': (make('Gauges.vsi', 'EnhancedVSI'), GAUGE_SIZES, setter('vertical_speed', 'climb')),
+}
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CountingEngine(QPaintEngine):
+    """Paint engine that draws nothing and counts each call by kind"""
+
+    def __init__(self):
+        super().__init__(QPaintEngine.PaintEngineFeature.AllFeatures)
+        self.calls = {}
+
+    def count(self, kind):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+
+    def begin(self, device):
+        return True
+
+    def end(self):
+        return True
+
+    def type(self):
+        return QPaintEngine.Type.User
+
+    def updateState(self, state):
+        self.count('state')
+
+    def drawPath(self, *args):
+        self.count('path')
+
+    def drawPolygon(self, *args):
+        self.count('polygon')
+
+    def drawLines(self, *args):
+        self.count('lines')
+
+    def drawRects(self, *args):
+        self.count('rects')
+
+    def drawEllipse(self, *args):
+        self.count('ellipse')
+
+    def drawPoints(self, *args):
+        self.count('points')
+
+    def drawTextItem(self, *args):
+        self.count('text')
+
+    def drawPixmap(self, *args):
+        self.count('pixmap')
+
+    def drawTiledPixmap(self, *args):
+        self.count('pixmap')
+
+    def drawImage(self, *args):
+        self.count('image')
+
+
+class CountingDevice(QPaintDevice):
+    """A width x height surface at the given pixel ratio, painted through a CountingEngine"""
+
+    def __init__(self, width, height, ratio):
+        super().__init__()
+        self.engine = CountingEngine()
+        Metric = QPaintDevice.PaintDeviceMetric
+        self.metrics = {
+            Metric.PdmWidth: width,
+            Metric.PdmHeight: height,
+            Metric.PdmWidthMM: round(width * 25.4 / 96),
+            Metric.PdmHeightMM: round(height * 25.4 / 96),
+            Metric.PdmNumColors: 0x7fffffff,
+            Metric.PdmDepth: 32,
+            Metric.PdmDpiX: 96,
+            Metric.PdmDpiY: 96,
+            Metric.PdmPhysicalDpiX: 96,
+            Metric.PdmPhysicalDpiY: 96,
+            Metric.PdmDevicePixelRatio: round(ratio),
+            Metric.PdmDevicePixelRatioScaled: round(ratio * QPaintDevice.devicePixelRatioFScale()),
+        }
+
+    def paintEngine(self):
+        return self.engine
+
+    def metric(self, metric):
+        return self.metrics.get(metric, 0)
+
+
+def effects_enabled(widget, enabled):
+    """Switch the drop shadows in widget and its children on or off"""
+    for each in [widget] + widget.findChildren(QWidget):
+        effect = each.graphicsEffect()
+        if effect is not None:
+            effect.setEnabled(enabled)
+
+
+def bench_widget(name, width, height, frames):
+    factory, _, feed = WIDGETS[name]
+    widget = factory()
+    widget.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen, True)
+    widget.resize(width, height)
+    widget.show()
+    QApplication.processEvents()
+    ratio = widget.devicePixelRatioF()
+    size = widget.size()
+    image = QImage(math.ceil(size.width() * ratio), math.ceil(size.height() * ratio), QImage.Format.Format_ARGB32_Premultiplied)
+    image.setDevicePixelRatio(ratio)
+
+    for i in range(WARMUP):
+        feed(widget, sweep(i, frames))
+        widget.render(image)
+    times = []
+    for i in range(frames):
+        feed(widget, sweep(i, frames))
+        start = time.perf_counter()
+        widget.render(image)
+        times.append((time.perf_counter() - start) * 1000.0)
+
+    # Draw calls of a mid-sweep frame; shadows are off so the engine sees the widget's own calls
+    feed(widget, sweep(frames // 2, frames))
+    device = CountingDevice(size.width(), size.height(), ratio)
+    effects_enabled(widget, False)
+    widget.render(device)
+    effects_enabled(widget, True)
+    calls = dict(sorted(device.engine.calls.items()))
+    widget.close()
+
+    ordered = sorted(times)
+    return {
+        'widget': name,
+        'size': [size.width(), size.height()],
+        'dpr': ratio,
+        'frames': frames,
+        'mean_ms': sum(times) / len(times),
+        'p50_ms': percentile(ordered, 0.50),
+        'p95_ms': percentile(ordered, 0.95),
+        'p99_ms': percentile(ordered, 0.99),
+        'max_ms': ordered[-1],
+        'draw_calls': sum(n for kind, n in calls.items() if kind != 'state'),
+        'calls': calls,
+    }
+
+
+def run_worker(names, frames):
+    """Benchmark names at this process's pixel ratio; results as JSON on stdout"""
+    app = QApplication(sys.argv[:1])
+    results = {}
+    for name in names:
+        for width, height in WIDGETS[name][1]:
+            result = bench_widget(name, width, height, frames)
+            results[result_key(result)] = result
+    # Last line of output, after anything the widgets printed
+    print(json.dumps(results))
+    app.quit()
+
+
+def result_key(result):
+    width, height = result['size']
+    return f"{result['widget']}@{width}x{height}@{result['dpr']:g}x"
+
+
+def run_all(names, frames, dprs):
+    """(results, failures): one worker per pixel ratio, and a line for each that failed"""
+    results = {}
+    failures = []
+    here = os.path.dirname(os.path.abspath(__file__))
+    for dpr in dprs:
+        env = dict(os.environ, QT_QPA_PLATFORM='offscreen', QT_SCALE_FACTOR=f"{dpr:g}")
+        command = [sys.executable, os.path.abspath(__file__), '--worker',
+                   f"--frames={frames}", f"--only={','.join(names)}"]
+        done = subprocess.run(command, cwd=here, env=env, stdout=subprocess.PIPE, text=True)
+        if done.returncode != 0:
+            failures.append(f"benchmark at {dpr:g}x exited with status {done.returncode}")
+            continue
+        try:
+            results.update(json.loads(done.stdout.strip().splitlines()[-1]))
+        except (IndexError, ValueError):
+            failures.append(f"benchmark at {dpr:g}x printed no results")
+    return results, failures
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold, names, dprs):
+    """Lines describing each regression against baseline results.
+
+    A baseline result for one of names at one of dprs that wasn't
+    measured this time counts as a regression too.
+    """
+    regressions = []
+    for key, old in baseline.items():
+        if key not in results and old['widget'] in names and old['dpr'] in dprs:
+            regressions.append(f"{key}: in the baseline but not measured")
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        for field in ('p50_ms', 'p95_ms'):
+            if old[field] > 0 and result[field] > old[field] * (1 + threshold):
+                regressions.append(f"{key}: {field} {old[field]:.3f} -> {result[field]:.3f} "
+                                   f"(+{(result[field] / old[field] - 1) * 100:.0f}%)")
+        if result['draw_calls'] > old['draw_calls']:
+            regressions.append(f"{key}: draw calls {old['draw_calls']} -> {result['draw_calls']}")
+    return regressions
+
+
+def print_table(results, baseline):
+    print(f"{'widget':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'calls':>7}{'vs base p50':>13}")
+    for key, result in results.items():
+        old = baseline.get(key)
+        change = f"{(result['p50_ms'] / old['p50_ms'] - 1) * 100:+.0f}%" if old and old['p50_ms'] > 0 else ""
+        print(f"{key:<28}{result['p50_ms']:>9.3f}{result['p95_ms']:>9.3f}{result['p99_ms']:>9.3f}"
+              f"{result['max_ms']:>9.3f}{result['draw_calls']:>7}{change:>13}")
+
+
+def option(name, default=None):
+    return next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith(f"--{name}=")), default)
+
+
+def main():
+    frames = int(option('frames', FRAMES))
+    only = option('only')
+    names = only.split(',') if only else list(WIDGETS)
+    unknown = [name for name in names if name not in WIDGETS]
+    if unknown:
+        print(f"Error: unknown widget {', '.join(unknown)}; choose from {', '.join(WIDGETS)}")
+        return 2
+    if '--worker' in sys.argv:
+        run_worker(names, frames)
+        return 0
+
+    dprs = [float(dpr) for dpr in option('dpr', ','.join(f"{dpr:g}" for dpr in DPRS)).split(',')]
+    threshold = float(option('threshold', THRESHOLD))
+    results, failures = run_all(names, frames, dprs)
+    for line in failures:
+        print(f"Error: {line}")
+    baseline_path = option('baseline')
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+    print_table(results, baseline)
+
+    json_path = option('json')
+    if json_path:
+        report = {
+            'revision': git_revision(),
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'frames': frames,
+            'results': results,
+        }
+        with open(json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {json_path}")
+
+    regressions = compare(results, baseline, threshold, names, dprs)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions or failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
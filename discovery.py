@@ -0,0 +1,187 @@
+import asyncio
+from asynclink import loop_thread
+from mavframe import MAVLinkFrameParser, FastPathDecoder, MSG_ID_HEARTBEAT, frame_source, is_vehicle_heartbeat
+
+SITL_PORTS = (5760, 5762, 5763)
+UDP_PORT = 14550
+SERIAL_BAUDS = (57600, 115200, 921600)
+# How long one baud rate gets before the next is tried, unless frames already decode at it
+BAUD_WINDOW = 1.5
+# Once frames decode, how long a vehicle heartbeat may take: three missed 1 Hz beats
+HEARTBEAT_WINDOW = 3.0
+SERIAL_POLL = 0.02
+
+
+def serial_ports():
+    """Device names of the serial ports present; none without pyserial"""
+    try:
+        from serial.tools import list_ports
+    except ImportError:
+        return []
+    return [port.device for port in list_ports.comports()]
+
+
+def default_candidates():
+    """SITL TCP ports, UDP 14550 and every serial port at the usual telemetry bauds"""
+    candidates = [f"tcp:127.0.0.1:{port}" for port in SITL_PORTS]
+    candidates.append(f"udpin:0.0.0.0:{UDP_PORT}")
+    for device in serial_ports():
+        candidates += [f"{device},{baud}" for baud in SERIAL_BAUDS]
+    return candidates
+
+
+class HeartbeatWatch:
+    """Parses probe bytes until a vehicle heartbeat arrives.
+
+    synced turns true on the first CRC-checked frame, which is enough to
+    tell a serial probe it has the right baud rate even before the 1 Hz
+    heartbeat comes round.
+    """
+    decoder = FastPathDecoder()
+
+    def __init__(self):
+        self.parser = MAVLinkFrameParser()
+        self.known = self.parser.crc_extra
+        self.synced = False
+
+    def feed(self, data):
+        """True once a heartbeat from a vehicle has been seen"""
+        for msgid, frame in self.parser.feed(data):
+            if msgid not in self.known:
+                # Not CRC checked, so it proves nothing about the baud rate
+                continue
+            self.synced = True
+            if msgid == MSG_ID_HEARTBEAT:
+                fields = self.decoder.unpack(self.decoder.HEARTBEAT, frame)
+                if is_vehicle_heartbeat(frame_source(frame)[1], fields):
+                    return True
+        return False
+
+
+async def probe_tcp(address, host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    watch = HeartbeatWatch()
+    try:
+        while True:
+            data = await reader.read(4096)
+            if not data:
+                raise ConnectionError(f"EOF from {address}")
+            if watch.feed(data):
+                return address
+    finally:
+        # Drop the socket at once so the real connection can take the port
+        writer.transport.abort()
+
+
+async def probe_udp(address, host, port):
+    loop = asyncio.get_running_loop()
+    found = loop.create_future()
+    watch = HeartbeatWatch()
+
+    class Listener(asyncio.DatagramProtocol):
+        def datagram_received(self, data, addr):
+            if not found.done() and watch.feed(data):
+                found.set_result(address)
+
+    transport, _ = await loop.create_datagram_endpoint(Listener, local_addr=(host, port))
+    try:
+        return await found
+    finally:
+        transport.close()
+
+
+async def probe_serial(device, bauds):
+    """Tries each baud rate in turn: a port can only be open at one rate at a time"""
+    import serial
+    loop = asyncio.get_running_loop()
+    for baud in bauds:
+        # Opening (and closing) a port can block on the driver; keep it off the shared loop
+        opening = loop.run_in_executor(None, lambda: serial.Serial(device, baud, timeout=0))
+        try:
+            port = await asyncio.shield(opening)
+        except asyncio.CancelledError:
+            # Another candidate won mid-open: the open still finishes, so close what it opens
+            opening.add_done_callback(close_opened)
+            raise
+        try:
+            watch = HeartbeatWatch()
+            give_up = loop.time() + BAUD_WINDOW
+            synced_at = None
+            while loop.time() < give_up:
+                data = port.read(port.in_waiting or 1)
+                if data and watch.feed(data):
+                    return f"{device},{baud}"
+                if watch.synced and synced_at is None:
+                    # Frames decode, so this is the rate: the heartbeat gets its own window
+                    synced_at = loop.time()
+                    give_up = max(give_up, synced_at + HEARTBEAT_WINDOW)
+                await asyncio.sleep(SERIAL_POLL)
+            if synced_at is not None:
+                # MAVLink at this rate but no vehicle; another rate won't decode at all
+                raise ConnectionError(f"No vehicle heartbeat on {device} at {baud}")
+        finally:
+            await loop.run_in_executor(None, port.close)
+    raise ConnectionError(f"No MAVLink on {device}")
+
+
+def close_opened(opening):
+    """Done callback for a port open whose prober went away"""
+    if not opening.cancelled() and opening.exception() is None:
+        asyncio.get_running_loop().run_in_executor(None, opening.result().close)
+
+
+def probes(candidates):
+    """One coroutine per transport to probe; a serial device's bauds share one"""
+    serial_bauds = {}
+    coros = []
+    for address in candidates:
+        device, _, baud = address.partition(',')
+        if baud.isdigit():
+            serial_bauds.setdefault(device, []).append(int(baud))
+            continue
+        kind, _, rest = address.partition(':')
+        host, _, port = rest.rpartition(':')
+        if kind == 'tcp' and port.isdigit():
+            coros.append(probe_tcp(address, host, int(port)))
+        elif kind in ('udp', 'udpin') and port.isdigit():
+            coros.append(probe_udp(address, host, int(port)))
+        else:
+            print(f"Error: cannot probe {address}")
+    for device, bauds in serial_bauds.items():
+        coros.append(probe_serial(device, bauds))
+    return coros
+
+
+async def discover_async(candidates, timeout):
+    tasks = [asyncio.ensure_future(coro) for coro in probes(candidates)]
+    try:
+        for first in asyncio.as_completed(tasks, timeout=timeout):
+            try:
+                return await first
+            except asyncio.TimeoutError:
+                raise
+            except Exception:
+                # Refused, port busy, no MAVLink at any baud: the others may still answer
+                continue
+        raise ConnectionError("No vehicle found on any candidate link")
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"No vehicle heartbeat within {timeout}s on any candidate link") from None
+    finally:
+        # Losers close their sockets and ports before the winner is reopened
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def discover(candidates=None, timeout=10):
+    """Probe every candidate address at once; return the first that delivers a vehicle heartbeat.
+
+    Candidates use the same address strings as --endpoint (tcp:host:port,
+    udpin:host:port, device,baud) and default to default_candidates().
+    Runs on the shared loop thread and blocks the caller until one wins,
+    all fail or the timeout passes.
+    """
+    if candidates is None:
+        candidates = default_candidates()
+    future = loop_thread().submit(discover_async(candidates, timeout))
+    return future.result(timeout + 1)
@@ -0,0 +1,83 @@
+from PyQt6.QtCore import QObject, QTimer, Qt
+from PyQt6.QtGui import QGuiApplication
+
+# Used when the screen doesn't report a refresh rate
+DEFAULT_FPS = 60
+
+
+class FrameClock(QObject):
+    """One repaint tick for the whole app, at the display refresh rate or max_fps if lower.
+
+    Widgets call request(self) whenever new data arrives instead of
+    update(). The first request after a quiet spell repaints at once and
+    starts the clock; later ones only mark the widget, and each tick
+    repaints every marked widget once. However fast telemetry comes in, a
+    widget paints at most once per tick, and a tick with nothing marked
+    stops the clock until the next request.
+    """
+
+    def __init__(self, max_fps=None, parent=None):
+        super().__init__(parent)
+        self.pending = {}
+        self.ticks = 0
+        self.repaints = 0
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.set_max_fps(max_fps)
+
+    def set_max_fps(self, max_fps):
+        screen = QGuiApplication.primaryScreen()
+        fps = screen.refreshRate() if screen is not None else 0
+        if fps <= 0:
+            fps = DEFAULT_FPS
+        if max_fps:
+            fps = min(fps, max_fps)
+        self.fps = fps
+        self.timer.setInterval(max(1, round(1000 / fps)))
+
+    def request(self, widget):
+        """Repaint widget on the next tick"""
+        if self.timer.isActive():
+            self.pending[widget] = None
+            return
+        self.timer.start()
+        self.repaint(widget)
+
+    def tick(self):
+        if not self.pending:
+            self.timer.stop()
+            return
+        self.ticks += 1
+        pending = self.pending
+        self.pending = {}
+        for widget in pending:
+            self.repaint(widget)
+
+    def repaint(self, widget):
+        try:
+            widget.update()
+        except RuntimeError:
+            # Deleted between its request and the tick
+            return
+        self.repaints += 1
+
+    def stop(self):
+        self.timer.stop()
+        self.pending = {}
+
+
+_frame_clock = None
+
+
+def frame_clock():
+    """The app-wide FrameClock, made on first use (after the QApplication)"""
+    global _frame_clock
+    if _frame_clock is None:
+        _frame_clock = FrameClock()
+    return _frame_clock
+
+
+def request_paint(widget):
+    """Shorthand for frame_clock().request(widget)"""
+    frame_clock().request(widget)
@@ -3,9 +3,17 @@ from Gauges.alt import EnhancedAltitudeIndicator
 from Gauges.compassgauge import FuturisticCompass
 from Gauges.speedgauge import EnhancedSpeedIndicator
 from Gauges.vsi import EnhancedVSI
-from PyQt6.QtCore import pyqtSlot
+from PyQt6.QtCore import QEvent, pyqtSlot
+import vehiclestate as vs
+from latency import PaintTrace
+from frameclock import request_paint
 
 class GaugesWidget(QFrame):
+    # Telemetry rates (Hz) this widget needs, see streamrates.py
+    STREAM_RATES = {'VFR_HUD': 10}
+    # Fields whose receive-to-paint latency is traced, see latency.py
+    LATENCY_FIELDS = vs.ALT | vs.HEADING | vs.GROUNDSPEED | vs.CLIMB
+
     def __init__(self):
         super().__init__()
         self.setFrameStyle(QFrame.Shape.Box | QFrame.Shadow.Plain)
@@ -37,31 +45,45 @@ class GaugesWidget(QFrame):
                      self.speed_gauge, self.vsi_gauge]:
             gauge.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)     
         
+        # The gauges paint themselves; the first repaint after new data ends the trace.
+        # The compass repaints only its dial, so that is the widget watched.
+        self.latency = PaintTrace('gauges')
+        for gauge in [self.altitude_gauge, self.compass_gauge.compass_display, self.speed_gauge, self.vsi_gauge]:
+            gauge.installEventFilter(self)
+        
         self.setFixedHeight(160)
         self.setFixedWidth(580)
     
+    def eventFilter(self, watched, event):
+        # Seen as the paint starts, so the trace stops just short of the drawing itself
+        if event.type() == QEvent.Type.Paint:
+            self.latency.painted()
+        return super().eventFilter(watched, event)
+
     def connect_monitoring_thread(self, monitoring_thread):
         """Connect the monitoring thread's data_updated signal to update the gauges"""
         monitoring_thread.data_updated.connect(self.update_gauges)
     
-    @pyqtSlot(dict)
-    def update_gauges(self, data):
+    @pyqtSlot(object)
+    def update_gauges(self, frame):
         """Update all gauges with real data from the monitoring thread"""
+        dirty = frame.dirty
+        self.latency.delivered(frame.oldest_stamp(dirty & self.LATENCY_FIELDS))
         # Update altitude gauge
-        if 'alt' in data:
-            self.altitude_gauge.altitude = data['alt']
-            self.altitude_gauge.update()
+        if dirty & vs.ALT:
+            self.altitude_gauge.altitude = frame.alt
+            request_paint(self.altitude_gauge)
         
         # Update compass gauge with heading information
-        if 'heading' in data:
-            self.compass_gauge.set_direction(data['heading'])
+        if dirty & vs.HEADING:
+            self.compass_gauge.set_direction(frame.heading)
         
         # Update speed gauge
-        if 'groundspeed' in data:
-            self.speed_gauge.speed = data['groundspeed']
-            self.speed_gauge.update()
+        if dirty & vs.GROUNDSPEED:
+            self.speed_gauge.speed = frame.groundspeed
+            request_paint(self.speed_gauge)
         
         # Update vertical speed indicator
-        if 'climb' in data:
-            self.vsi_gauge.vertical_speed = data['climb']
-            self.vsi_gauge.update()
\ No newline at end of file
+        if dirty & vs.CLIMB:
+            self.vsi_gauge.vertical_speed = frame.climb
+            request_paint(self.vsi_gauge)
\ No newline at end of file
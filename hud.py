@@ -1,16 +1,33 @@
 import sys
 import random
 import math
-from PyQt6.QtCore import ( Qt, QRect, QTimer, pyqtProperty, QPropertyAnimation, QEasingCurve, QPoint, QPointF, QUrl, QRectF, QMargins,QEvent )
+import time
+from PyQt6.QtCore import ( Qt, QRect, QTimer, pyqtProperty, QPropertyAnimation, QEasingCurve, QPoint, QPointF, QUrl, QRectF, QMargins,QEvent, QSize )
 from PyQt6.QtWidgets import ( QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, 
                              QLabel, QPushButton, QFrame, QComboBox, QLineEdit, QScrollArea, QTextEdit, 
                              QGroupBox, QSizePolicy, QProgressBar,QStackedLayout,QSizePolicy )
-from PyQt6.QtGui import ( QPalette, QColor, QFont, QPainter, QPen, QBrush, QLinearGradient, QRadialGradient, QPolygon, QFontMetrics, QPainterPath, QTransform, QCursor , QRegion)
+from PyQt6.QtGui import ( QPalette, QColor, QFont, QPainter, QPen, QBrush, QLinearGradient, QRadialGradient, QPolygon, QFontMetrics, QPainterPath, QTransform, QCursor , QRegion, QPixmap)
 from threadentities import MonitoringThread
+import vehiclestate as vs
+from latency import PaintTrace
+from frameclock import request_paint
+from interpolation import AttitudeInterpolator
 
 class EnhancedHUDWidget(QFrame):
+    # Telemetry rates (Hz) this widget needs, see streamrates.py
+    STREAM_RATES = {'ATTITUDE': 30, 'VFR_HUD': 10, 'SYS_STATUS': 2, 'GLOBAL_POSITION_INT': 5}
+    # Fields whose receive-to-paint latency is traced, see latency.py
+    LATENCY_FIELDS = vs.ATTITUDE | vs.HEADING | vs.ALT | vs.AIRSPEED | vs.GROUNDSPEED
+    PITCH_RANGE = 60
+    # Room above the top and below the bottom pitch line for their label boxes
+    LADDER_MARGIN = 10
+    # Heading tape ticks plus the labels that hang below the scale
+    TAPE_HEIGHT = 35
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        # name -> ((width, height, device pixel ratio), QPixmap), see cached_layer()
+        self.layers = {}
         self.setMinimumSize(400, 400)
         self.setMaximumSize(600, 400)
         self.setStyleSheet("background-color: #0A0A0A; border-radius: 20px;")
@@ -22,6 +39,7 @@ class EnhancedHUDWidget(QFrame):
             path.addRoundedRect(rect, 20, 20)  # 20px border radius
             mask = QRegion(path.toFillPolygon().toPolygon())
             self.setMask(mask)
+            self.layers.clear()
         self.resizeEvent = shape_changed
 
         ## Create a frame with rounded corners
@@ -54,59 +72,63 @@ class EnhancedHUDWidget(QFrame):
         self.bottom_vibe        = "Vibe"
         self.bottom_ekf         = "EKF"
         self.bottom_alt_info    = "Unknown"
-        self.timer = QTimer(self)
-        self.timer.start(60)
         self.heading_offset = 0
         self.glow_counter = 0
+        self.latency = PaintTrace('hud')
+        # Roll, pitch and heading are drawn from here, smoothed to the repaint rate
+        self.attitude = AttitudeInterpolator(pitch_scale=0.45)
 
     # def connect_to_mavlink_data(self, monitoring_thread):
     #     monitoring_thread.data_updated.connect(self.update_from_mavlink)
 
 
-    def update_hud(self,data):
-        """Update HUD with live values from MAVLink data"""
+    def update_hud(self, frame):
+        """Update HUD with live values from a VehicleState frame"""
+        dirty = frame.dirty
+        self.latency.delivered(frame.oldest_stamp(dirty & self.LATENCY_FIELDS))
+        self.attitude.update(frame)
         # Update heading, pitch, roll, etc. (from previous code)
-        if 'heading' in data:
-            self.heading = data['heading'] % 360
+        if dirty & vs.HEADING:
+            self.heading = frame.heading % 360
         
         self.heading_offset = (self.heading_offset + random.uniform(-5, 5)) % 100
         
-        if 'pitch' in data:
-            self.pitch = data['pitch'] * 0.45
+        if dirty & vs.PITCH:
+            self.pitch = frame.pitch * 0.45
         
-        if 'roll' in data:
-            self.roll = data['roll']
+        if dirty & vs.ROLL:
+            self.roll = frame.roll
         
-        if 'airspeed' in data:
-            self.airspeed = data['airspeed']
+        if dirty & vs.AIRSPEED:
+            self.airspeed = frame.airspeed
             self.hori_bar_left = self.airspeed
             
-        if 'groundspeed' in data:
-            self.groundspeed = data['groundspeed']
-        else:
+        if dirty & vs.GROUNDSPEED:
+            self.groundspeed = frame.groundspeed
+        elif frame.groundspeed is None:
             self.groundspeed = self.airspeed * 0.95
         
-        if 'alt' in data:
-            self.hori_bar_right = max(-self.altitude_max, min(self.altitude_max, data['alt']))
-            self.altitude = data['alt']
+        if dirty & vs.ALT:
+            self.hori_bar_right = max(-self.altitude_max, min(self.altitude_max, frame.alt))
+            self.altitude = frame.alt
         
         # Update battery information
-        if 'battery' in data:
-            self.battery_percent = data['battery']
+        if dirty & vs.BATTERY:
+            self.battery_percent = frame.battery
         
         # Update arm state based on mode information
-        if 'mode' in data:
+        if dirty & vs.MODE:
             # You may need to adjust this logic based on how your system reports armed status
             # This is a simple assumption that certain modes imply armed state
             flying_modes = ["STABILIZE", "ACRO", "ALT_HOLD", "AUTO", "GUIDED", "LOITER", "RTL", 
                             "CIRCLE", "POSITION", "LAND", "OF_LOITER", "DRIFT", "SPORT"]
-            if data['mode'] in flying_modes:
+            if frame.mode in flying_modes:
                 self.arm_state = "ARMED"
             else:
                 self.arm_state = "DISARMED"
         
         # Update GPS status based on GPS data
-        if 'lat' in data and 'lon' in data:
+        if frame.lat is not None and frame.lon is not None:
             # Simple check - if we have GPS data, assume GPS is working
             self.gps_status = "GPS Fix"
         else:
@@ -114,12 +136,12 @@ class EnhancedHUDWidget(QFrame):
         
         # Update bottom status bar
         # This would typically be based on various system health checks
-        if 'mode' in data:
-            if data['mode'] == "RTL":
+        if dirty & vs.MODE:
+            if frame.mode == "RTL":
                 self.bottom_status = "Returning to Launch"
-            elif data['mode'] == "AUTO":
+            elif frame.mode == "AUTO":
                 self.bottom_status = "Autonomous Flight"
-            elif data['mode'] == "GUIDED":
+            elif frame.mode == "GUIDED":
                 self.bottom_status = "Guided Mode"
             elif self.arm_state == "ARMED":
                 self.bottom_status = "Armed"
@@ -127,8 +149,8 @@ class EnhancedHUDWidget(QFrame):
                 self.bottom_status = "Not Ready to Arm"
         
         # Example altitude info based on relative altitude
-        if 'relative_alt' in data:
-            rel_alt = data['relative_alt']
+        if dirty & vs.RELATIVE_ALT:
+            rel_alt = frame.relative_alt
             if rel_alt < 5:
                 self.bottom_alt_info = "Low Altitude"
             elif rel_alt > 100:
@@ -144,8 +166,221 @@ class EnhancedHUDWidget(QFrame):
         # Continue animation counter
         self.glow_counter = (self.glow_counter + 1) % 100
         
-        # Request redraw
-        self.update()
+        # Repaint on the next frame clock tick
+        request_paint(self)
+
+    def changeEvent(self, event):
+        if event.type() in (QEvent.Type.StyleChange, QEvent.Type.PaletteChange, QEvent.Type.FontChange):
+            self.layers.clear()
+            self.update()
+        super().changeEvent(event)
+
+    def cached_layer(self, name, size, draw):
+        """Pixmap of what draw(painter) paints at size, kept until the size, pixel ratio or style changes"""
+        ratio = self.devicePixelRatioF()
+        key = (size.width(), size.height(), ratio)
+        cached = self.layers.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        pixmap = QPixmap(math.ceil(size.width() * ratio), math.ceil(size.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        draw(painter)
+        painter.end()
+        self.layers[name] = (key, pixmap)
+        return pixmap
+
+    def bar_rects(self, r):
+        """Airspeed (left) and altitude (right) bar rectangles"""
+        bar_width = 35
+        left_bar_rect = QRect(r.left() + 5, r.top() + 50 + 20 - 40, bar_width, r.height() - 50 - 80 + 40)
+        right_bar_rect = QRect(r.right() - bar_width - 10, r.top() + 50 + 20 - 40, bar_width,  r.height() - 50 - 80 +40)
+        return left_bar_rect, right_bar_rect
+
+    def status_rect(self, r):
+        bottom_height = 30
+        return QRect( r.left()+10, r.bottom() - bottom_height,r.width()-20, bottom_height)
+
+    def box_rects(self, r):
+        """Battery and GPS box rectangles"""
+        box_width  = int(r.width()  * 0.10)
+        box_height = int(r.height() * 0.075)
+        # battery 20% in from the left, GPS 20% in from the right
+        battery_rect = QRect(r.left() + int(r.width()  * 0.20), r.top()  + int(r.height() * 0.559), box_width, box_height)
+        gps_rect = QRect(r.right() - box_width - int(r.width() * 0.20), r.top()   + int(r.height() * 0.55), box_width, box_height)
+        return battery_rect, gps_rect
+
+    def draw_chrome(self, p, r):
+        """Everything that only moves on resize: bar backgrounds and titles, the status bar, the box frames"""
+        left_bar_rect, right_bar_rect = self.bar_rects(r)
+        # Draw advanced backgrounds for bars with multi-layer effect
+        for bar_rect in [left_bar_rect, right_bar_rect]:
+            # Main background
+            p.setPen(QPen(QColor(0, 100, 150, 200), 1))
+            grad = QLinearGradient(QPointF(bar_rect.topLeft()), QPointF(bar_rect.bottomLeft()))
+            grad.setColorAt(0, QColor(0, 30, 60, 190))
+            grad.setColorAt(1, QColor(0, 15, 40, 190))
+            p.setBrush(grad)
+            p.drawRoundedRect(bar_rect, 5, 5)
+            # Draw advanced technical grid lines on the bars
+            p.setPen(QPen(QColor(0, 100, 180, 50), 1, Qt.PenStyle.DotLine))
+            grid_spacing_v = 20
+            for y in range(bar_rect.top(), bar_rect.bottom(), grid_spacing_v):
+                p.drawLine(bar_rect.left() + 2, y, bar_rect.right() - 2, y)     
+            # Vertical center line
+            p.setPen(QPen(QColor(0, 120, 200, 80), 1, Qt.PenStyle.DashLine))
+            p.drawLine( bar_rect.left() + bar_rect.width() // 2,bar_rect.top() + 2,bar_rect.left() + bar_rect.width() // 2,bar_rect.bottom() - 2)           
+
+        # Title plates with neon style, zero lines and units
+        for bar_rect, title, unit, shift in ((left_bar_rect, "AIRSPEED", "m/s", 5), (right_bar_rect, "ALTITUDE", "m", -15)):
+            p.setFont(QFont("Consolas", 7, QFont.Weight.Bold))
+            label_width = QFontMetrics(p.font()).horizontalAdvance(title)
+            title_bg_rect = QRect(bar_rect.left() + (bar_rect.width() - label_width) // 2 + shift, bar_rect.top() - 25, label_width + 20, 20)
+            # Label background with glow effect
+            p.setPen(QPen(QColor(0, 150, 255, 50), 3))
+            p.setBrush(QBrush(QColor(0, 20, 40, 180)))
+            p.drawRoundedRect(title_bg_rect, 5, 5)
+            p.setPen(QPen(QColor(0, 200, 255), 1))
+            p.drawRoundedRect(title_bg_rect, 5, 5)
+            p.setPen(QPen(QColor(0, 220, 255)))
+            p.drawText(title_bg_rect, Qt.AlignmentFlag.AlignCenter, title)
+            # Center line marks zero
+            center_y = bar_rect.top() + bar_rect.height() // 2
+            p.setPen(QPen(QColor(255, 255, 255, 120), 1))
+            p.drawLine(bar_rect.left() + 2, center_y, bar_rect.right() - 2, center_y)
+            unit_font = QFont("Consolas", 8)
+            p.setFont(unit_font)
+            unit_width = QFontMetrics(unit_font).horizontalAdvance(unit)
+            unit_rect = QRect(bar_rect.left() + (bar_rect.width() - unit_width) // 2, bar_rect.bottom() + 5, unit_width, 20)
+            p.setPen(QPen(QColor(255, 255, 255), 3))
+            p.drawText(unit_rect, Qt.AlignmentFlag.AlignCenter, unit)
+
+        # Bottom status bar
+        bottom_rect = self.status_rect(r)
+        bottom_gradient = QLinearGradient(QPointF(bottom_rect.left(), bottom_rect.top()),QPointF(bottom_rect.left(), bottom_rect.bottom()))
+        bottom_gradient.setColorAt(0, QColor(10, 20, 30, 220))
+        bottom_gradient.setColorAt(1, QColor(5, 10, 15, 220))
+        p.fillRect(bottom_rect, bottom_gradient)
+        
+        # Add top edge highlight
+        p.setPen(QPen(QColor(0, 200, 255), 1))
+        p.drawLine(bottom_rect.left(), bottom_rect.top(), bottom_rect.right(), bottom_rect.top())
+        
+        # Add subtle grid pattern overlay
+        p.setPen(QPen(QColor(0, 100, 200, 20), 1, Qt.PenStyle.DotLine))
+        grid_spacing = 10
+        for x in range(0, r.width(), grid_spacing):
+            p.drawLine(x, bottom_rect.top(), x, bottom_rect.bottom())
+        
+        # Divide into sections with futuristic separators
+        section_width = bottom_rect.width() / 4
+        
+        divider_gradient = QLinearGradient(QPointF(0, bottom_rect.top() + 5),QPointF(0, bottom_rect.bottom() - 5))
+        divider_gradient.setColorAt(0, QColor(0, 150, 200, 0))
+        divider_gradient.setColorAt(0.5, QColor(0, 150, 200, 120))
+        divider_gradient.setColorAt(1, QColor(0, 150, 200, 0))
+        
+        for i in range(1, 4):
+            x_pos = int(bottom_rect.left() + i * section_width)
+            divider_rect = QRect(x_pos - 1, bottom_rect.top() + 5, 2, bottom_rect.height() - 10)
+            p.fillRect(divider_rect, divider_gradient)
+            
+            p.setPen(QPen(QColor(0, 200, 255), 1))
+            p.drawLine(x_pos - 3, bottom_rect.top() + 2, x_pos + 3, bottom_rect.top() + 2)
+            p.drawLine(x_pos - 3, bottom_rect.bottom() - 2, x_pos + 3, bottom_rect.bottom() - 2)
+
+        # Battery and GPS box frames
+        battery_rect, gps_rect = self.box_rects(r)
+        p.setBrush(QBrush(QColor(0, 20, 40, 180)))
+        p.setPen(QPen(QColor(0, 180, 255), 1))
+        p.drawRoundedRect(battery_rect, 8, 8)
+        p.setPen(QPen(QColor(0, 150, 220, 40), 4))
+        p.drawRoundedRect(gps_rect, 8, 8)
+        p.setPen(QPen(QColor(0, 180, 255), 1))
+        p.drawRoundedRect(gps_rect, 8, 8)
+
+    def blit(self, p, x, y, pixmap, source):
+        """Draw the part of pixmap under source (logical coordinates) with source's top left at x, y"""
+        ratio = pixmap.devicePixelRatio()
+        part = source.intersected(QRectF(0, 0, pixmap.width() / ratio, pixmap.height() / ratio))
+        if part.isEmpty():
+            return
+        target = QRectF(x + part.left() - source.left(), y + part.top() - source.top(), part.width(), part.height())
+        p.drawPixmap(target, pixmap, QRectF(part.left() * ratio, part.top() * ratio, part.width() * ratio, part.height() * ratio))
+
+    def heading_tape(self, scale_width, scale_height, tape_scale):
+        """Heading ticks and labels from 0 to 360 drawn once into a strip, tape_scale pixels per degree.
+
+        The strip runs margin degrees past each end, so any heading's
+        window is one unbroken cut of it. Returns (pixmap, margin).
+        """
+        margin = math.ceil(scale_width / 2 / tape_scale) + 1
+        size = QSize(math.ceil((360 + 2 * margin) * tape_scale) + 1, self.TAPE_HEIGHT)
+        # The strip's rows line up with scale_rect: 0 is its top, bottom its last row
+        bottom = scale_height - 1
+
+        def draw(p):
+            p.setFont(QFont("Consolas", 8, QFont.Weight.Bold))
+            for degree in range(-margin, 360 + margin + 1):
+                angle = degree % 360
+                x_pos = (degree + margin) * tape_scale
+                if angle % 10 == 0: # Major tick
+                    p.setPen(QPen(QColor(255, 255, 255), 2))
+                    p.drawLine(int(x_pos), 5, int(x_pos), bottom - 5)
+                    label = f"{angle:03d}" if angle > 0 else "000"
+                    p.drawText(int(x_pos - 12), 15, 24, 20, Qt.AlignmentFlag.AlignCenter, label)
+                elif angle % 5 == 0:  # Medium tick
+                    p.setPen(QPen(QColor(0, 180, 220), 1))
+                    p.drawLine(int(x_pos), 5, int(x_pos), bottom - 5)
+                if angle + 2.5 < 360:
+                    x_half = x_pos + 2.5 * tape_scale
+                    p.setPen(QPen(QColor(100, 100, 100), 1))
+                    p.drawLine(int(x_half), 8, int(x_half), bottom - 8)
+        return self.cached_layer('heading_tape', size, draw), margin
+
+    def pitch_ladder(self, dial_radius, spacing):
+        """Pitch lines for every PITCH_RANGE degrees each way drawn once into a strip, spacing pixels per degree.
+
+        Returns (pixmap, x, y) where x, y is the middle of the zero line.
+        """
+        label_font = QFont("Consolas", 7, QFont.Weight.Bold)
+        label_room = QFontMetrics(label_font).horizontalAdvance(str(self.PITCH_RANGE)) + 10
+        zero_x = int(dial_radius * 0.4) + label_room
+        zero_y = self.LADDER_MARGIN + math.ceil(self.PITCH_RANGE * spacing)
+        size = QSize(2 * zero_x + 1, 2 * zero_y + 1)
+
+        def draw(p):
+            p.setFont(label_font)
+            for pitch_deg in range(-self.PITCH_RANGE, self.PITCH_RANGE + 1, 2):
+                line_y = zero_y + round(pitch_deg * spacing)
+                if pitch_deg % 10 == 0:
+                    line_length = dial_radius * 0.8
+                    p.setPen(QPen(QColor(255, 255, 255), 2))
+                else:
+                    line_length = dial_radius * 0.4
+                    p.setPen(QPen(QColor(200, 200, 200), 1))
+                line_start_x = int(zero_x - line_length/2)
+                line_end_x = int(zero_x + line_length/2)
+                if pitch_deg % 10 != 0:
+                    p.drawLine(line_start_x, line_y, line_end_x, line_y)
+                    continue
+                # Line break in center for major lines
+                center_gap = 20
+                p.drawLine(line_start_x, line_y, int(zero_x - center_gap/2), line_y)
+                p.drawLine(int(zero_x + center_gap/2), line_y, line_end_x, line_y)
+                if pitch_deg != 0:
+                    # Angle indicator boxes on both ends
+                    pitch_text = f"{abs(pitch_deg)}"
+                    text_width = QFontMetrics(label_font).horizontalAdvance(pitch_text)
+                    p.setBrush(QBrush(QColor(0, 0, 0, 120)))
+                    p.setPen(QPen(QColor(255, 255, 255), 1))
+                    for text_box in (QRect(line_start_x - text_width - 8, line_y - 10, text_width + 8, 18),
+                                     QRect(line_end_x, line_y - 10, text_width + 8, 18)):
+                        p.drawRect(text_box)
+                        p.drawText(text_box.adjusted(4, 0, 0, 0), Qt.AlignmentFlag.AlignVCenter, pitch_text)
+        return self.cached_layer('pitch_ladder', size, draw), zero_x, zero_y
 
     def paintEvent(self, event):
         def draw_futuristic_crosshair(p, center_x, center_y):
@@ -172,6 +407,11 @@ class EnhancedHUDWidget(QFrame):
             p.restore()
 
         super().paintEvent(event)
+        now = time.monotonic()
+        roll, pitch, heading = self.attitude.at(now)
+        roll = self.roll if roll is None else roll
+        pitch = self.pitch if pitch is None else pitch
+        heading = self.heading if heading is None else heading
         p = QPainter(self)
         p.setRenderHint(QPainter.RenderHint.Antialiasing)
         r = self.contentsRect()
@@ -179,7 +419,7 @@ class EnhancedHUDWidget(QFrame):
         # 1) Background: Sky and Ground with Enhanced Gradient
         p.save()
         p.translate(r.center())
-        p.rotate(-self.roll)
+        p.rotate(-roll)
         p.translate(-r.center())
         diagonal = math.sqrt(r.width()**2 + r.height()**2)
         extended_w = int(diagonal)
@@ -189,7 +429,7 @@ class EnhancedHUDWidget(QFrame):
         extended_rect = QRect(ext_x, ext_y, extended_w, extended_h)
 
         # Calculate the horizon position based on pitch
-        pitch_offset = self.pitch * (extended_h / 40)  # Scale factor for pitch sensitivity
+        pitch_offset = pitch * (extended_h / 40)  # Scale factor for pitch sensitivity
         horizon_y = extended_rect.top() + extended_h // 2 + pitch_offset
 
         # Adjust the sky and ground rectangles based on the new horizon position
@@ -227,57 +467,13 @@ class EnhancedHUDWidget(QFrame):
         p.setPen(QPen(QColor(255, 30, 30), 2))
         p.drawLine(int(extended_rect.left()), int(horizon_y), int(extended_rect.right()), int(horizon_y))
 
-        # Add pitch lines here - inside the same transform
-        p.setPen(QPen(QColor(255, 255, 255), 2))
-        pitch_range = 60
-        pitch_step = 2
+        # Pitch ladder: one blit of the pre-rendered strip, cut to attitude_radius around the center
         attitude_radius = min(r.width(), r.height()) * 0.21  # This is your specified radius limit
-
-        for pitch_deg in range(-pitch_range, pitch_range + 1, pitch_step):        
-            y_offset = pitch_deg * (extended_h / 40) * 0.3
-            line_y = int(horizon_y + y_offset)
-            distance_from_center = abs(line_y - r.center().y())
-            
-            if distance_from_center > attitude_radius:
-                continue
-            
-            if pitch_deg % 10 == 0:
-                line_length = dial_radius * 0.8
-                label_font = QFont("Consolas", 7, QFont.Weight.Bold)
-                p.setFont(label_font)
-                p.setPen(QPen(QColor(255, 255, 255), 2))
-            else:
-                line_length = dial_radius * 0.4
-                p.setPen(QPen(QColor(200, 200, 200), 1))
-            
-            # Draw the pitch line centered on the display
-            line_start_x = int(r.center().x() - line_length/2)
-            line_end_x = int(r.center().x() + line_length/2)
-            
-            # Add line break in center for major lines
-            if pitch_deg % 10 == 0:
-                center_gap = 20
-                p.drawLine(line_start_x, line_y, int(r.center().x() - center_gap/2), line_y)
-                p.drawLine(int(r.center().x() + center_gap/2), line_y, line_end_x, line_y)
-                
-                # Add angle indicator boxes on ends for major lines
-                if pitch_deg != 0:
-                    # Left box
-                    pitch_text = f"{abs(pitch_deg)}"
-                    text_width = QFontMetrics(p.font()).horizontalAdvance(pitch_text)
-                    text_box_left = QRect(line_start_x - text_width - 8, line_y - 10, text_width + 8, 18)
-                    
-                    p.setBrush(QBrush(QColor(0, 0, 0, 120)))
-                    p.setPen(QPen(QColor(255, 255, 255), 1))
-                    p.drawRect(text_box_left)
-                    p.drawText(text_box_left.adjusted(4, 0, 0, 0), Qt.AlignmentFlag.AlignVCenter, pitch_text)
-                    
-                    # Right box
-                    text_box_right = QRect(line_end_x, line_y - 10, text_width + 8, 18)
-                    p.drawRect(text_box_right)
-                    p.drawText(text_box_right.adjusted(4, 0, 0, 0), Qt.AlignmentFlag.AlignVCenter, pitch_text)
-            else:
-                p.drawLine(line_start_x, line_y, line_end_x, line_y)
+        ladder, zero_x, zero_y = self.pitch_ladder(dial_radius, (extended_h / 40) * 0.3)
+        band_top = r.center().y() - attitude_radius
+        p.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        self.blit(p, r.center().x() - zero_x, band_top, ladder,
+                  QRectF(0, zero_y + band_top - horizon_y, ladder.width() / ladder.devicePixelRatio(), attitude_radius * 2))
         p.restore()
 
         # 2) Top Heading Bar with Horizontal Circular Scale
@@ -294,39 +490,14 @@ class EnhancedHUDWidget(QFrame):
         p.drawRoundedRect(scale_rect, 3, 3)
 
         visible_range = 140  
-        center_heading = self.heading
         pixels_per_degree = scale_width / visible_range
-        half_range = visible_range / 2
-        start_degree , end_degree = int(center_heading - half_range) , int(center_heading + half_range)
-
-        for degree in range(start_degree, end_degree + 1):
-            angle = degree % 360
-            rel_angle = ((degree - center_heading + 540) % 360) - 180
-
-            if abs(rel_angle) > half_range:
-                continue
-            x_pos = pointer_x + rel_angle * pixels_per_degree / (visible_range / 360)
-            if x_pos < scale_rect.left() or x_pos > scale_rect.right():
-                continue
-            if angle % 10 == 0: # Major tick
-                p.setPen(QPen(QColor(255, 255, 255), 2))
-                p.drawLine(int(x_pos), scale_rect.top() + 5, int(x_pos), scale_rect.bottom() - 5)
-                p.setFont(QFont("Consolas", 8, QFont.Weight.Bold))
-                label = f"{angle:03d}" if angle > 0 else "000"
-                p.drawText(int(x_pos - 12), scale_rect.top() + 15, 24, 20, Qt.AlignmentFlag.AlignCenter, label)
-            elif angle % 5 == 0:  # Medium tick
-                p.setPen(QPen(QColor(0, 180, 220), 1))
-                p.drawLine(int(x_pos), scale_rect.top() + 5, int(x_pos), scale_rect.bottom() - 5)
-            half_angle = angle + 2.5
-            if half_angle < 360:
-                rel_half_angle = ((half_angle - center_heading + 540) % 360) - 180
-                if abs(rel_half_angle) <= half_range:
-                    x_half = pointer_x + rel_half_angle * pixels_per_degree / (visible_range / 360)
-                    if scale_rect.left() <= x_half <= scale_rect.right():
-                        p.setPen(QPen(QColor(100, 100, 100), 1))
-                        p.drawLine(int(x_half), scale_rect.top() + 8, int(x_half), scale_rect.bottom() - 8)
-
-        digital_heading = f"{int(self.heading):03d}°"
+        tape_scale = pixels_per_degree / (visible_range / 360)
+        tape, margin = self.heading_tape(scale_width, scale_height, tape_scale)
+        # Cut the tape so the current heading sits under the pointer
+        self.blit(p, scale_rect.left(), scale_rect.top(), tape,
+                  QRectF((heading % 360 + margin) * tape_scale - (pointer_x - scale_rect.left()), 0, scale_rect.width(), self.TAPE_HEIGHT))
+
+        digital_heading = f"{int(heading):03d}°"
         p.setFont(QFont("Consolas", 9, QFont.Weight.Bold))
         heading_width = QFontMetrics(p.font()).horizontalAdvance(digital_heading)
         center_x , center_y= int(pointer_x - heading_width/2) , int(scale_rect.top() + 12)
@@ -362,7 +533,7 @@ class EnhancedHUDWidget(QFrame):
         
         p.save()
         p.translate(arc_center_x, arc_center_y)
-        p.rotate(-self.roll)
+        p.rotate(-roll)
         p.translate(-arc_center_x, -arc_center_y)
 
         p.setPen(QPen(QColor(255, 255, 255), 2.5))
@@ -432,51 +603,15 @@ class EnhancedHUDWidget(QFrame):
         p.drawPath(arm_path)
 
         # 4) Enhanced Futuristic Left and Right Bars
-        left_bar_width = 35
-        left_bar_rect = QRect(r.left() + 5, r.top() + 50 + 20 - 40, left_bar_width, r.height() - 50 - 80 + 40)
-        # Right vertical bar (altitude)
-        right_bar_width = 35
-        right_bar_rect = QRect(r.right() - right_bar_width - 10, r.top() + 50 + 20 - 40, right_bar_width,  r.height() - 50 - 80 +40)
-        # Draw advanced backgrounds for bars with multi-layer effect
-        for bar_rect in [left_bar_rect, right_bar_rect]:
-            # Main background
-            p.setPen(QPen(QColor(0, 100, 150, 200), 1))
-            grad = QLinearGradient(QPointF(bar_rect.topLeft()), QPointF(bar_rect.bottomLeft()))
-            grad.setColorAt(0, QColor(0, 30, 60, 190))
-            grad.setColorAt(1, QColor(0, 15, 40, 190))
-            p.setBrush(grad)
-            p.drawRoundedRect(bar_rect, 5, 5)
-            # Draw advanced technical grid lines on the bars
-            p.setPen(QPen(QColor(0, 100, 180, 50), 1, Qt.PenStyle.DotLine))
-            grid_spacing_v = 20
-            for y in range(bar_rect.top(), bar_rect.bottom(), grid_spacing_v):
-                p.drawLine(bar_rect.left() + 2, y, bar_rect.right() - 2, y)     
-            # Vertical center line
-            p.setPen(QPen(QColor(0, 120, 200, 80), 1, Qt.PenStyle.DashLine))
-            p.drawLine( bar_rect.left() + bar_rect.width() // 2,bar_rect.top() + 2,bar_rect.left() + bar_rect.width() // 2,bar_rect.bottom() - 2)           
+        left_bar_rect, right_bar_rect = self.bar_rects(r)
+        # Bar backgrounds and titles, the status bar and the box frames come from one cached layer
+        p.drawPixmap(0, 0, self.cached_layer('chrome', self.size(), lambda layer: self.draw_chrome(layer, r)))
         # Draw left bar content (airspeed) with enhanced styling
-        left_bar_title = "AIRSPEED"
-        left_bar_unit = "m/s"
         left_value_str = f"{self.airspeed:.1f}"
-        # Top Label with neon style
-        p.setFont(QFont("Consolas", 7, QFont.Weight.Bold))
-        label_width = QFontMetrics(p.font()).horizontalAdvance(left_bar_title)
-        title_bg_rect = QRect(left_bar_rect.left() + (left_bar_rect.width() - label_width) // 2 + 5, left_bar_rect.top() - 25, label_width + 20, 20)
-        # Label background with glow effect
-        p.setPen(QPen(QColor(0, 150, 255, 50), 3))
-        p.setBrush(QBrush(QColor(0, 20, 40, 180)))
-        p.drawRoundedRect(title_bg_rect, 5, 5)
-        p.setPen(QPen(QColor(0, 200, 255), 1))
-        p.drawRoundedRect(title_bg_rect, 5, 5)
-        p.setPen(QPen(QColor(0, 220, 255)))
-        p.drawText(title_bg_rect, Qt.AlignmentFlag.AlignCenter, left_bar_title)
         # Define airspeed limits (similar to altitude limits)
         airspeed_max = 50  # Upper limit
         airspeed_min = -50  # Lower limit
-        # Add center line to indicate zero airspeed
         center_y = left_bar_rect.top() + left_bar_rect.height() // 2
-        p.setPen(QPen(QColor(255, 255, 255, 120), 1))
-        p.drawLine(left_bar_rect.left() + 2, center_y, left_bar_rect.right() - 2, center_y)
         # Calculate bar height relative to center
         max_half_height = left_bar_rect.height() // 2
         normalized_speed = max(min(self.airspeed, airspeed_max), airspeed_min)
@@ -549,35 +684,13 @@ class EnhancedHUDWidget(QFrame):
         p.drawRoundedRect(value_rect, 5, 5)
         p.setPen(QPen(QColor(255, 220, 255) if not is_negative else QColor(255, 200, 200)))
         p.drawText(value_rect, Qt.AlignmentFlag.AlignCenter, left_value_str)
-        # Add unit at the bottom
-        unit_font = QFont("Consolas", 8)
-        p.setFont(unit_font)
-        unit_width = QFontMetrics(unit_font).horizontalAdvance(left_bar_unit)
-        unit_rect = QRect(left_bar_rect.left() + (left_bar_rect.width() - unit_width) // 2, left_bar_rect.bottom() + 5, unit_width, 20)
-        p.setPen(QPen(QColor(255, 255, 255), 3))
-        p.drawText(unit_rect, Qt.AlignmentFlag.AlignCenter, left_bar_unit)
         
         # Draw right bar content (altitude) with enhanced styling
-        right_bar_title = "ALTITUDE"
-        right_bar_unit = "m"
         right_value_str = f"{self.altitude:.1f}"
-        # Top Label with neon style
-        p.setFont(QFont("Consolas", 7, QFont.Weight.Bold))
-        label_width = QFontMetrics(p.font()).horizontalAdvance(right_bar_title)
-        title_bg_rect = QRect(right_bar_rect.left() + (right_bar_rect.width() - label_width) // 2 -15,right_bar_rect.top() - 25,label_width + 20,20)
-        p.setPen(QPen(QColor(0, 150, 255, 50), 3))
-        p.setBrush(QBrush(QColor(0, 20, 40, 180)))
-        p.drawRoundedRect(title_bg_rect, 5, 5)
-        p.setPen(QPen(QColor(0, 200, 255), 1))
-        p.drawRoundedRect(title_bg_rect, 5, 5)
-        p.setPen(QPen(QColor(0, 220, 255)))
-        p.drawText(title_bg_rect, Qt.AlignmentFlag.AlignCenter, right_bar_title)
 
         altitude_max , altitude_min = 100 , -100  # Limits
         
-        center_y = right_bar_rect.top() + right_bar_rect.height() // 2 # Add center line to indicate zero altitude
-        p.setPen(QPen(QColor(255, 255, 255, 120), 1))
-        p.drawLine(right_bar_rect.left() + 2, center_y, right_bar_rect.right() - 2, center_y)
+        center_y = right_bar_rect.top() + right_bar_rect.height() // 2
         
         max_half_height = right_bar_rect.height() // 2 # Calculate bar height relative to center
         normalized_alt = max(min(self.altitude, altitude_max), altitude_min)
@@ -635,49 +748,11 @@ class EnhancedHUDWidget(QFrame):
         p.drawRoundedRect(value_rect, 5, 5)
         p.setPen(QPen(QColor(255, 220, 255) if not is_negative else QColor(255, 200, 200)))
         p.drawText(value_rect, Qt.AlignmentFlag.AlignCenter, right_value_str)   
-        unit_font = QFont("Consolas", 8)
-        p.setFont(unit_font)
-        unit_width = QFontMetrics(unit_font).horizontalAdvance(right_bar_unit)
-        unit_rect = QRect(right_bar_rect.left() + (right_bar_rect.width() - unit_width) // 2,right_bar_rect.bottom() + 5,unit_width,20)
-        p.setPen(QPen(QColor(255, 255, 255),3))
-        p.drawText(unit_rect, Qt.AlignmentFlag.AlignCenter, right_bar_unit)
 
         # 5) Bottom Status Bar with Enhanced Design
-        bottom_height = 30
-        bottom_rect = QRect( r.left()+10, r.bottom() - bottom_height,r.width()-20, bottom_height)
-        
-        bottom_gradient = QLinearGradient(QPointF(bottom_rect.left(), bottom_rect.top()),QPointF(bottom_rect.left(), bottom_rect.bottom()))
-        bottom_gradient.setColorAt(0, QColor(10, 20, 30, 220))
-        bottom_gradient.setColorAt(1, QColor(5, 10, 15, 220))
-        p.fillRect(bottom_rect, bottom_gradient)
-        
-        # Add top edge highlight
-        p.setPen(QPen(QColor(0, 200, 255), 1))
-        p.drawLine(bottom_rect.left(), bottom_rect.top(), bottom_rect.right(), bottom_rect.top())
-        
-        # Add subtle grid pattern overlay
-        p.setPen(QPen(QColor(0, 100, 200, 20), 1, Qt.PenStyle.DotLine))
-        grid_spacing = 10
-        for x in range(0, r.width(), grid_spacing):
-            p.drawLine(x, bottom_rect.top(), x, bottom_rect.bottom())
-        
-        # Divide into sections with futuristic separators
+        bottom_rect = self.status_rect(r)
         section_width = bottom_rect.width() / 4
         
-        divider_gradient = QLinearGradient(QPointF(0, bottom_rect.top() + 5),QPointF(0, bottom_rect.bottom() - 5))
-        divider_gradient.setColorAt(0, QColor(0, 150, 200, 0))
-        divider_gradient.setColorAt(0.5, QColor(0, 150, 200, 120))
-        divider_gradient.setColorAt(1, QColor(0, 150, 200, 0))
-        
-        for i in range(1, 4):
-            x_pos = int(bottom_rect.left() + i * section_width)
-            divider_rect = QRect(x_pos - 1, bottom_rect.top() + 5, 2, bottom_rect.height() - 10)
-            p.fillRect(divider_rect, divider_gradient)
-            
-            p.setPen(QPen(QColor(0, 200, 255), 1))
-            p.drawLine(x_pos - 3, bottom_rect.top() + 2, x_pos + 3, bottom_rect.top() + 2)
-            p.drawLine(x_pos - 3, bottom_rect.bottom() - 2, x_pos + 3, bottom_rect.bottom() - 2)
-        
         section_rects = []
         for i in range(4):
             section_rects.append(QRect(int(bottom_rect.left() + i * section_width + 5),bottom_rect.top() + 5,int(section_width - 10),bottom_rect.height() - 10))
@@ -713,20 +788,7 @@ class EnhancedHUDWidget(QFrame):
         p.drawText(section_rects[3], Qt.AlignmentFlag.AlignCenter, alt_text)
         
         # 6) Add Battery Indicator with Enhanced Futuristic Design
-        battery_width  = int(r.width()  * 0.10)
-        battery_height = int(r.height() * 0.075)
-        # position it at 10% from left, 75% from top
-        battery_x = r.left() + int(r.width()  * 0.20)
-        battery_y = r.top()  + int(r.height() * 0.559)
-        battery_rect = QRect(battery_x, battery_y, battery_width, battery_height)
-        
-        # Draw battery background with tech detail
-        p.setPen(QPen(QColor(0, 150, 220, 40), 4))
-        p.setBrush(QBrush(QColor(0, 20, 40, 180)))
-        # p.drawRoundedRect(battery_rect, 8, 8)
-        
-        p.setPen(QPen(QColor(0, 180, 255), 1))
-        p.drawRoundedRect(battery_rect, 8, 8)
+        battery_rect, gps_rect = self.box_rects(r)
         
         # Battery level fill with enhanced styling
         fill_width = int((battery_rect.width() - 10) * (self.battery_percent / 100))
@@ -775,16 +837,6 @@ class EnhancedHUDWidget(QFrame):
         # p.drawText(text_x, text_y + 2*line_height + 2, current_text)
         
         # 7) GPS Status Indicator
-        gps_width  = int(r.width()  * 0.10)
-        gps_height = int(r.height() * 0.075)
-        gps_x = r.right() - gps_width - int(r.width() * 0.20)
-        gps_y = r.top()   + int(r.height() * 0.55)
-        gps_rect = QRect(gps_x, gps_y, gps_width, gps_height)
-        p.setPen(QPen(QColor(0, 150, 220, 40), 4))
-        p.setBrush(QBrush(QColor(0, 20, 40, 180)))
-        p.drawRoundedRect(gps_rect, 8, 8)
-        p.setPen(QPen(QColor(0, 180, 255), 1))
-        p.drawRoundedRect(gps_rect, 8, 8)
         gps_font = QFont("Consolas", 7, QFont.Weight.Bold)
         p.setFont(gps_font)
         if "No GPS" in self.gps_status:
@@ -796,4 +848,10 @@ class EnhancedHUDWidget(QFrame):
         p.setFont(info_font)
         p.setPen(QPen(QColor(255, 255, 255)))
         p.drawText(gps_rect.right() - QFontMetrics(info_font).horizontalAdvance(speed_text) + 7,gps_rect.bottom() + 15,speed_text)
-        draw_futuristic_crosshair(p, r.center().x(), r.center().y())
\ No newline at end of file
+        draw_futuristic_crosshair(p, r.center().x(), r.center().y())
+        p.end()
+        # Drawn as of delay ago, so that lag is on screen too
+        self.latency.painted(self.attitude.delay)
+        if self.attitude.moving(now):
+            # Keep moving between samples, one repaint per frame clock tick
+            request_paint(self)
\ No newline at end of file
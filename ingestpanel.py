@@ -0,0 +1,106 @@
+import time
+from PyQt6.QtWidgets import QFrame, QVBoxLayout, QLabel, QPushButton
+from PyQt6.QtCore import Qt, QTimer
+from latency import TRACER
+
+
+class IngestStatsPanel(QFrame):
+    """Debug overlay listing per-message ingest rates, timings, link loss and
+    receive-to-paint latency per consumer.
+
+    Instrumentation is switched on in the monitoring thread only while the
+    panel is visible, so it costs nothing the rest of the time.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("ingestStatsPanel")
+        self.setStyleSheet("""
+            #ingestStatsPanel {
+                background-color: rgba(5, 10, 20, 220);
+                border-radius: 8px;
+                border: 1px solid rgba(0, 204, 255, 120);
+            }
+        """)
+        self.monitoring_thread = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 8, 10, 8)
+        header = QLabel("INGEST STATS")
+        header.setStyleSheet("color: #00ccff; font-weight: bold; background: transparent; border: none;")
+        layout.addWidget(header)
+        self.body = QLabel()
+        self.body.setStyleSheet("color: #d2e6ff; font-family: Consolas, monospace; font-size: 11px; "
+                                "font-weight: normal; background: transparent; border: none;")
+        self.body.setTextFormat(Qt.TextFormat.PlainText)
+        layout.addWidget(self.body)
+        self.latency_body = QLabel()
+        self.latency_body.setStyleSheet(self.body.styleSheet())
+        self.latency_body.setTextFormat(Qt.TextFormat.PlainText)
+        layout.addWidget(self.latency_body)
+        self.export_button = QPushButton("EXPORT LATENCY CSV")
+        self.export_button.setStyleSheet("color: #00ccff; background-color: rgba(0, 40, 70, 200); "
+                                         "border: 1px solid #0078ff; border-radius: 4px; padding: 3px;")
+        self.export_button.clicked.connect(self.export_latency)
+        layout.addWidget(self.export_button)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def set_monitoring_thread(self, monitoring_thread):
+        self.monitoring_thread = monitoring_thread
+        if self.isVisible():
+            monitoring_thread.enable_stats(True)
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+        if self.monitoring_thread is not None:
+            self.monitoring_thread.enable_stats(self.isVisible())
+        if self.isVisible():
+            self.raise_()
+            self.refresh()
+            self.timer.start(1000)
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        self.refresh_latency()
+        thread = self.monitoring_thread
+        stats = thread.stats if thread is not None else None
+        if stats is None:
+            self.body.setText("No link")
+            self.adjustSize()
+            return
+        snap = stats.snapshot(thread.reader.parse_counters())
+        lines = [f"{'MESSAGE':<22}{'Hz':>7}{'dec us':>9}{'p99':>7}{'hdl us':>9}{'p99':>7}{'queue':>7}{'max':>5}"]
+        for name, m in sorted(snap['messages'].items(), key=lambda item: -item[1]['rate']):
+            lines.append(f"{name[:21]:<22}{m['rate']:>7.1f}{m['decode_us']:>9.1f}{m['decode_p99_us']:>7.0f}"
+                         f"{m['handler_us']:>9.1f}{m['handler_p99_us']:>7.0f}{m['depth_p99']:>7}{m['depth_max']:>5}")
+        lines.append("")
+        # Replays have no parser counters; the ingest process sends its own a moment after enabling
+        for source, link in snap.get('links', {}).items():
+            lines.append(f"link {source:<8} recv {link['received']:>8}  lost {link['lost']:>6}  ({link['loss_pct']:.2f}%)")
+        lines.append(f"batch mean {snap['batch_frames_mean']:.1f} max {snap['batch_frames_max']}"
+                     f"  backlog p99 {snap['backlog_p99']}")
+        if 'bad_crc' in snap:
+            lines.append(f"bad crc {snap['bad_crc']}  skipped {snap['skipped_bytes']}  filtered {snap['filtered']}")
+        self.body.setText("\n".join(lines))
+        self.adjustSize()
+
+    def refresh_latency(self):
+        lines = [f"{'LATENCY ms':<18}{'n':>7}{'p50':>7}{'p95':>7}{'p99':>7}{'max':>7}"]
+        for consumer, stages in TRACER.snapshot().items():
+            for stage, s in stages.items():
+                lines.append(f"{consumer + ' ' + stage:<18}{s['count']:>7}{s['p50_ms']:>7.0f}{s['p95_ms']:>7.0f}"
+                             f"{s['p99_ms']:>7.0f}{s['max_ms']:>7.0f}")
+        self.latency_body.setText("\n".join(lines))
+
+    def export_latency(self):
+        path = time.strftime("latency-%Y%m%d-%H%M%S.csv")
+        try:
+            TRACER.export_csv(path)
+            self.export_button.setText(f"SAVED {path}")
+        except OSError as e:
+            print(f"Error exporting latency CSV: {e}")
+            self.export_button.setText("EXPORT FAILED")
@@ -0,0 +1,350 @@
+import math
+import multiprocessing
+import queue
+import struct
+import time
+from multiprocessing import shared_memory
+from pymavlink import mavutil
+from vehiclestate import FIELDS, ALL, VehicleState
+from mavframe import (MAVLinkFrameParser, FastPathDecoder, COPTER_MODES, MSG_ID_HEARTBEAT,
+                      flying_type_for_mode, frame_source)
+from transport import LinkReader
+from router import RouterConnection, open_connection
+from recorder import TlogRecorder
+
+# Ring header: number of the last record written, then the slot count
+HEADER = struct.Struct('<QQ')
+# One record: seq, sysid, dirty mask, a value and a stamp per field, then seq
+# again. A reader that sees two different seqs caught the writer mid-record.
+RECORD = struct.Struct('<QQQ' + 'd' * (2 * len(FIELDS)) + 'Q')
+RECORD_CAPACITY = 256
+# Seconds between parser counter updates from the ingest process
+COUNTERS_INTERVAL = 1.0
+
+MODE_INDEX = FIELDS.index('mode')
+FLYING_TYPE_INDEX = FIELDS.index('flying_type')
+# Fields that are whole numbers in VehicleState but travel as doubles
+INT_FIELDS = {FIELDS.index(name) for name in ('heading', 'throttle', 'battery', 'waypoint', 'total_waypoints')}
+MODE_CODES = {name: code for code, name in COPTER_MODES.items()}
+
+
+def mode_code(mode):
+    """custom_mode number for a mode name from the fast path"""
+    if mode in MODE_CODES:
+        return MODE_CODES[mode]
+    return int(mode[len("UNKNOWN_"):])
+
+
+class StateRingWriter:
+    """Appends per-vehicle VehicleState frames to a shared-memory ring of fixed-layout records"""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.seq, self.capacity = HEADER.unpack_from(buf)
+
+    def write(self, sysid, frame):
+        values = []
+        for i, name in enumerate(FIELDS):
+            value = getattr(frame, name)
+            if i == MODE_INDEX and value is not None:
+                value = mode_code(value)
+            elif i == FLYING_TYPE_INDEX or value is None:
+                value = math.nan
+            values.append(value)
+        seq = self.seq + 1
+        offset = HEADER.size + (seq % self.capacity) * RECORD.size
+        # Invalidate the trailer first so a reader never pairs new data with an old seq
+        struct.pack_into('<Q', self.buf, offset + RECORD.size - 8, 0)
+        RECORD.pack_into(self.buf, offset, seq, sysid, frame.dirty, *values, *frame.stamps, seq)
+        HEADER.pack_into(self.buf, 0, seq, self.capacity)
+        self.seq = seq
+
+
+class StateRingReader:
+    """Merges records from the shared ring into per-vehicle VehicleStates, in place"""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.last_seq = 0
+        self.capacity = HEADER.unpack_from(buf)[1]
+        self.torn = 0
+        self.known = set()
+        # After records are lost: the vehicles whose next good record has
+        # already been applied in full, None while nothing is lost
+        self.resynced = None
+
+    def pending(self):
+        return HEADER.unpack_from(self.buf)[0] != self.last_seq
+
+    def merge_into(self, state_for):
+        """Apply every record written since the last call.
+
+        state_for(sysid) returns the VehicleState to merge a vehicle's
+        records into. Returns {sysid: combined dirty mask}.
+        """
+        latest = HEADER.unpack_from(self.buf)[0]
+        first = max(self.last_seq + 1, latest - self.capacity + 1)
+        if first > self.last_seq + 1:
+            # Lapped by the writer: the records in between are gone
+            self.lost(first - self.last_seq - 1)
+        masks = {}
+        for seq in range(first, latest + 1):
+            record = RECORD.unpack_from(self.buf, HEADER.size + (seq % self.capacity) * RECORD.size)
+            if record[0] != seq or record[-1] != seq:
+                # Overwritten while we were behind
+                self.lost(1)
+                continue
+            sysid, dirty = record[1], record[2]
+            if self.resynced is not None and sysid not in self.resynced:
+                # Every record carries the whole state, so applying this one
+                # in full restores whatever the lost records changed
+                dirty = ALL
+                self.resynced.add(sysid)
+                if self.resynced >= self.known:
+                    self.resynced = None
+            self.known.add(sysid)
+            state = state_for(sysid)
+            self.apply(state, dirty, record[3:3 + len(FIELDS)], record[3 + len(FIELDS):-1])
+            state.dirty |= dirty
+            masks[sysid] = masks.get(sysid, 0) | dirty
+        self.last_seq = latest
+        return masks
+
+    def lost(self, count):
+        """Records were skipped; their vehicle is unknown, so resync every vehicle"""
+        self.torn += count
+        self.resynced = set()
+
+    def apply(self, state, dirty, values, stamps):
+        for i, name in enumerate(FIELDS):
+            if not dirty & (1 << i) or i == FLYING_TYPE_INDEX:
+                continue
+            value = values[i]
+            if math.isnan(value):
+                value = None
+            elif i == MODE_INDEX:
+                code = int(value)
+                value = COPTER_MODES.get(code, f"UNKNOWN_{code}")
+                state.flying_type = flying_type_for_mode(value)
+                state.stamps[FLYING_TYPE_INDEX] = stamps[i]
+            elif i in INT_FIELDS and value.is_integer():
+                value = int(value)
+            setattr(state, name, value)
+            state.stamps[i] = stamps[i]
+
+
+def ingest_worker(connection_string, shm_name, frame_queue, send_queue, control_queue, status_queue, ready, stop):
+    """Body of the ingest process: own the link, decode the hot types, share the results"""
+    try:
+        conn = open_connection(connection_string)
+    except Exception as e:
+        status_queue.put(('error', str(e)))
+        return
+    shm = shared_memory.SharedMemory(name=shm_name)
+    recorder = None
+    try:
+        writer = StateRingWriter(shm.buf)
+        fast_path = FastPathDecoder()
+        if isinstance(conn, RouterConnection):
+            # The router reads every endpoint; it takes the same filter the parser would
+            reader = conn.reader
+            set_wanted = reader.set_forwarded
+        else:
+            parser = MAVLinkFrameParser()
+            reader = LinkReader(conn, parser)
+
+            def set_wanted(msg_ids):
+                parser.wanted = msg_ids
+        # One state per system ID, so vehicles sharing the link stay apart
+        states = {}
+        # Parser counters go to the GUI side about once a second while its stats panel is open
+        send_counters = False
+        counters_sent = 0.0
+        forwarded = {MSG_ID_HEARTBEAT}
+        set_wanted(set(fast_path.handlers) | forwarded)
+        status_queue.put(('connected', None))
+        while not stop.is_set():
+            try:
+                while True:
+                    command, value = control_queue.get_nowait()
+                    if command == 'stats':
+                        send_counters = value
+                        reader.track_sequences(value)
+                    elif command == 'record' and recorder is None:
+                        # Recorded here, where every frame is read, not just the forwarded ones
+                        try:
+                            recorder = TlogRecorder(value)
+                            reader.set_tap(recorder.record)
+                        except OSError as e:
+                            print(f"Error starting recording {value}: {e}")
+            except queue.Empty:
+                pass
+            try:
+                # Filter changes share this queue with outbound frames, so a reply can't
+                # arrive for a request sent before its type was let through
+                while True:
+                    command, value = send_queue.get_nowait()
+                    if command == 'write':
+                        conn.write(value)
+                    elif command == 'forward':
+                        forwarded = value | {MSG_ID_HEARTBEAT}
+                        set_wanted(set(fast_path.handlers) | forwarded)
+            except queue.Empty:
+                pass
+            if send_counters and time.monotonic() - counters_sent >= COUNTERS_INTERVAL:
+                status_queue.put(('counters', reader.parse_counters()))
+                counters_sent = time.monotonic()
+            try:
+                frames = reader.read_batch(0.02)
+            except Exception as e:
+                print(f"Error reading MAVLink link: {e}")
+                time.sleep(0.1)
+                continue
+            if not frames:
+                continue
+            now = time.monotonic()
+            for msgid, frame in frames:
+                try:
+                    if fast_path.handles(msgid):
+                        sysid = frame_source(frame)[0]
+                        state = states.get(sysid)
+                        if state is None:
+                            state = states[sysid] = VehicleState()
+                        fast_path.decode(msgid, frame, state, now)
+                    if msgid in forwarded:
+                        frame_queue.put((msgid, bytes(frame)))
+                except Exception as e:
+                    print(f"Error decoding message {msgid}: {e}")
+            for sysid, state in states.items():
+                if state.dirty:
+                    writer.write(sysid, state.frame())
+            ready.set()
+    finally:
+        if recorder is not None:
+            recorder.close()
+        shm.close()
+        conn.close()
+
+
+class RemoteReader:
+    """Stands in for LinkReader when the link lives in the ingest process.
+
+    read_batch() returns the raw frames the ingest process forwards (the
+    types this side decodes with pymavlink); merge_into() folds the
+    telemetry the process already decoded into local VehicleStates.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.ring = StateRingReader(connection.shm.buf)
+        self.counters = None
+
+    def read_batch(self, timeout):
+        conn = self.connection
+        conn.ready.clear()
+        if conn.frame_queue.empty() and not self.ring.pending():
+            conn.ready.wait(timeout)
+        frames = []
+        try:
+            while True:
+                frames.append(conn.frame_queue.get_nowait())
+        except queue.Empty:
+            pass
+        return frames
+
+    def merge_into(self, state_for):
+        return self.ring.merge_into(state_for)
+
+    def backlog(self):
+        """Forwarded frames still queued from the ingest process"""
+        try:
+            return self.connection.frame_queue.qsize()
+        except NotImplementedError:
+            return 0
+
+    def set_forwarded(self, msg_ids):
+        self.connection.send_queue.put(('forward', set(msg_ids)))
+
+    def track_sequences(self, enabled):
+        """Have the ingest process track sequences and send its parser counters, or stop"""
+        self.counters = None
+        self.connection.control_queue.put(('stats', enabled))
+
+    def parse_counters(self):
+        """The latest parser counters the ingest process sent, None until the first arrives"""
+        try:
+            while True:
+                kind, value = self.connection.status_queue.get_nowait()
+                if kind == 'counters':
+                    self.counters = value
+        except queue.Empty:
+            pass
+        return self.counters
+
+    def record(self, path):
+        """Have the ingest process record every frame it reads to a tlog at path"""
+        self.connection.control_queue.put(('record', path))
+
+
+class RemoteConnection:
+    """GUI-side handle on a MAVLink link owned by a separate ingest process.
+
+    Provides the parts of a pymavlink connection the monitoring thread
+    uses: mav for encoding and decoding, target ids, post_message and
+    close. Anything sent through mav is queued to the ingest process,
+    which writes it to the real link.
+    """
+
+    def __init__(self, connection_string, source_system=255, source_component=0):
+        self.address = connection_string
+        self.target_system = 0
+        self.target_component = 0
+        self.messages = {}
+        self.mav = mavutil.mavlink.MAVLink(self, srcSystem=source_system, srcComponent=source_component)
+        self.process = None
+        self.shm = None
+
+    def start(self, timeout):
+        """Spawn the ingest process and wait until it has opened the link"""
+        # spawn, not fork: the parent holds Qt state that must not be forked
+        ctx = multiprocessing.get_context('spawn')
+        self.shm = shared_memory.SharedMemory(create=True, size=HEADER.size + RECORD_CAPACITY * RECORD.size)
+        HEADER.pack_into(self.shm.buf, 0, 0, RECORD_CAPACITY)
+        self.frame_queue = ctx.Queue()
+        self.send_queue = ctx.Queue()
+        self.control_queue = ctx.Queue()
+        self.status_queue = ctx.Queue()
+        self.ready = ctx.Event()
+        self.stop_event = ctx.Event()
+        self.process = ctx.Process(target=ingest_worker, name="mavlink-ingest", daemon=True,
+                                   args=(self.address, self.shm.name, self.frame_queue, self.send_queue,
+                                         self.control_queue, self.status_queue, self.ready, self.stop_event))
+        self.process.start()
+        try:
+            status, error = self.status_queue.get(timeout=timeout)
+        except queue.Empty:
+            self.close()
+            raise ConnectionError(f"Ingest process did not connect to {self.address}")
+        if status == 'error':
+            self.close()
+            raise ConnectionError(error)
+        self.reader = RemoteReader(self)
+
+    def write(self, buf):
+        self.send_queue.put(('write', bytes(buf)))
+
+    def post_message(self, msg):
+        self.messages[msg.get_type()] = msg
+
+    def close(self):
+        if self.process is not None:
+            self.stop_event.set()
+            self.process.join(2)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        if self.shm is not None:
+            self.reader = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
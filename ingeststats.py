@@ -0,0 +1,145 @@
+import time
+from pymavlink import mavutil
+
+BUCKETS = 40   # log2 buckets: bucket n holds values in [2**(n-1), 2**n)
+
+
+class Histogram:
+    """Log2-bucketed histogram of non-negative integers (nanoseconds, counts)"""
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.buckets[min(value.bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return 0
+        target = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(1 << i, self.max) if i else 0
+        return self.max
+
+
+class MessageStats:
+    __slots__ = ('count', 'bytes', 'decode', 'handler', 'depth', 'last_count')
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.decode = Histogram()
+        self.handler = Histogram()
+        # Frames of this type waiting in each batch that had any
+        self.depth = Histogram()
+        self.last_count = 0
+
+
+class IngestStats:
+    """Counters and timing histograms for the ingest path, per message ID.
+
+    The reader thread calls record() once per processed frame and batch()
+    once per read. Only integer adds happen on that path; rates, means and
+    percentiles are worked out in snapshot(), which any thread may call.
+    Sequence loss and parse errors are counted by whichever parser reads
+    the link and passed in to snapshot() as the reader's parse_counters().
+    """
+
+    def __init__(self):
+        self.messages = {}
+        self.batch_frames = Histogram()
+        self.backlog = Histogram()
+        self.started = time.monotonic()
+        self.last_snapshot = self.started
+
+    def message(self, msgid):
+        stats = self.messages.get(msgid)
+        if stats is None:
+            stats = self.messages[msgid] = MessageStats()
+        return stats
+
+    def record(self, msgid, size, decode_ns, handler_ns):
+        stats = self.message(msgid)
+        stats.count += 1
+        stats.bytes += size
+        stats.decode.add(decode_ns)
+        stats.handler.add(handler_ns)
+
+    def batch(self, frames, backlog):
+        """One read of (msgid, frame) pairs, with the reader's backlog after it"""
+        self.batch_frames.add(len(frames))
+        self.backlog.add(backlog)
+        depths = {}
+        for msgid, _ in frames:
+            depths[msgid] = depths.get(msgid, 0) + 1
+        for msgid, depth in depths.items():
+            self.message(msgid).depth.add(depth)
+
+    def snapshot(self, counters=None):
+        """Plain-dict view of everything collected so far, with rates since the previous call.
+
+        counters is a reader's parse_counters(); without them there are no
+        'links', 'bad_crc', 'skipped_bytes' or 'filtered' entries.
+        """
+        now = time.monotonic()
+        elapsed = max(now - self.last_snapshot, 1e-6)
+        self.last_snapshot = now
+        messages = {}
+        for msgid, stats in list(self.messages.items()):
+            cls = mavutil.mavlink.mavlink_map.get(msgid)
+            count = stats.count
+            messages[cls.msgname if cls else str(msgid)] = {
+                'msgid': msgid,
+                'count': count,
+                'rate': (count - stats.last_count) / elapsed,
+                'bytes': stats.bytes,
+                'decode_us': stats.decode.mean() / 1000.0,
+                'decode_p99_us': stats.decode.percentile(0.99) / 1000.0,
+                'handler_us': stats.handler.mean() / 1000.0,
+                'handler_p99_us': stats.handler.percentile(0.99) / 1000.0,
+                'depth_p99': stats.depth.percentile(0.99),
+                'depth_max': stats.depth.max,
+            }
+            stats.last_count = count
+        snapshot = {
+            'uptime': now - self.started,
+            'messages': messages,
+            'batch_frames_mean': self.batch_frames.mean(),
+            'batch_frames_max': self.batch_frames.max,
+            'backlog_p99': self.backlog.percentile(0.99),
+        }
+        if counters is not None:
+            links = {}
+            for (sysid, compid), (received, lost, _) in counters['links'].items():
+                total = received + lost
+                links[f"{sysid}:{compid}"] = {
+                    'received': received,
+                    'lost': lost,
+                    'loss_pct': 100.0 * lost / total if total else 0.0,
+                }
+            snapshot['links'] = links
+            snapshot['bad_crc'] = counters['bad_crc']
+            snapshot['skipped_bytes'] = counters['skipped_bytes']
+            snapshot['filtered'] = counters['filtered']
+        return snapshot
+
+    def reset(self):
+        self.messages.clear()
+        self.batch_frames = Histogram()
+        self.backlog = Histogram()
+        self.started = self.last_snapshot = time.monotonic()
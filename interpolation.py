@@ -0,0 +1,117 @@
+import collections
+import time
+import vehiclestate as vs
+
+# Render this far behind the clock. At 0 every paint extrapolates from the newest
+# sample; a little delay (--render-delay=) gives smoother motion on jittery links
+# at the cost of that much display lag
+DELAY = 0.0
+# Past the newest sample the last rate carries on this long, then the value holds
+MAX_EXTRAPOLATION = 0.25
+# A gap this long or a change this fast starts the track over instead of being drawn as motion
+STALE_AFTER = 1.0
+MAX_RATE = 720.0   # degrees per second
+
+
+class SampleTrack:
+    """Recent time-stamped samples of one angle, read back at any render time.
+
+    Between samples the value is interpolated linearly; past the newest
+    it is extrapolated at the last rate for at most MAX_EXTRAPOLATION and
+    then held. With wrap=360 samples are unwrapped on the way in, so 359
+    to 1 is a two degree turn, and value_at() wraps the result again.
+    """
+
+    def __init__(self, wrap=None):
+        self.wrap = wrap
+        self.samples = collections.deque(maxlen=3)
+
+    def add(self, stamp, value):
+        samples = self.samples
+        if samples:
+            last_stamp, last_value = samples[-1]
+            if self.wrap:
+                value = last_value + (value - last_value + self.wrap / 2) % self.wrap - self.wrap / 2
+            dt = stamp - last_stamp
+            if dt <= 0:
+                # Same reading again, or a clock step: keep the newest value
+                samples[-1] = (last_stamp, value)
+                return
+            if dt > STALE_AFTER or abs(value - last_value) > MAX_RATE * dt:
+                # Lost link or a replay seek: jump, don't sweep
+                samples.clear()
+        samples.append((stamp, value))
+
+    def value_at(self, t):
+        """Value at monotonic time t, None before the first sample"""
+        samples = self.samples
+        if not samples:
+            return None
+        value = self.raw_value_at(t)
+        return value % self.wrap if self.wrap else value
+
+    def raw_value_at(self, t):
+        samples = list(self.samples)
+        if t <= samples[0][0]:
+            return samples[0][1]
+        for (t0, v0), (t1, v1) in zip(samples, samples[1:]):
+            if t <= t1:
+                return v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+        newest_stamp, newest_value = samples[-1]
+        if len(samples) == 1:
+            return newest_value
+        before_stamp, before_value = samples[-2]
+        rate = (newest_value - before_value) / (newest_stamp - before_stamp)
+        return newest_value + rate * min(t - newest_stamp, MAX_EXTRAPOLATION)
+
+    def settles_at(self):
+        """Time after which value_at() stops changing until the next sample"""
+        return self.samples[-1][0] + MAX_EXTRAPOLATION if self.samples else 0.0
+
+
+class AttitudeInterpolator:
+    """Roll, pitch and heading at display rate from telemetry at link rate.
+
+    update() takes the VehicleState frames the monitoring thread emits
+    and keeps each field's samples at their receive stamps. at() reads
+    them back delay seconds behind the given time (DELAY by default), so a
+    widget repainting every frame clock tick moves smoothly between 4-10 Hz
+    attitude updates. pitch_scale multiplies pitch on the way in, for
+    widgets that draw it scaled.
+    """
+
+    def __init__(self, pitch_scale=1.0, delay=None):
+        self.pitch_scale = pitch_scale
+        self.delay = DELAY if delay is None else delay
+        self.roll = SampleTrack()
+        self.pitch = SampleTrack()
+        self.heading = SampleTrack(wrap=360)
+
+    def update(self, frame):
+        dirty = frame.dirty
+        if dirty & vs.ROLL and frame.roll is not None:
+            self.roll.add(frame.stamp(vs.ROLL), frame.roll)
+        if dirty & vs.PITCH and frame.pitch is not None:
+            self.pitch.add(frame.stamp(vs.PITCH), frame.pitch * self.pitch_scale)
+        if dirty & vs.HEADING and frame.heading is not None:
+            self.heading.add(frame.stamp(vs.HEADING), frame.heading)
+
+    def at(self, now=None):
+        """(roll, pitch, heading) to draw at monotonic time now; None for fields never received"""
+        if now is None:
+            now = time.monotonic()
+        t = now - self.delay
+        return self.roll.value_at(t), self.pitch.value_at(t), self.heading.value_at(t)
+
+    def moving(self, now=None):
+        """True while at() still changes between samples, so the widget should keep repainting"""
+        if now is None:
+            now = time.monotonic()
+        t = now - self.delay
+        return any(t < track.settles_at() for track in (self.roll, self.pitch, self.heading))
+
+
+def set_default_delay(seconds):
+    """Render delay for interpolators made from now on"""
+    global DELAY
+    DELAY = max(0.0, seconds)
@@ -0,0 +1,124 @@
+import csv
+import threading
+import time
+
+BUCKET_MS = 1
+MAX_MS = 2000
+
+
+class LatencyHistogram:
+    """Latencies in 1 ms buckets up to 2 s, plus an overflow bucket"""
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * (MAX_MS // BUCKET_MS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000.0
+        self.buckets[min(int(ms) // BUCKET_MS, len(self.buckets) - 1)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        """Latency in ms below which the given fraction of samples fall"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min((i + 1) * BUCKET_MS, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max,
+        }
+
+
+class LatencyTracer:
+    """Receive-to-consumer latency histograms, per consumer and per stage.
+
+    Stamps are the time.monotonic() at which the monitoring thread read
+    the frame off the link (VehicleState.stamps). Stages so far:
+        emit     the monitoring thread handed the frame to Qt
+        deliver  the consumer's slot ran on the GUI thread
+        paint    the consumer finished painting the new values
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+
+    def record(self, consumer, stage, stamp, now=None):
+        if now is None:
+            now = time.monotonic()
+        key = (consumer, stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        histogram.add(max(0.0, now - stamp))
+
+    def snapshot(self):
+        """{consumer: {stage: summary dict}}"""
+        result = {}
+        with self._lock:
+            items = list(self.histograms.items())
+        for (consumer, stage), histogram in sorted(items):
+            result.setdefault(consumer, {})[stage] = histogram.summary()
+        return result
+
+    def export_csv(self, path):
+        fields = ['count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['consumer', 'stage'] + fields)
+            for consumer, stages in self.snapshot().items():
+                for stage, summary in stages.items():
+                    writer.writerow([consumer, stage] + [round(summary[field], 3) for field in fields])
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+
+# One tracer for the whole app; every consumer records into it
+TRACER = LatencyTracer()
+
+
+class PaintTrace:
+    """Carries a frame's receive stamp from a consumer's slot to its next paint.
+
+    When several frames arrive before one paint, the oldest stamp is kept,
+    so the paint latency is that of the stalest value on screen.
+    """
+
+    def __init__(self, consumer, tracer=TRACER):
+        self.consumer = consumer
+        self.tracer = tracer
+        self.stamp = None
+
+    def delivered(self, stamp):
+        if not stamp:
+            return
+        self.tracer.record(self.consumer, 'deliver', stamp)
+        if self.stamp is None or stamp < self.stamp:
+            self.stamp = stamp
+
+    def painted(self, behind=0.0):
+        """The new values are on screen; behind is how far in the past the paint showed them"""
+        if self.stamp is not None:
+            self.tracer.record(self.consumer, 'paint', self.stamp - behind)
+            self.stamp = None
@@ -1,15 +1,39 @@
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, 
-                           QPushButton, QLabel, QDialog, QGraphicsOpacityEffect)
-from PyQt6.QtGui import QPalette, QColor, QLinearGradient, QBrush, QPixmap, QPainter, QFont, QRadialGradient
+                           QPushButton, QLabel, QDialog, QGraphicsOpacityEffect, QComboBox)
+from PyQt6.QtGui import QPalette, QColor, QLinearGradient, QBrush, QPixmap, QPainter, QFont, QRadialGradient, QShortcut, QKeySequence
 from PyQt6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QPoint, QRect, QSize, QVariantAnimation, pyqtProperty ,  QThread, pyqtSignal
 from telemetry import TelemetryWidget
 from hud import EnhancedHUDWidget
 from messages import MessagesWidget
 from map_widget import MapWidget
 from gauges import GaugesWidget
+from ingestpanel import IngestStatsPanel
 from pymavlink import mavutil
 from threadentities import MonitoringThread , ConnectionThread
+from recorder import default_recording_path
+from replaybar import ReplayBar
+from replay import ReplayConnection
+from frameclock import frame_clock
+from interpolation import set_default_delay
+
+# Run the MAVLink link in its own process so heavy repaints can't stall ingestion
+OUT_OF_PROCESS_INGEST = "--ingest-process" in sys.argv
+# Links to open, e.g. --endpoint=tcp:127.0.0.1:5763 --endpoint=udpin:0.0.0.0:14550
+# --endpoint=/dev/ttyUSB0,57600; with more than one, traffic is routed between them
+ENDPOINTS = [arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--endpoint=")]
+# Probe the --endpoint addresses (or SITL, UDP 14550 and serial ports) all at once and take the first with a vehicle
+AUTOCONNECT = "--autoconnect" in sys.argv
+# Record every raw frame to a tlog: --record (into ./recordings) or --record=DIR; --zstd compresses it
+RECORD_DIR = next((arg.partition("=")[2] or "recordings" for arg in sys.argv
+                   if arg == "--record" or arg.startswith("--record=")), None)
+RECORD_ZSTD = "--zstd" in sys.argv
+# Play a recorded tlog back instead of connecting: --replay=flight.tlog
+REPLAY_PATH = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--replay=")), None)
+# Cap the HUD and gauge repaint rate below the display's, e.g. --max-fps=30 on low-power laptops
+MAX_FPS = next((float(arg.split("=", 1)[1]) for arg in sys.argv if arg.startswith("--max-fps=")), None)
+# Draw HUD attitude this many seconds behind the clock for smoother motion, e.g. --render-delay=0.05
+RENDER_DELAY = next((float(arg.split("=", 1)[1]) for arg in sys.argv if arg.startswith("--render-delay=")), None)
 
 class FuturisticDialog(QDialog):
     def __init__(self, parent=None, success=True, connecting=False, show_button=False):
@@ -348,6 +372,16 @@ class BlueHorizon(QMainWindow):
         title_layout.addSpacing(10)
         title_layout.addWidget(connect_btn)
         
+        # Vehicle selector, shown once more than one vehicle shares the link
+        self.vehicle_selector = QComboBox()
+        self.vehicle_selector.setObjectName("vehicleSelector")
+        self.vehicle_selector.setFixedHeight(20)
+        self.vehicle_selector.setToolTip("Focused vehicle")
+        self.vehicle_selector.hide()
+        self.vehicle_selector.activated.connect(self.select_vehicle)
+        title_layout.addSpacing(10)
+        title_layout.addWidget(self.vehicle_selector)
+        
         # Add stretch to push minimize/close buttons to the right
         title_layout.addStretch()
         
@@ -385,7 +419,14 @@ class BlueHorizon(QMainWindow):
         self.connecting_dialog.show()
         
         # Create and start connection thread
-        self.connection_thread = ConnectionThread("tcp:127.0.0.1:5763", 10)
+        if REPLAY_PATH:
+            self.connection_thread = ConnectionThread(REPLAY_PATH, 10, replay=True)
+        elif AUTOCONNECT:
+            self.connection_thread = ConnectionThread(ENDPOINTS or None, 10, out_of_process=OUT_OF_PROCESS_INGEST,
+                                                      autoconnect=True)
+        else:
+            self.connection_thread = ConnectionThread(ENDPOINTS or ["tcp:127.0.0.1:5763"], 10,
+                                                      out_of_process=OUT_OF_PROCESS_INGEST)
         self.connection_thread.connection_result.connect(self.handle_connection_result)
         self.connection_thread.start()
         
@@ -402,14 +443,26 @@ class BlueHorizon(QMainWindow):
             dialog = FuturisticDialog(self, success=True, show_button=False)
             dialog.exec()
             
-            self.monitoring_thread = MonitoringThread(self.mavlink_connection)
+            replaying = isinstance(self.mavlink_connection, ReplayConnection)
+            record_path = default_recording_path(RECORD_DIR, RECORD_ZSTD) if RECORD_DIR and not replaying else None
+            self.monitoring_thread = MonitoringThread(self.mavlink_connection, snapshot_rate=30, record_path=record_path)
             
             self.monitoring_thread.data_updated.connect(self.telemetry.update_from_telemetry)
             self.monitoring_thread.data_updated.connect(self.hud.update_hud)
-            self.messages.connect_to_mavlink(self.mavlink_connection)
+            self.messages.connect_to_bus(self.monitoring_thread.bus)
             self.gauges.connect_monitoring_thread(self.monitoring_thread)
             self.monitoring_thread.data_updated.connect(self.map.update_from_telemetry)
+            self.monitoring_thread.mission_progress.connect(self.update_mission_progress)
+            self.monitoring_thread.waypoints_updated.connect(self.update_waypoints)
+            self.monitoring_thread.vehicles_changed.connect(self.update_vehicles)
+            self.monitoring_thread.vehicle_focused.connect(self.show_focused_vehicle)
+            self.monitoring_thread.track_replaced.connect(self.map.set_track)
+            self.ingest_panel.set_monitoring_thread(self.monitoring_thread)
+            for widget in (self.hud, self.telemetry, self.map, self.gauges):
+                self.monitoring_thread.stream_rates.request(widget, widget.STREAM_RATES)
             self.monitoring_thread.start()
+            if replaying:
+                self.replay_bar.attach(self.mavlink_connection.reader)
         else:
             # If failed, result is the exception
             print(f"Connection failed: {result}")
@@ -418,11 +471,40 @@ class BlueHorizon(QMainWindow):
             dialog = FuturisticDialog(self, success=False, show_button=False)
             dialog.exec()
 
+    def toggle_ingest_panel(self):
+        self.ingest_panel.toggle()
+        self.ingest_panel.move(self.width() - self.ingest_panel.width() - 20, 60)
+
+    def update_vehicles(self, sysids):
+        """Refill the vehicle selector with every system ID on the link"""
+        focused = self.vehicle_selector.currentData()
+        self.vehicle_selector.clear()
+        for sysid in sysids:
+            self.vehicle_selector.addItem(f"VEHICLE {sysid}", sysid)
+        if focused is not None:
+            self.vehicle_selector.setCurrentIndex(self.vehicle_selector.findData(focused))
+        self.vehicle_selector.setVisible(len(sysids) > 1)
+
+    def select_vehicle(self, index):
+        sysid = self.vehicle_selector.itemData(index)
+        if sysid is not None and getattr(self, 'monitoring_thread', None):
+            self.monitoring_thread.set_focus(sysid)
+
+    def show_focused_vehicle(self, sysid):
+        """The monitoring thread switched vehicles; the next frame carries its full state"""
+        self.vehicle_selector.setCurrentIndex(self.vehicle_selector.findData(sysid))
+        self.map.clear_track()
+
+    def update_mission_progress(self, received, total):
+        """Report the start and end of a mission download in the messages panel"""
+        if received == 1:
+            self.messages.add_message(6, f"Downloading mission: {total} items")
+        if received == total:
+            self.messages.add_message(6, f"Mission downloaded: {total} items")
+
     def update_waypoints(self, waypoints):
         """Update waypoints on the map when received from vehicle"""
-        if waypoints:
-            self.map.add_waypoints(waypoints)
-            self.map.fit_waypoints()
+        self.map.add_waypoints(waypoints)
 
     def title_bar_mouse_press(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -496,7 +578,14 @@ class BlueHorizon(QMainWindow):
 
         main_layout.setContentsMargins(2, 2, 2, 2)
         root_layout.addWidget(content_widget)
+        self.replay_bar = ReplayBar()
+        root_layout.addWidget(self.replay_bar)
         self.apply_widget_styles()
+
+        # F12: per-message ingest rates and timings, for chasing a laggy HUD
+        self.ingest_panel = IngestStatsPanel(self)
+        self.ingest_shortcut = QShortcut(QKeySequence("F12"), self)
+        self.ingest_shortcut.activated.connect(self.toggle_ingest_panel)
     
     def apply_cyberpunk_theme(self):
         palette = QPalette()
@@ -564,6 +653,15 @@ class BlueHorizon(QMainWindow):
             QPushButton#connectBtn:pressed {
                 background-color: #0050aa;
             }
+            QComboBox#vehicleSelector {
+                background-color: rgba(30, 40, 80, 180);
+                border: 1px solid #0078ff;
+                border-radius: 3px;
+                font-weight: bold;
+                color: #d2e6ff;
+                font-size: 10px;
+                padding: 0 6px;
+            }
             QPushButton#minimizeBtn, QPushButton#closeBtn {
                 background-color: rgba(30, 40, 80, 180);
                 border: 1px solid #1e3060;
@@ -618,12 +716,24 @@ class BlueHorizon(QMainWindow):
         """
         self.setStyleSheet(self.styleSheet() + widget_styles)
 
+    def closeEvent(self, event):
+        """Stop reading and release the link (and the ingest process, if any)"""
+        self.replay_bar.detach()
+        if getattr(self, 'monitoring_thread', None):
+            self.monitoring_thread.stop()
+        if self.mavlink_connection is not None:
+            self.mavlink_connection.close()
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     font = app.font()
     font.setFamily("Segoe UI")
     app.setFont(font)
+    frame_clock().set_max_fps(MAX_FPS)
+    if RENDER_DELAY is not None:
+        set_default_delay(RENDER_DELAY)
     window = BlueHorizon()
     window.showMaximized()
     sys.exit(app.exec())
\ No newline at end of file
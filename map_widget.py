@@ -311,9 +311,14 @@ from PyQt6.QtWidgets import QFrame, QVBoxLayout, QLabel, QStackedLayout, QWidget
 from PyQt6.QtCore import Qt, QUrl, pyqtSlot
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWebEngineCore import QWebEngineSettings
+import vehiclestate as vs
+from latency import PaintTrace
 
 
 class MapWidget(QFrame):
+    # Telemetry rates (Hz) this widget needs, see streamrates.py
+    STREAM_RATES = {'GLOBAL_POSITION_INT': 5, 'MISSION_CURRENT': 1}
+
     def __init__(self):
         super().__init__()
         self.setFrameStyle(QFrame.Shape.Box | QFrame.Shadow.Plain)
@@ -321,6 +326,8 @@ class MapWidget(QFrame):
         self.current_waypoint_index = 0
         self.covered_path_points = []
         self.home_position = None
+        # Traced until Leaflet has run the position update script
+        self.latency = PaintTrace('map')
         self.setup_ui()
         
     def setup_ui(self):
@@ -527,6 +534,19 @@ class MapWidget(QFrame):
                     });
                 }
                 
+                // Function to drop the flown track, e.g. when another vehicle is shown
+                window.clearTrack = function() {
+                    coveredPath.setLatLngs([]);
+                }
+                
+                // Function to replace the flown track, e.g. after seeking a replay
+                window.setTrack = function(points) {
+                    coveredPath.setLatLngs(points);
+                    if (points.length) {
+                        droneMarker.setLatLng(points[points.length - 1]);
+                    }
+                }
+                
                 // Function to set home position
                 window.setHomePosition = function(lat, lng) {
                     homePosition = [lat, lng];
@@ -568,11 +588,13 @@ class MapWidget(QFrame):
                     });
                     
                     // Update planned path
+                    plannedPath.setLatLngs(waypoints);
                     if (waypoints.length > 0) {
-                        plannedPath.setLatLngs(waypoints);
-                        
                         // Update home connections
                         updateHomeConnections();
+                    } else {
+                        homeToFirstWaypoint.setLatLngs([]);
+                        homeToLastWaypoint.setLatLngs([]);
                     }
                 }
                 
@@ -644,28 +666,40 @@ class MapWidget(QFrame):
         """
         self.web_view.page().runJavaScript(js)
     
-    @pyqtSlot(dict)
-    def update_from_telemetry(self, data):
+    @pyqtSlot(object)
+    def update_from_telemetry(self, frame):
         """Update map with telemetry data"""
-        if 'lat' in data and 'lon' in data:
+        dirty = frame.dirty
+        if dirty & vs.POSITION:
+            self.latency.delivered(frame.oldest_stamp(dirty & vs.POSITION))
             # Update drone position on map
-            self.update_drone_position(data['lat'], data['lon'])
+            self.update_drone_position(frame.lat, frame.lon)
             
             # Add current position to covered path
-            self.covered_path_points.append({'lat': data['lat'], 'lon': data['lon']})
+            self.covered_path_points.append({'lat': frame.lat, 'lon': frame.lon})
             
             # Update current waypoint if available
-            if 'waypoint' in data:
-                self.set_current_waypoint(data['waypoint'])
+            if dirty & vs.WAYPOINT:
+                self.set_current_waypoint(frame.waypoint)
                 
         # Check for home position updates
-        if 'home_lat' in data and 'home_lon' in data:
-            self.set_home_position(data['home_lat'], data['home_lon'])
+        if dirty & vs.HOME:
+            self.set_home_position(frame.home_lat, frame.home_lon)
     
     def update_drone_position(self, lat, lon):
         """Update the drone position on the map"""
         js = f"window.updateDronePosition({lat}, {lon});"
-        self.web_view.page().runJavaScript(js)
+        self.web_view.page().runJavaScript(js, lambda result: self.latency.painted())
+    
+    def clear_track(self):
+        """Forget the covered path, e.g. when switching to another vehicle"""
+        self.covered_path_points = []
+        self.web_view.page().runJavaScript("window.clearTrack();")
+    
+    def set_track(self, points):
+        """Replace the covered path with [lat, lon] points, e.g. after seeking a replay"""
+        self.covered_path_points = [{'lat': lat, 'lon': lon} for lat, lon in points]
+        self.web_view.page().runJavaScript(f"window.setTrack({points});")
     
     def set_home_position(self, lat, lon):
         """Set the home position on the map"""
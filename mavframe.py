@@ -0,0 +1,313 @@
+import math
+import struct
+from pymavlink import mavutil
+from pymavlink.generator.mavcrc import x25crc
+import vehiclestate as vs
+
+STX_V1 = 0xFE
+STX_V2 = 0xFD
+HEADER_LEN_V1 = 6
+HEADER_LEN_V2 = 10
+SIGNATURE_LEN = 13
+IFLAG_SIGNED = 0x01
+
+MSG_ID_HEARTBEAT = 0
+MSG_ID_SYS_STATUS = 1
+MSG_ID_GPS_RAW_INT = 24
+MSG_ID_ATTITUDE = 30
+MSG_ID_GLOBAL_POSITION_INT = 33
+MSG_ID_VFR_HUD = 74
+
+COPTER_MODES = {0: "STABILIZE", 1: "ACRO", 2: "ALT_HOLD", 3: "AUTO", 4: "GUIDED", 5: "LOITER", 6: "RTL", 7: "CIRCLE", 8: "POSITION", 9: "LAND", 10: "OF_LOITER",
+                11: "DRIFT", 12: "SPORT", 13: "FLIP", 14: "AUTOTUNE", 15: "POSHOLD", 16: "BRAKE", 17: "THROW", 18: "AVOID_ADSB", 19: "GUIDED_NOGPS",
+                20: "SMART_RTL", 21: "FLOWHOLD", 22: "FOLLOW", 23: "ZIGZAG", 24: "SYSTEMID", 25: "AUTOROTATE", 26: "AUTO_RTL"}
+
+# MAV_TYPE values whose heartbeats never come from the vehicle itself
+NON_VEHICLE_TYPES = (6, 18, 26, 27)   # GCS, ONBOARD_CONTROLLER, GIMBAL, ADSB
+
+
+def is_vehicle_heartbeat(compid, fields):
+    """Whether an unpacked HEARTBEAT came from a vehicle's autopilot rather than a GCS or peripheral"""
+    # compid 154 is a gimbal; autopilot 8 is MAV_AUTOPILOT_INVALID
+    return compid != 154 and fields[1] not in NON_VEHICLE_TYPES and fields[2] != 8
+
+
+def flying_type_for_mode(mode):
+    if mode in ["AUTO", "GUIDED", "RTL", "SMART_RTL", "AUTO_RTL"]:
+        return "Auto"
+    elif mode in ["LOITER", "CIRCLE", "POSHOLD"]:
+        return "Assisted"
+    return "Manual"
+
+
+def msg_ids_for(msg_types):
+    """Message IDs in the current dialect for a collection of message type names"""
+    ids = set()
+    for msgid, cls in mavutil.mavlink.mavlink_map.items():
+        if cls.msgname in msg_types:
+            ids.add(msgid)
+    return ids
+
+
+def frame_msgid(frame):
+    """Message ID from a raw v1 or v2 frame header"""
+    if frame[0] == STX_V2:
+        return frame[7] | (frame[8] << 8) | (frame[9] << 16)
+    return frame[5]
+
+
+def frame_source(frame):
+    """(sysid, compid, seq) from a raw v1 or v2 frame header"""
+    if frame[0] == STX_V2:
+        return frame[5], frame[6], frame[4]
+    return frame[3], frame[4], frame[2]
+
+
+class MAVLinkFrameParser:
+    """Splits a raw byte stream into complete MAVLink v1/v2 frames.
+
+    Bytes live in one preallocated bytearray ring: a reader fills the
+    space returned by writable() and calls commit(), then frames() pulls
+    every complete frame out in one pass. Frames are memoryview slices of
+    the ring and are only valid until the next writable()/feed() call.
+
+    Frames whose message ID is in the dialect are CRC checked here; a bad
+    CRC means we locked onto a stray start byte, so we resync one byte on.
+    When wanted is a set of message IDs, any other frame is dropped straight
+    from its header, without a CRC check, a copy or a decode.
+    When tap is set it is handed every frame, filtered or not, e.g. to
+    record the link; like the returned frames, it must copy what it keeps.
+    """
+
+    def __init__(self, wanted=None, size=65536):
+        self.ring = bytearray(size)
+        self.view = memoryview(self.ring)
+        self.start = 0
+        self.end = 0
+        self.crc_extra = {msgid: cls.crc_extra for msgid, cls in mavutil.mavlink.mavlink_map.items()}
+        self.wanted = wanted
+        self.bad_crc = 0
+        self.skipped_bytes = 0
+        self.filtered = 0
+        # (sysid, compid) -> [received, lost, last seq] when sequence tracking is on
+        self.seq_links = None
+        self.tap = None
+
+    def writable(self):
+        """Free space at the tail of the ring, compacting leftover bytes to the front first"""
+        if self.start:
+            pending = self.end - self.start
+            self.ring[:pending] = bytes(self.view[self.start:self.end])
+            self.start, self.end = 0, pending
+        if self.end == len(self.ring):
+            # A full ring with no complete frame in it can only be garbage
+            self.skipped_bytes += self.end
+            self.end = 0
+        return self.view[self.end:]
+
+    def drop_pending(self):
+        """Throw away bytes that were never parsed into a frame"""
+        self.skipped_bytes += self.end - self.start
+        self.start = self.end = 0
+
+    def commit(self, count):
+        """Record that count bytes were written into the last writable() view"""
+        self.end += count
+
+    def feed(self, data):
+        """Copy data into the ring and return every complete frame"""
+        data = memoryview(data)
+        frames = []
+        while data:
+            if frames:
+                # The next compaction would overwrite these slices
+                frames = [(msgid, bytes(frame)) for msgid, frame in frames]
+            space = self.writable()
+            count = min(len(space), len(data))
+            space[:count] = data[:count]
+            self.commit(count)
+            data = data[count:]
+            frames += self.frames()
+        return frames
+
+    def frames(self):
+        """Return a list of (msgid, frame memoryview) for every complete frame in the ring"""
+        buf = self.ring
+        view = self.view
+        frames = []
+        crc_extra = self.crc_extra
+        wanted = self.wanted
+        seq_links = self.seq_links
+        tap = self.tap
+        n = self.end
+        pos = self.start
+        while pos < n:
+            magic = buf[pos]
+            if magic == STX_V2:
+                if n - pos < HEADER_LEN_V2:
+                    break
+                header_len = HEADER_LEN_V2
+                frame_len = HEADER_LEN_V2 + buf[pos + 1] + 2
+                if buf[pos + 2] & IFLAG_SIGNED:
+                    frame_len += SIGNATURE_LEN
+                msgid = buf[pos + 7] | (buf[pos + 8] << 8) | (buf[pos + 9] << 16)
+            elif magic == STX_V1:
+                if n - pos < HEADER_LEN_V1:
+                    break
+                header_len = HEADER_LEN_V1
+                frame_len = HEADER_LEN_V1 + buf[pos + 1] + 2
+                msgid = buf[pos + 5]
+            else:
+                pos += 1
+                self.skipped_bytes += 1
+                continue
+            if n - pos < frame_len:
+                break
+            if wanted is not None and msgid not in wanted:
+                if tap is not None:
+                    tap(view[pos:pos + frame_len])
+                if seq_links is not None:
+                    self.track_seq(seq_links, pos)
+                self.filtered += 1
+                pos += frame_len
+                continue
+            extra = crc_extra.get(msgid)
+            if extra is not None:
+                crc_end = pos + header_len + buf[pos + 1]
+                crc = x25crc(view[pos + 1:crc_end])
+                crc.accumulate([extra])
+                if crc.crc != buf[crc_end] | (buf[crc_end + 1] << 8):
+                    self.bad_crc += 1
+                    pos += 1
+                    continue
+            if tap is not None:
+                tap(view[pos:pos + frame_len])
+            if seq_links is not None:
+                self.track_seq(seq_links, pos)
+            frames.append((msgid, view[pos:pos + frame_len]))
+            pos += frame_len
+        self.start = pos
+        return frames
+
+    def counters(self):
+        """Plain-dict copy of the error and filter counts and, when tracked, sequence counts per sender"""
+        links = self.seq_links or {}
+        return {
+            'bad_crc': self.bad_crc,
+            'skipped_bytes': self.skipped_bytes,
+            'filtered': self.filtered,
+            'links': {source: list(counts) for source, counts in list(links.items())},
+        }
+
+    def track_seq(self, seq_links, pos):
+        """Count received frames and sequence-number gaps per sender"""
+        sysid, compid, seq = frame_source(self.view[pos:pos + HEADER_LEN_V2])
+        entry = seq_links.get((sysid, compid))
+        if entry is None:
+            seq_links[(sysid, compid)] = [1, 0, seq]
+            return
+        entry[0] += 1
+        entry[1] += (seq - entry[2] - 1) & 0xFF
+        entry[2] = seq
+
+
+class FastPathDecoder:
+    """Decodes the high-rate telemetry messages straight into a VehicleState.
+
+    Only the base (MAVLink 1) part of each payload is read, with
+    struct.Struct over a memoryview of the frame, so no pymavlink message
+    object is built for the handful of types that make up most traffic.
+    """
+
+    HEARTBEAT = struct.Struct('<IBBBBB')                # custom_mode type autopilot base_mode system_status mavlink_version
+    SYS_STATUS = struct.Struct('<IIIHHhHHHHHHb')        # ... voltage_battery current_battery ... battery_remaining
+    GPS_RAW_INT = struct.Struct('<QiiiHHHHBB')          # time_usec lat lon alt eph epv vel cog fix_type satellites_visible
+    ATTITUDE = struct.Struct('<Iffffff')                # time_boot_ms roll pitch yaw rollspeed pitchspeed yawspeed
+    GLOBAL_POSITION_INT = struct.Struct('<IiiiihhhH')   # time_boot_ms lat lon alt relative_alt vx vy vz hdg
+    VFR_HUD = struct.Struct('<ffffhH')                  # airspeed groundspeed alt climb heading throttle
+
+    def __init__(self):
+        self.handlers = {
+            MSG_ID_HEARTBEAT: self.decode_heartbeat,
+            MSG_ID_SYS_STATUS: self.decode_sys_status,
+            MSG_ID_GPS_RAW_INT: self.decode_gps_raw_int,
+            MSG_ID_ATTITUDE: self.decode_attitude,
+            MSG_ID_GLOBAL_POSITION_INT: self.decode_global_position_int,
+            MSG_ID_VFR_HUD: self.decode_vfr_hud,
+        }
+        self.msg_types = {
+            MSG_ID_HEARTBEAT: 'HEARTBEAT',
+            MSG_ID_SYS_STATUS: 'SYS_STATUS',
+            MSG_ID_GPS_RAW_INT: 'GPS_RAW_INT',
+            MSG_ID_ATTITUDE: 'ATTITUDE',
+            MSG_ID_GLOBAL_POSITION_INT: 'GLOBAL_POSITION_INT',
+            MSG_ID_VFR_HUD: 'VFR_HUD',
+        }
+
+    def handles(self, msgid):
+        return msgid in self.handlers
+
+    def unpack(self, unpacker, frame):
+        """Unpack a payload, zero-padding MAVLink 2 truncated trailing bytes"""
+        header_len = HEADER_LEN_V2 if frame[0] == STX_V2 else HEADER_LEN_V1
+        payload = memoryview(frame)[header_len:header_len + frame[1]]
+        if len(payload) < unpacker.size:
+            return unpacker.unpack(bytes(payload) + bytes(unpacker.size - len(payload)))
+        return unpacker.unpack_from(payload)
+
+    def decode(self, msgid, frame, state, now):
+        """Apply a hot frame to state and return its unpacked base fields"""
+        return self.handlers[msgid](frame, state, now)
+
+    def decode_heartbeat(self, frame, state, now):
+        fields = self.unpack(self.HEARTBEAT, frame)
+        mode = COPTER_MODES.get(fields[0], f"UNKNOWN_{fields[0]}")
+        if is_vehicle_heartbeat(frame_source(frame)[1], fields):
+            state.mode = mode
+            state.flying_type = flying_type_for_mode(mode)
+            state.mark(vs.MODE | vs.FLYING_TYPE, now)
+        return fields
+
+    def decode_sys_status(self, frame, state, now):
+        fields = self.unpack(self.SYS_STATUS, frame)
+        battery_remaining = fields[12]
+        if battery_remaining >= 0:
+            state.battery = battery_remaining
+        else:
+            # Autopilot does not estimate remaining capacity, guess from a 3S pack voltage
+            voltage = fields[4] / 1000.0
+            cell_count = 3
+            min_voltage = 3.2 * cell_count
+            max_voltage = 4.2 * cell_count
+            if voltage > min_voltage:
+                battery_pct = ((voltage - min_voltage) / (max_voltage - min_voltage)) * 100
+                state.battery = min(100, max(0, battery_pct))
+            else:
+                state.battery = 0
+        state.mark(vs.BATTERY, now)
+        return fields
+
+    def decode_gps_raw_int(self, frame, state, now):
+        fields = self.unpack(self.GPS_RAW_INT, frame)
+        state.lat, state.lon, state.alt = fields[1] / 1e7, fields[2] / 1e7, fields[3] / 1000.0
+        state.mark(vs.POSITION | vs.ALT, now)
+        return fields
+
+    def decode_attitude(self, frame, state, now):
+        fields = self.unpack(self.ATTITUDE, frame)
+        state.roll, state.pitch, state.yaw = math.degrees(fields[1]), math.degrees(fields[2]), math.degrees(fields[3])
+        state.mark(vs.ATTITUDE, now)
+        return fields
+
+    def decode_global_position_int(self, frame, state, now):
+        fields = self.unpack(self.GLOBAL_POSITION_INT, frame)
+        state.lat, state.lon, state.alt, state.relative_alt = fields[1] / 1e7, fields[2] / 1e7, fields[3] / 1000.0, fields[4] / 1000.0
+        state.mark(vs.POSITION | vs.ALT | vs.RELATIVE_ALT, now)
+        return fields
+
+    def decode_vfr_hud(self, frame, state, now):
+        fields = self.unpack(self.VFR_HUD, frame)
+        airspeed, groundspeed, alt, climb, heading, throttle = fields
+        state.heading, state.alt, state.groundspeed, state.airspeed, state.climb, state.throttle = heading, alt, groundspeed, airspeed, climb, throttle
+        state.mark(vs.HEADING | vs.ALT | vs.GROUNDSPEED | vs.AIRSPEED | vs.CLIMB | vs.THROTTLE, now)
+        return fields
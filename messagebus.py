@@ -0,0 +1,80 @@
+import threading
+import traceback
+
+
+class MessageBus:
+    """Fan out decoded MAVLink messages to subscribers by message type.
+
+    A single reader thread publishes every message it decodes; subscribers
+    register for the message types they care about. Callbacks run on the
+    publishing thread, so widgets must hop to the GUI thread through a
+    Qt signal instead of touching themselves directly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # msg_type -> tuple of callbacks, replaced wholesale on every change
+        # so publish() can read it without taking the lock
+        self._subscribers = {}
+        # Bumped on every (un)subscribe so readers can cheaply notice changes
+        self.version = 0
+        # Called after every (un)subscribe, on the thread that made the change
+        self._watchers = ()
+
+    def subscribe(self, msg_types, callback):
+        """Register callback for one message type or a list of them"""
+        if isinstance(msg_types, str):
+            msg_types = [msg_types]
+        with self._lock:
+            subscribers = dict(self._subscribers)
+            for msg_type in msg_types:
+                callbacks = subscribers.get(msg_type, ())
+                if callback not in callbacks:
+                    subscribers[msg_type] = callbacks + (callback,)
+            self._subscribers = subscribers
+            self.version += 1
+        self._notify()
+
+    def unsubscribe(self, callback, msg_types=None):
+        """Remove callback from the given types, or from every type"""
+        if isinstance(msg_types, str):
+            msg_types = [msg_types]
+        with self._lock:
+            subscribers = {}
+            for msg_type, callbacks in self._subscribers.items():
+                if msg_types is None or msg_type in msg_types:
+                    callbacks = tuple(cb for cb in callbacks if cb != callback)
+                if callbacks:
+                    subscribers[msg_type] = callbacks
+            self._subscribers = subscribers
+            self.version += 1
+        self._notify()
+
+    def watch(self, callback):
+        """Call callback() whenever the set of subscriptions changes"""
+        with self._lock:
+            self._watchers = self._watchers + (callback,)
+
+    def _notify(self):
+        for callback in self._watchers:
+            try:
+                callback()
+            except Exception:
+                traceback.print_exc()
+
+    def subscribed_types(self):
+        """Return the set of message types that have at least one subscriber"""
+        return set(self._subscribers)
+
+    def has_subscribers(self, msg_type):
+        return msg_type in self._subscribers
+
+    def publish(self, msg, msg_type=None):
+        """Deliver msg to every subscriber of its type"""
+        if msg_type is None:
+            msg_type = msg.get_type()
+        for callback in self._subscribers.get(msg_type, ()):
+            try:
+                callback(msg)
+            except Exception:
+                traceback.print_exc()
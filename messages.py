@@ -10,108 +10,94 @@ from PyQt6.QtCore import Qt,QThread , pyqtSignal, QObject
 from PyQt6.QtGui import QFont 
 import traceback
 
-class MAVLinkMessageListener(QThread):
-    """Thread that listens for various important MAVLink messages"""
+class MAVLinkMessageListener(QObject):
+    """Subscribes to the monitoring thread's message bus for important MAVLink messages"""
     new_status_text = pyqtSignal(int, str, datetime)
     new_mission_item_reached = pyqtSignal(int, datetime)
     new_system_status = pyqtSignal(str, datetime)
     new_gps_info = pyqtSignal(dict, datetime)
+
+    message_types = [
+        'STATUSTEXT', 
+        'MISSION_ITEM_REACHED',
+        'HEARTBEAT',   
+        'COMMAND_ACK', 
+        'GPS_RAW_INT',  
+        'GLOBAL_POSITION_INT',
+        'SYS_STATUS',     
+        'PARAM_VALUE',    
+    ]
     
-    def __init__(self, mavlink_connection):
+    def __init__(self, message_bus):
         super().__init__()
-        self._conn = mavlink_connection
-        self._running = False
+        self._bus = message_bus
+        
+    def start(self):
+        """Start receiving messages from the bus"""
+        self._bus.subscribe(self.message_types, self.handle_message)
+
+    def handle_message(self, msg):
+        """Called on the reader thread; signals carry the data to the GUI thread"""
+        # Use get_type() instead of accessing .name attribute
+        msg_type = msg.get_type()
+        ts = datetime.now()
         
-    def run(self):
-        self._running = True
-        message_types = [
-            'STATUSTEXT', 
-            'MISSION_ITEM_REACHED',
-            'HEARTBEAT',   
-            'COMMAND_ACK', 
-            'GPS_RAW_INT',  
-            'GLOBAL_POSITION_INT',
-            'SYS_STATUS',     
-            'PARAM_VALUE',    
-        ]
+        # Process message based on its type
+        if msg_type == 'STATUSTEXT':
+            # Handle status text messages
+            sev = msg.severity
+            text = (
+                msg.text.decode('utf-8', errors='ignore')
+                if isinstance(msg.text, (bytes, bytearray)) else msg.text
+            )
+            text = text.strip('\0')
+            # print(f"[STATUSTEXT] ({sev}) {text}")
+            self.new_status_text.emit(sev, text, ts)
+            
+        elif msg_type == 'MISSION_ITEM_REACHED':
+            # Handle waypoint reached notifications
+            seq = msg.seq
+            # print(f"[WAYPOINT] Reached waypoint #{seq}")
+            self.new_mission_item_reached.emit(seq, ts)
+            
+        elif msg_type == 'HEARTBEAT':
+            # Extract system status (armed/disarmed)
+            if hasattr(msg, 'base_mode'):
+                armed = bool(msg.base_mode & 0x80)  # Check if armed bit is set
+                status = "ARMED" if armed else "DISARMED"
+                # print(f"[SYSTEM] Status: {status}")
+                self.new_system_status.emit(status, ts)
         
-        while self._running:
+        elif msg_type == 'GPS_RAW_INT' or msg_type == 'GLOBAL_POSITION_INT':
             try:
-                try:
-                    msg = self._conn.recv_match(type=message_types, blocking=True, timeout=0.5)
-                except TypeError as e:
-                    if "'NoneType' object does not support item assignment" in str(e):
-                        self.msleep(10)
-                        continue
-                    else:
-                        raise 
+                gps_data = {}
                 
-                if msg:
-                    # Use get_type() instead of accessing .name attribute
-                    msg_type = msg.get_type()
-                    ts = datetime.now()
-                    
-                    # Process message based on its type
-                    if msg_type == 'STATUSTEXT':
-                        # Handle status text messages
-                        sev = msg.severity
-                        text = (
-                            msg.text.decode('utf-8', errors='ignore')
-                            if isinstance(msg.text, (bytes, bytearray)) else msg.text
-                        )
-                        text = text.strip('\0')
-                        # print(f"[STATUSTEXT] ({sev}) {text}")
-                        self.new_status_text.emit(sev, text, ts)
-                        
-                    elif msg_type == 'MISSION_ITEM_REACHED':
-                        # Handle waypoint reached notifications
-                        seq = msg.seq
-                        # print(f"[WAYPOINT] Reached waypoint #{seq}")
-                        self.new_mission_item_reached.emit(seq, ts)
-                        
-                    elif msg_type == 'HEARTBEAT':
-                        # Extract system status (armed/disarmed)
-                        if hasattr(msg, 'base_mode'):
-                            armed = bool(msg.base_mode & 0x80)  # Check if armed bit is set
-                            status = "ARMED" if armed else "DISARMED"
-                            # print(f"[SYSTEM] Status: {status}")
-                            self.new_system_status.emit(status, ts)
-                    
-                    elif msg_type == 'GPS_RAW_INT' or msg_type == 'GLOBAL_POSITION_INT':
-                        try:
-                            gps_data = {}
-                            
-                            if msg_type == 'GPS_RAW_INT':
-                                safe_attrs = ['time_usec', 'fix_type', 'lat', 'lon', 'alt', 
-                                             'eph', 'epv', 'vel', 'cog', 'satellites_visible']
-                            elif msg_type == 'GLOBAL_POSITION_INT':
-                                safe_attrs = ['time_boot_ms', 'lat', 'lon', 'alt', 'relative_alt',
-                                             'vx', 'vy', 'vz', 'hdg']
-                            
-                            for attr in safe_attrs:
-                                if hasattr(msg, attr):
-                                    gps_data[attr] = getattr(msg, attr)
+                if msg_type == 'GPS_RAW_INT':
+                    safe_attrs = ['time_usec', 'fix_type', 'lat', 'lon', 'alt', 
+                                 'eph', 'epv', 'vel', 'cog', 'satellites_visible']
+                elif msg_type == 'GLOBAL_POSITION_INT':
+                    safe_attrs = ['time_boot_ms', 'lat', 'lon', 'alt', 'relative_alt',
+                                 'vx', 'vy', 'vz', 'hdg']
+                
+                for attr in safe_attrs:
+                    if hasattr(msg, attr):
+                        gps_data[attr] = getattr(msg, attr)
+                
+                # Add the message type for reference
+                gps_data['msg_type'] = msg_type
                             
-                            # Add the message type for reference
-                            gps_data['msg_type'] = msg_type
-                                        
-                            # print(f"[GPS] Type: {msg_type}, Fix: {gps_data.get('fix_type', 'N/A')}")
-                            self.new_gps_info.emit(gps_data, ts)
-                        except Exception as gps_error:
-                            # print(f"[ERROR] Exception processing GPS data: {gps_error}")
-                            traceback.print_exc()
-                        
-                    # Handle other message types as needed
-                    # print(f"[RECEIVED] Message type: {msg_type}")
-                    
-            except Exception as e:
+                # print(f"[GPS] Type: {msg_type}, Fix: {gps_data.get('fix_type', 'N/A')}")
+                self.new_gps_info.emit(gps_data, ts)
+            except Exception as gps_error:
+                # print(f"[ERROR] Exception processing GPS data: {gps_error}")
                 traceback.print_exc()
-                self.msleep(10)
+            
+        # Handle other message types as needed
+        # print(f"[RECEIVED] Message type: {msg_type}")
     
     def stop(self):
-        """Stop the listener thread."""
-        self._running = False
-        self.wait()
+        """Stop receiving messages from the bus."""
+        self._bus.unsubscribe(self.handle_message)
 
 class MessagesWidget(QFrame):
     def __init__(self):
@@ -189,11 +175,11 @@ class MessagesWidget(QFrame):
         """)
         main_layout.addWidget(self.list_widget, stretch=1)
 
-    def connect_to_mavlink(self, mavlink_connection):
-        """Connect this widget to a MAVLink connection - creates the listener thread"""
+    def connect_to_bus(self, message_bus):
+        """Connect this widget to the monitoring thread's message bus"""
         try:
-            # Create and start the MAVLink message listener thread
-            self.mavlink_listener = MAVLinkMessageListener(mavlink_connection)
+            # Create the MAVLink message listener on the shared bus
+            self.mavlink_listener = MAVLinkMessageListener(message_bus)
             
             # Connect to all the signals from the MAVLinkMessageListener
             self.mavlink_listener.new_status_text.connect(self.handle_status_text)
@@ -201,7 +187,7 @@ class MessagesWidget(QFrame):
             self.mavlink_listener.new_system_status.connect(self.handle_system_status)
             self.mavlink_listener.new_gps_info.connect(self.handle_gps_info)
             
-            # Start the listener thread
+            # Start listening
             self.mavlink_listener.start()
             
             self.add_message(6, "MAVLink message listener connected successfully")
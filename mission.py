@@ -0,0 +1,139 @@
+MAV_MISSION_ACCEPTED = 0
+MAV_MISSION_ERROR = 1
+MAV_MISSION_OPERATION_CANCELLED = 15
+
+# Actions returned to the driver
+REQUEST_LIST = 'request_list'
+REQUEST_ITEM = 'request_item'
+SEND_ACK = 'ack'
+
+
+class MissionDownloadError(Exception):
+    pass
+
+
+class MissionDownload:
+    """Mission download protocol as a state machine with no I/O of its own.
+
+    The driver feeds it events (start, MISSION_COUNT, items, the passage of
+    time) and performs the actions each call returns:
+        (REQUEST_LIST,)         send MISSION_REQUEST_LIST
+        (REQUEST_ITEM, seq)     send MISSION_REQUEST_INT for seq
+        (SEND_ACK, result)      send MISSION_ACK
+
+    Up to window item requests are kept in flight. A request that gets no
+    reply within item_timeout is resent, up to retries times, after which
+    the download fails. Items may arrive in any order; duplicates are
+    ignored.
+    """
+
+    def __init__(self, window=8, item_timeout=0.5, count_timeout=1.0, retries=5):
+        self.window = window
+        self.item_timeout = item_timeout
+        self.count_timeout = count_timeout
+        self.retries = retries
+        self.count = None
+        self.items = {}
+        self.next_seq = 0
+        # seq -> (deadline, attempts) for every outstanding item request
+        self.in_flight = {}
+        self.list_deadline = None
+        self.list_attempts = 0
+        self.done = False
+        self.error = None
+
+    @property
+    def received(self):
+        return len(self.items)
+
+    def start(self, now):
+        self.list_attempts = 1
+        self.list_deadline = now + self.count_timeout
+        return [(REQUEST_LIST,)]
+
+    def on_count(self, count, now):
+        """MISSION_COUNT arrived; open the request window"""
+        if self.count is not None or self.done:
+            return []
+        self.count = count
+        self.list_deadline = None
+        if count == 0:
+            return self.finish()
+        return self.fill_window(now)
+
+    def on_item(self, seq, item, now):
+        """A MISSION_ITEM_INT (or MISSION_ITEM) for seq arrived"""
+        if self.count is None or self.done or not 0 <= seq < self.count or seq in self.items:
+            return []
+        self.items[seq] = item
+        self.in_flight.pop(seq, None)
+        if len(self.items) == self.count:
+            return self.finish()
+        return self.fill_window(now)
+
+    def poll(self, now):
+        """Resend overdue requests; call at least by next_deadline()"""
+        if self.done:
+            return []
+        if self.count is None:
+            if now < self.list_deadline:
+                return []
+            if self.list_attempts > self.retries:
+                return self.fail("no MISSION_COUNT")
+            self.list_attempts += 1
+            self.list_deadline = now + self.count_timeout
+            return [(REQUEST_LIST,)]
+        actions = []
+        for seq, (deadline, attempts) in list(self.in_flight.items()):
+            if now < deadline:
+                continue
+            if attempts > self.retries:
+                return self.fail(f"no reply for item {seq}")
+            self.in_flight[seq] = (now + self.item_timeout, attempts + 1)
+            actions.append((REQUEST_ITEM, seq))
+        return actions
+
+    def next_deadline(self):
+        """Monotonic time of the next timeout, or None when nothing is pending"""
+        if self.done:
+            return None
+        if self.count is None:
+            return self.list_deadline
+        if not self.in_flight:
+            return None
+        return min(deadline for deadline, _ in self.in_flight.values())
+
+    def complete(self, items):
+        """Finish with items the driver already had, e.g. from a cache, instead of requesting them"""
+        self.count = len(items)
+        self.items = dict(enumerate(items))
+        self.list_deadline = None
+        return self.finish()
+
+    def fill_window(self, now):
+        actions = []
+        while len(self.in_flight) < self.window and self.next_seq < self.count:
+            seq = self.next_seq
+            self.next_seq += 1
+            if seq in self.items:
+                continue
+            self.in_flight[seq] = (now + self.item_timeout, 1)
+            actions.append((REQUEST_ITEM, seq))
+        return actions
+
+    def finish(self):
+        self.done = True
+        self.in_flight = {}
+        return [(SEND_ACK, MAV_MISSION_ACCEPTED)]
+
+    def fail(self, reason):
+        self.done = True
+        self.error = MissionDownloadError(f"Mission download failed: {reason}")
+        self.in_flight = {}
+        return [(SEND_ACK, MAV_MISSION_OPERATION_CANCELLED)]
+
+    def result(self):
+        """Items in seq order; raises if the download failed"""
+        if self.error is not None:
+            raise self.error
+        return [self.items[seq] for seq in range(self.count)]
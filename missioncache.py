@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import threading
+import time
+from mavframe import MAVLinkFrameParser
+
+
+def default_cache_path():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'bluehorizon', 'missions.sqlite')
+
+
+class MissionCache:
+    """Downloaded missions on disk, keyed by (system ID, mission opaque_id).
+
+    Items are stored as their raw MAVLink frames, back to back, so loading
+    is a parse and a pymavlink decode with no format of our own to keep in
+    step. Only missions with a nonzero opaque_id are kept: without one
+    there is no cheap way to tell the vehicle's mission hasn't changed.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS missions (
+                               sysid INTEGER NOT NULL,
+                               opaque_id INTEGER NOT NULL,
+                               count INTEGER NOT NULL,
+                               frames BLOB NOT NULL,
+                               updated REAL NOT NULL,
+                               PRIMARY KEY (sysid, opaque_id))""")
+        self.db.commit()
+
+    def load(self, mav, sysid, opaque_id, count):
+        """Cached items for this mission decoded with mav, or None on a miss"""
+        with self._lock:
+            row = self.db.execute("SELECT count, frames FROM missions WHERE sysid = ? AND opaque_id = ?",
+                                  (sysid, opaque_id)).fetchone()
+        if row is None or row[0] != count:
+            return None
+        items = [mav.decode(bytearray(frame)) for _, frame in MAVLinkFrameParser().feed(row[1])]
+        if [item.seq for item in items] != list(range(count)):
+            return None
+        return items
+
+    def store(self, sysid, opaque_id, items):
+        frames = b''.join(item.get_msgbuf() for item in items)
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO missions VALUES (?, ?, ?, ?, ?)",
+                            (sysid, opaque_id, len(items), frames, time.time()))
+            self.db.commit()
+
+    def close(self):
+        with self._lock:
+            self.db.close()
@@ -0,0 +1,107 @@
+import collections
+import os
+import struct
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# tlog record header: arrival time in microseconds since the epoch, big-endian
+STAMP = struct.Struct('>Q')
+
+
+def default_recording_path(directory, compress=False):
+    name = time.strftime("flight-%Y%m%d-%H%M%S.tlog")
+    return os.path.join(directory, name + ('.zst' if compress else ''))
+
+
+class TlogRecorder:
+    """Writes every raw frame it is handed to a tlog file from a background thread.
+
+    tlog is the format MAVProxy and Mission Planner write: each frame as
+    received, prefixed with its arrival time (STAMP). record() runs on the
+    ingest thread and only appends to a deque, which is safe across
+    threads without a lock; the writer thread drains it every
+    FLUSH_INTERVAL seconds, or as soon as BLOCK_FRAMES are waiting, and
+    writes the lot in one call. Paths ending in .zst are compressed as a
+    zstandard stream, flushed a block at a time so a crash loses at most
+    the last interval.
+    """
+    FLUSH_INTERVAL = 1.0
+    BLOCK_FRAMES = 4096
+
+    def __init__(self, path):
+        compress = path.endswith('.zst')
+        if compress and zstandard is None:
+            path = path[:-len('.zst')]
+            compress = False
+            print(f"zstandard not installed; recording uncompressed to {path}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.file = open(path, 'wb')
+        self.out = zstandard.ZstdCompressor(level=3).stream_writer(self.file) if compress else self.file
+        self.compress = compress
+        self.queue = collections.deque()
+        self.wake = threading.Event()
+        self.closing = False
+        self.frames = 0
+        self.bytes = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="tlog-writer", daemon=True)
+        self.thread.start()
+
+    def record(self, frame):
+        """Queue one raw frame; called for every frame the link delivers"""
+        self.queue.append((time.time(), bytes(frame)))
+        if len(self.queue) >= self.BLOCK_FRAMES:
+            self.wake.set()
+
+    def run(self):
+        while not self.closing:
+            self.wake.wait(self.FLUSH_INTERVAL)
+            self.wake.clear()
+            self.write_pending()
+        self.write_pending()
+        try:
+            self.out.close()
+        except OSError as e:
+            print(f"Error closing recording {self.path}: {e}")
+
+    def write_pending(self):
+        queue = self.queue
+        if self.error is not None:
+            # Keep draining so a dead disk can't grow the queue without bound
+            queue.clear()
+            return
+        chunk = bytearray()
+        count = 0
+        pack = STAMP.pack
+        while queue:
+            stamp, frame = queue.popleft()
+            chunk += pack(int(stamp * 1e6))
+            chunk += frame
+            count += 1
+        if not chunk:
+            return
+        try:
+            self.out.write(chunk)
+            if self.compress:
+                self.out.flush(zstandard.FLUSH_BLOCK)
+            self.file.flush()
+        except OSError as e:
+            self.error = e
+            print(f"Error writing recording {self.path}: {e}")
+            return
+        self.frames += count
+        self.bytes += len(chunk)
+
+    def close(self):
+        """Write out whatever is queued and close the file"""
+        self.closing = True
+        self.wake.set()
+        self.thread.join(5)
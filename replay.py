@@ -0,0 +1,367 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from pymavlink import mavutil
+from mavframe import STX_V1, STX_V2, HEADER_LEN_V1, HEADER_LEN_V2, SIGNATURE_LEN, IFLAG_SIGNED, frame_msgid
+from recorder import STAMP
+from timeline import TimelineBuilder, StateTimeline
+
+# Sidecar files start with a header tying them to one version of the tlog
+SIDECAR_HEADER = struct.Struct('<8sQQ')   # magic, tlog size, tlog mtime_ns
+# Sidecar index: one (stamp, offset) entry per INDEX_INTERVAL_US of log
+INDEX_ENTRY = struct.Struct('<QQ')      # stamp in us, file offset of the record
+INDEX_MAGIC = b'BHTLIDX1'
+INDEX_INTERVAL_US = 1000000
+TIMELINE_MAGIC = b'BHTLKF02'
+
+SPEEDS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+# Most frames one read_batch() hands over, so 64x still yields to the UI
+BATCH_LIMIT = 2000
+
+
+def frame_length(buf, pos):
+    """Length of the v1/v2 frame starting at pos, or None if no frame starts there"""
+    magic = buf[pos]
+    if magic == STX_V2:
+        length = HEADER_LEN_V2 + buf[pos + 1] + 2
+        if buf[pos + 2] & IFLAG_SIGNED:
+            length += SIGNATURE_LEN
+        return length
+    if magic == STX_V1:
+        return HEADER_LEN_V1 + buf[pos + 1] + 2
+    return None
+
+
+def read_sidecar(path, magic, log):
+    """Body of a sidecar file written for this exact tlog, or None if missing or stale"""
+    stat = os.stat(log.path)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if SIDECAR_HEADER.unpack_from(data) == (magic, stat.st_size, stat.st_mtime_ns):
+            return data[SIDECAR_HEADER.size:]
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+def write_sidecar(path, magic, log, body):
+    stat = os.stat(log.path)
+    try:
+        with open(path, 'wb') as f:
+            f.write(SIDECAR_HEADER.pack(magic, stat.st_size, stat.st_mtime_ns))
+            f.write(body)
+    except OSError as e:
+        print(f"Error writing {path}: {e}")
+
+
+class TlogIndex:
+    """Sparse stamp -> offset index of a tlog, kept in a .idx file beside it.
+
+    One entry per second of log time, so a four hour log indexes in about
+    14k entries and a seek is a bisect plus at most a second of records.
+    The sidecar records the tlog's size and mtime and is rebuilt with one
+    linear scan whenever they no longer match.
+    """
+
+    def __init__(self, stamps, offsets):
+        self.stamps = stamps
+        self.offsets = offsets
+
+    @classmethod
+    def load_or_build(cls, log):
+        path = log.path + '.idx'
+        data = read_sidecar(path, INDEX_MAGIC, log)
+        if data is not None:
+            try:
+                entries = list(INDEX_ENTRY.iter_unpack(data))
+                return cls([e[0] for e in entries], [e[1] for e in entries])
+            except struct.error:
+                pass
+        index = cls.build(log)
+        write_sidecar(path, INDEX_MAGIC, log,
+                      b''.join(INDEX_ENTRY.pack(s, o) for s, o in zip(index.stamps, index.offsets)))
+        return index
+
+    @classmethod
+    def build(cls, log):
+        stamps = []
+        offsets = []
+        next_entry = 0
+        latest = 0
+        for pos, (stamp, _, _, _) in log.records():
+            # Stamps come from the wall clock and may step back; keep the index sorted
+            latest = max(latest, stamp)
+            if latest >= next_entry:
+                stamps.append(latest)
+                offsets.append(pos)
+                next_entry = latest + INDEX_INTERVAL_US
+        return cls(stamps, offsets)
+
+    def offset_before(self, stamp):
+        """Offset of an indexed record at or before stamp (the first one if stamp is earlier)"""
+        i = bisect.bisect_right(self.stamps, stamp) - 1
+        return self.offsets[max(i, 0)] if self.offsets else 0
+
+
+def load_timeline(log):
+    """The log's StateTimeline from its .states sidecar, built in one decoding pass if missing or stale"""
+    path = log.path + '.states'
+    body = read_sidecar(path, TIMELINE_MAGIC, log)
+    if body is not None:
+        try:
+            return StateTimeline(body)
+        except struct.error:
+            pass
+    builder = TimelineBuilder()
+    buf = log.buf
+    for _, (stamp, start, end, _) in log.records():
+        builder.add(stamp, frame_msgid(buf[start:start + HEADER_LEN_V2]), buf[start:end])
+    body = builder.finish()
+    write_sidecar(path, TIMELINE_MAGIC, log, body)
+    return StateTimeline(body)
+
+
+class TlogFile:
+    """A tlog mapped into memory, read one record at a time"""
+
+    def __init__(self, path):
+        if path.endswith('.zst'):
+            path = decompress(path)
+        self.path = path
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        if not self.size:
+            self.file.close()
+            raise ValueError(f"{path} is empty")
+        self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def record_at(self, pos):
+        """(stamp, frame start, frame end, next record) at pos, skipping garbage; None at the end"""
+        buf = self.buf
+        size = self.size
+        while pos + STAMP.size + HEADER_LEN_V1 <= size:
+            start = pos + STAMP.size
+            length = frame_length(buf, start)
+            if length is None:
+                # Not a record boundary (a torn write or a foreign byte): resync a byte on
+                pos += 1
+                continue
+            end = start + length
+            if end > size:
+                return None
+            return STAMP.unpack_from(buf, pos)[0], start, end, end
+        return None
+
+    def records(self, pos=0):
+        """(offset, record) for every record from pos to the end"""
+        record = self.record_at(pos)
+        while record is not None:
+            yield pos, record
+            pos = record[3]
+            record = self.record_at(pos)
+
+    def close(self):
+        self.buf.close()
+        self.file.close()
+
+
+def decompress(path):
+    """Unpack a .tlog.zst once, next to it, so it can be mapped and seeked"""
+    target = path[:-len('.zst')]
+    if os.path.exists(target):
+        return target
+    import zstandard
+    with open(path, 'rb') as src, open(target + '.part', 'wb') as dst:
+        zstandard.ZstdDecompressor().copy_stream(src, dst)
+    os.replace(target + '.part', target)
+    return target
+
+
+class ReplayReader:
+    """Plays a tlog back with the read_batch() interface of LinkReader.
+
+    Each read_batch() returns the frames whose recorded time has come on
+    the replay clock, so everything downstream runs exactly as it does
+    on a live link. The clock is anchored to time.monotonic(); play,
+    pause, set_speed and seek re-anchor it and may be called from any
+    thread. Seeks go through the TlogIndex and cost a bisect and a short
+    scan; timeline gives the recorded vehicle state to jump to, and seeks
+    counts them so the reading thread can tell one happened.
+    """
+
+    def __init__(self, path):
+        self.log = TlogFile(path)
+        self.index = TlogIndex.load_or_build(self.log)
+        self.timeline = load_timeline(self.log)
+        first = self.log.record_at(0)
+        if first is None:
+            raise ValueError(f"No MAVLink records in {path}")
+        self.start = first[0]
+        self.end = self.index.stamps[-1] if self.index.stamps else self.start
+        last = self.log.record_at(self.index.offset_before(self.end))
+        while last is not None:
+            self.end = max(self.end, last[0])
+            last = self.log.record_at(last[3])
+        self.pos = 0
+        self.wanted = None
+        self.speed = 1.0
+        self.paused = False
+        self.lock = threading.Lock()
+        # Set on every control change so a waiting read_batch() wakes up at once
+        self.changed = threading.Event()
+        self.anchor_stamp = self.start
+        self.anchor_time = time.monotonic()
+        self.seeks = 0
+        self.seek_stamp = self.start
+
+    @property
+    def duration(self):
+        """Length of the log in seconds"""
+        return (self.end - self.start) / 1e6
+
+    def position(self):
+        """Replay clock in seconds from the start of the log"""
+        with self.lock:
+            return (min(self.clock(time.monotonic()), self.end) - self.start) / 1e6
+
+    def stamp(self):
+        """Replay clock as a log stamp in us"""
+        with self.lock:
+            return min(self.clock(time.monotonic()), self.end)
+
+    def finished(self):
+        return self.pos >= self.log.size
+
+    def clock(self, now):
+        if self.paused:
+            return self.anchor_stamp
+        return self.anchor_stamp + (now - self.anchor_time) * 1e6 * self.speed
+
+    def reanchor(self, stamp):
+        self.anchor_stamp = stamp
+        self.anchor_time = time.monotonic()
+        self.changed.set()
+
+    def play(self):
+        with self.lock:
+            if self.paused:
+                self.paused = False
+                self.reanchor(self.anchor_stamp)
+
+    def pause(self):
+        with self.lock:
+            if not self.paused:
+                self.reanchor(self.clock(time.monotonic()))
+                self.paused = True
+
+    def set_speed(self, speed):
+        with self.lock:
+            self.reanchor(self.clock(time.monotonic()))
+            self.speed = min(max(speed, SPEEDS[0]), SPEEDS[-1])
+
+    def seek(self, seconds):
+        """Jump to seconds from the start of the log, keeping the play/pause state"""
+        with self.lock:
+            target = self.start + max(0.0, min(seconds, self.duration)) * 1e6
+            pos = self.index.offset_before(target)
+            record = self.log.record_at(pos)
+            while record is not None and record[0] < target:
+                pos = record[3]
+                record = self.log.record_at(pos)
+            self.pos = pos if record is not None else self.log.size
+            self.seeks += 1
+            self.seek_stamp = target
+            self.reanchor(target)
+
+    def last_seek(self):
+        """(number of seeks so far, log stamp of the latest)"""
+        with self.lock:
+            return self.seeks, self.seek_stamp
+
+    def set_forwarded(self, msg_ids):
+        self.wanted = set(msg_ids)
+
+    def backlog(self):
+        return 0
+
+    def track_sequences(self, enabled):
+        pass
+
+    def parse_counters(self):
+        """None: recorded frames were checked when they were recorded"""
+        return None
+
+    def read_batch(self, timeout):
+        """Wait up to timeout for recorded frames to fall due and return them as (msgid, frame)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.changed.clear()
+            with self.lock:
+                due = self.clock(time.monotonic())
+                frames, next_stamp = self.take_due(due)
+                wait = None if self.paused or next_stamp is None else (next_stamp - due) / 1e6 / self.speed
+            if frames:
+                return frames
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            self.changed.wait(remaining if wait is None else min(remaining, wait))
+
+    def take_due(self, due):
+        """Frames stamped at or before due from the current position, and the stamp of the next one"""
+        log = self.log
+        buf = log.buf
+        wanted = self.wanted
+        frames = []
+        pos = self.pos
+        while len(frames) < BATCH_LIMIT:
+            record = log.record_at(pos)
+            if record is None:
+                self.pos = log.size
+                return frames, None
+            stamp, start, end, following = record
+            if stamp > due:
+                self.pos = pos
+                return frames, stamp
+            msgid = frame_msgid(buf[start:start + HEADER_LEN_V2])
+            if wanted is None or msgid in wanted:
+                frames.append((msgid, buf[start:end]))
+            pos = following
+        self.pos = pos
+        return frames, None
+
+    def close(self):
+        self.changed.set()
+        with self.lock:
+            self.log.close()
+
+
+class ReplayConnection:
+    """A recorded tlog standing in for a live connection.
+
+    Shaped like RouterConnection: mav, target ids, post_message, write and
+    close, with a ReplayReader as its reader. Nothing is sent anywhere;
+    writes are dropped.
+    """
+
+    def __init__(self, path, source_system=255, source_component=0):
+        self.address = path
+        self.target_system = 0
+        self.target_component = 0
+        self.messages = {}
+        self.fd = None
+        self.mav = mavutil.mavlink.MAVLink(self, srcSystem=source_system, srcComponent=source_component)
+        self.reader = ReplayReader(path)
+
+    def write(self, buf):
+        pass
+
+    def post_message(self, msg):
+        self.messages[msg.get_type()] = msg
+
+    def close(self):
+        self.reader.close()
@@ -0,0 +1,125 @@
+from PyQt6.QtWidgets import QFrame, QHBoxLayout, QLabel, QPushButton, QComboBox, QSlider
+from PyQt6.QtCore import Qt, QTimer
+from replay import SPEEDS
+
+# Slider steps per second of log
+SLIDER_SCALE = 10
+# Shortest gap between seeks while the slider is dragged (about 30 per second)
+SCRUB_INTERVAL_MS = 33
+
+
+def format_time(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class ReplayBar(QFrame):
+    """Play/pause, speed and a timeline scrubber for a ReplayReader, shown only while replaying.
+
+    Dragging the slider seeks as it goes, at most every SCRUB_INTERVAL_MS;
+    each seek restores the recorded state from the log's keyframes, so
+    every widget follows the drag however long the flight.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("replayBar")
+        self.setFixedHeight(34)
+        self.setStyleSheet("""
+            #replayBar {
+                background-color: rgba(5, 10, 20, 220);
+                border-top: 1px solid rgba(0, 204, 255, 120);
+            }
+            QPushButton, QComboBox {
+                color: #00ccff;
+                background-color: rgba(0, 40, 70, 200);
+                border: 1px solid #0078ff;
+                border-radius: 4px;
+                padding: 2px 8px;
+            }
+            QLabel {
+                color: #d2e6ff;
+                font-family: Consolas, monospace;
+                font-size: 11px;
+                background: transparent;
+            }
+        """)
+        self.reader = None
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(10, 4, 10, 4)
+        self.play_button = QPushButton("PAUSE")
+        self.play_button.setFixedWidth(70)
+        self.play_button.clicked.connect(self.toggle_play)
+        layout.addWidget(self.play_button)
+        self.speed_box = QComboBox()
+        for speed in SPEEDS:
+            self.speed_box.addItem(f"{speed:g}x", speed)
+        self.speed_box.setCurrentIndex(SPEEDS.index(1.0))
+        self.speed_box.activated.connect(self.select_speed)
+        layout.addWidget(self.speed_box)
+        self.slider = QSlider(Qt.Orientation.Horizontal)
+        self.slider.sliderReleased.connect(self.seek_to_slider)
+        self.slider.sliderMoved.connect(self.scrub)
+        self.slider.actionTriggered.connect(self.slider_action)
+        layout.addWidget(self.slider, 1)
+        self.time_label = QLabel()
+        layout.addWidget(self.time_label)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        # Coalesces slider moves into one seek per interval
+        self.scrub_timer = QTimer(self)
+        self.scrub_timer.setSingleShot(True)
+        self.scrub_timer.setInterval(SCRUB_INTERVAL_MS)
+        self.scrub_timer.timeout.connect(self.seek_to_slider)
+        self.hide()
+
+    def attach(self, reader):
+        self.reader = reader
+        self.slider.setRange(0, int(reader.duration * SLIDER_SCALE))
+        self.show()
+        self.refresh()
+        self.timer.start(250)
+
+    def toggle_play(self):
+        if self.reader.finished():
+            # Play at the end starts over
+            self.reader.seek(0)
+            self.reader.play()
+        elif self.reader.paused:
+            self.reader.play()
+        else:
+            self.reader.pause()
+        self.refresh()
+
+    def select_speed(self, index):
+        self.reader.set_speed(self.speed_box.itemData(index))
+
+    def slider_action(self, action):
+        # Clicks and keys on the slider jump straight away; drags go through scrub()
+        if not self.slider.isSliderDown():
+            QTimer.singleShot(0, self.seek_to_slider)
+
+    def scrub(self, value):
+        self.time_label.setText(f"{format_time(value / SLIDER_SCALE)} / {format_time(self.reader.duration)}")
+        if not self.scrub_timer.isActive():
+            self.scrub_timer.start()
+
+    def seek_to_slider(self):
+        self.reader.seek(self.slider.value() / SLIDER_SCALE)
+        self.refresh()
+
+    def refresh(self):
+        reader = self.reader
+        position = reader.position()
+        if not self.slider.isSliderDown():
+            self.slider.setValue(int(position * SLIDER_SCALE))
+        self.play_button.setText("PLAY" if reader.paused or reader.finished() else "PAUSE")
+        self.time_label.setText(f"{format_time(position)} / {format_time(reader.duration)}")
+
+    def detach(self):
+        self.timer.stop()
+        self.scrub_timer.stop()
+        self.reader = None
+        self.hide()
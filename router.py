@@ -0,0 +1,282 @@
+import re
+import select
+import struct
+import time
+from pymavlink import mavutil
+from mavframe import MAVLinkFrameParser, STX_V2, frame_msgid, frame_source
+from transport import LinkReader
+
+
+def target_offsets():
+    """msgid -> payload offset of target_system, for every message that has one"""
+    offsets = {}
+    for msgid, cls in mavutil.mavlink.mavlink_map.items():
+        if 'target_system' not in cls.ordered_fieldnames:
+            continue
+        # One struct token per field, in wire order; '<' means no padding
+        tokens = re.findall(r'\d*[a-zA-Z?]', cls.unpacker.format.lstrip('<'))
+        offset = 0
+        for name, token in zip(cls.ordered_fieldnames, tokens):
+            if name == 'target_system':
+                offsets[msgid] = offset
+                break
+            offset += struct.calcsize('<' + token)
+    return offsets
+
+
+TARGET_OFFSETS = target_offsets()
+
+
+def frame_payload(frame):
+    """(payload start, payload length) of a raw v1 or v2 frame"""
+    if frame[0] == STX_V2:
+        return 10, frame[1]
+    return 6, frame[1]
+
+
+def frame_target(frame, msgid):
+    """target_system of a raw frame, 0 for broadcast or messages without one"""
+    offset = TARGET_OFFSETS.get(msgid)
+    if offset is None:
+        return 0
+    start, length = frame_payload(frame)
+    # MAVLink 2 trims trailing zero bytes off the payload
+    return frame[start + offset] if offset < length else 0
+
+
+class SeqDeduplicator:
+    """Drops copies of a frame that arrive over more than one link.
+
+    A copy has the same sender, sequence number, message ID and CRC as a
+    frame seen within the last WINDOW seconds. Each sender gets one slot
+    per sequence number, so the check is a list index and a compare.
+    """
+    WINDOW = 1.0
+
+    def __init__(self):
+        # (sysid, compid) -> 256 slots of (msgid << 16 | crc, arrival time)
+        self.recent = {}
+        self.duplicates = 0
+
+    def is_duplicate(self, frame, msgid, now):
+        sysid, compid, seq = frame_source(frame)
+        slots = self.recent.get((sysid, compid))
+        if slots is None:
+            slots = self.recent[(sysid, compid)] = [None] * 256
+        start, length = frame_payload(frame)
+        crc = frame[start + length] | (frame[start + length + 1] << 8)
+        key = (msgid << 16) | crc
+        entry = slots[seq]
+        if entry is not None and entry[0] == key and now - entry[1] < self.WINDOW:
+            self.duplicates += 1
+            return True
+        slots[seq] = (key, now)
+        return False
+
+
+class Endpoint:
+    """One link the router reads from and forwards to"""
+
+    def __init__(self, address, connection):
+        self.address = address
+        self.connection = connection
+        self.reader = LinkReader(connection, MAVLinkFrameParser())
+        # System IDs heard through this endpoint; targeted messages only go where their target lives
+        self.systems = set()
+        self.frames_in = 0
+        self.frames_out = 0
+        self.errors = 0
+
+    def write(self, frame):
+        try:
+            self.connection.write(frame)
+            self.frames_out += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Error writing to {self.address}: {e}")
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception as e:
+            print(f"Error closing {self.address}: {e}")
+
+
+class MAVLinkRouter:
+    """Routes MAVLink between several endpoints and the local UI, in process.
+
+    Every frame read from one endpoint is forwarded to the others: frames
+    with a target_system only to the endpoints that system was heard on,
+    everything else to all of them. Copies arriving over redundant links
+    to the same vehicle are dropped by sequence number before they are
+    forwarded or delivered. poll() does one round of this for every
+    endpoint and returns the frames the local side wants, so whoever calls
+    it (the monitoring thread, through RouterConnection) drives the router
+    with no extra thread or copy in between.
+    """
+
+    def __init__(self, endpoints):
+        self.endpoints = endpoints
+        self.dedup = SeqDeduplicator()
+        # Message IDs delivered locally; None delivers everything
+        self.wanted = None
+        # Called with every frame that survives dedup, e.g. to record it
+        self.tap = None
+        self.forwarded = 0
+
+    def poll(self, timeout):
+        """Wait up to timeout for any endpoint, route what arrived and return the local (msgid, frame) list"""
+        self.wait_readable(timeout)
+        now = time.monotonic()
+        local = []
+        wanted = self.wanted
+        tap = self.tap
+        for endpoint in self.endpoints:
+            try:
+                frames = endpoint.reader.read_batch(0)
+            except Exception as e:
+                endpoint.errors += 1
+                print(f"Error reading {endpoint.address}: {e}")
+                continue
+            for msgid, frame in frames:
+                endpoint.frames_in += 1
+                if self.dedup.is_duplicate(frame, msgid, now):
+                    continue
+                endpoint.systems.add(frame_source(frame)[0])
+                if tap is not None:
+                    tap(frame)
+                self.route(frame, msgid, endpoint)
+                if wanted is None or msgid in wanted:
+                    local.append((msgid, frame))
+        return local
+
+    def wait_readable(self, timeout):
+        fds = []
+        for endpoint in self.endpoints:
+            fd = endpoint.connection.fd
+            if endpoint.reader.down is not None:
+                # Closed until its reader reopens it; wake up in time for the retry
+                timeout = min(timeout, max(0.0, endpoint.reader.retry_at - time.monotonic()))
+            elif fd is None:
+                # No selectable handle (e.g. serial on Windows): poll it every round instead
+                timeout = min(timeout, 0.01)
+            else:
+                fds.append(fd)
+        try:
+            select.select(fds, [], [], timeout)
+        except (OSError, ValueError):
+            time.sleep(min(timeout, 0.01))
+
+    def route(self, frame, msgid, source=None):
+        """Forward a frame to every endpoint except the one it came from"""
+        target = frame_target(frame, msgid)
+        destinations = [e for e in self.endpoints if e is not source]
+        if target:
+            known = [e for e in destinations if target in e.systems]
+            if known:
+                destinations = known
+        for endpoint in destinations:
+            endpoint.write(frame)
+        if destinations:
+            self.forwarded += 1
+
+    def send(self, buf):
+        """Route a frame the local side encoded"""
+        self.route(buf, frame_msgid(buf))
+
+    def backlog(self):
+        return sum(endpoint.reader.backlog() for endpoint in self.endpoints)
+
+    def close(self):
+        for endpoint in self.endpoints:
+            endpoint.close()
+
+
+class RouterReader:
+    """Stands in for LinkReader on a RouterConnection"""
+
+    def __init__(self, router):
+        self.router = router
+
+    def read_batch(self, timeout):
+        return self.router.poll(timeout)
+
+    def backlog(self):
+        return self.router.backlog()
+
+    def set_forwarded(self, msg_ids):
+        self.router.wanted = set(msg_ids)
+
+    def set_tap(self, tap):
+        self.router.tap = tap
+
+    def track_sequences(self, enabled):
+        for endpoint in self.router.endpoints:
+            endpoint.reader.track_sequences(enabled)
+
+    def parse_counters(self):
+        """Every endpoint's parser counters added up; a sender heard on two links counts on both"""
+        total = {'bad_crc': 0, 'skipped_bytes': 0, 'filtered': 0, 'links': {}}
+        for endpoint in self.router.endpoints:
+            counters = endpoint.reader.parse_counters()
+            for key in ('bad_crc', 'skipped_bytes', 'filtered'):
+                total[key] += counters[key]
+            for source, (received, lost, seq) in counters['links'].items():
+                link = total['links'].setdefault(source, [0, 0, seq])
+                link[0] += received
+                link[1] += lost
+        return total
+
+
+class RouterConnection:
+    """The local UI's view of a MAVLinkRouter, shaped like a pymavlink connection.
+
+    Provides mav for encoding and decoding, target ids, post_message,
+    write and close, like RemoteConnection. Anything sent through mav is
+    routed to the endpoints.
+    """
+
+    def __init__(self, addresses, timeout=10, source_system=255, source_component=0):
+        self.addresses = list(addresses)
+        self.address = " ".join(addresses)
+        self.target_system = 0
+        self.target_component = 0
+        self.messages = {}
+        self.fd = None
+        self.mav = mavutil.mavlink.MAVLink(self, srcSystem=source_system, srcComponent=source_component)
+        endpoints = []
+        for address in addresses:
+            try:
+                endpoints.append(Endpoint(address, connect(address, timeout)))
+            except Exception as e:
+                print(f"Error opening endpoint {address}: {e}")
+        if not endpoints:
+            raise ConnectionError(f"Could not open any of {self.address}")
+        self.router = MAVLinkRouter(endpoints)
+        self.reader = RouterReader(self.router)
+
+    def write(self, buf):
+        self.router.send(buf)
+
+    def post_message(self, msg):
+        self.messages[msg.get_type()] = msg
+
+    def close(self):
+        self.router.close()
+
+
+def connect(address, timeout=10):
+    """pymavlink connection for one endpoint; serial ports may be given as device,baud"""
+    device, _, baud = address.partition(',')
+    if baud.isdigit():
+        return mavutil.mavlink_connection(device, baud=int(baud), timeout=timeout)
+    return mavutil.mavlink_connection(address, timeout=timeout)
+
+
+def open_connection(addresses, timeout=10):
+    """A pymavlink connection for one address, a RouterConnection for several"""
+    if isinstance(addresses, str):
+        addresses = [addresses]
+    if len(addresses) == 1:
+        return connect(addresses[0], timeout)
+    return RouterConnection(addresses, timeout)
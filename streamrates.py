@@ -0,0 +1,180 @@
+import threading
+from pymavlink import mavutil
+
+MAV_CMD_SET_MESSAGE_INTERVAL = 511
+MAV_RESULT_ACCEPTED = 0
+MAV_RESULT_UNSUPPORTED = 3
+# Unanswered SET_MESSAGE_INTERVAL rounds in a row before assuming the autopilot ignores it
+MAX_UNANSWERED = 3
+# Seconds before an unanswered round is tried again
+RETRY_DELAY = 2.0
+
+# Legacy REQUEST_DATA_STREAM groups that carry each message on ArduPilot
+DATA_STREAMS = {
+    'SYS_STATUS': mavutil.mavlink.MAV_DATA_STREAM_EXTENDED_STATUS,
+    'GPS_RAW_INT': mavutil.mavlink.MAV_DATA_STREAM_EXTENDED_STATUS,
+    'MISSION_CURRENT': mavutil.mavlink.MAV_DATA_STREAM_EXTENDED_STATUS,
+    'GLOBAL_POSITION_INT': mavutil.mavlink.MAV_DATA_STREAM_POSITION,
+    'ATTITUDE': mavutil.mavlink.MAV_DATA_STREAM_EXTRA1,
+    'VFR_HUD': mavutil.mavlink.MAV_DATA_STREAM_EXTRA2,
+}
+
+
+class StreamRateManager:
+    """Negotiates telemetry rates with the vehicle from what consumers ask for.
+
+    Each consumer registers a {message type: Hz} dict with request(); the
+    rate sent for a message is the highest any consumer wants. Rates go out
+    as MAV_CMD_SET_MESSAGE_INTERVAL, falling back to REQUEST_DATA_STREAM
+    (per stream group) once the autopilot answers UNSUPPORTED, or leaves
+    MAX_UNANSWERED rounds in a row unanswered.
+    reapply() re-sends everything, e.g. after the link comes back, and
+    retarget() moves the rates to another vehicle's link, handing the
+    previous vehicle back to its defaults.
+    """
+
+    def __init__(self, link):
+        self.link = link
+        self._lock = threading.Lock()
+        self.consumers = {}
+        # msg_type -> Hz the vehicle was last asked for
+        self.applied = {}
+        self.use_data_streams = False
+        self.unanswered = 0
+        self.enabled = False
+        # Only touched on the loop thread: one apply() task at a time, rerun
+        # if anything changed while it was awaiting the vehicle
+        self.task = None
+        self.changed = False
+
+    def request(self, consumer, rates):
+        """Set the rates one consumer wants, replacing any it asked for before"""
+        with self._lock:
+            self.consumers[consumer] = dict(rates)
+        self.schedule()
+
+    def release(self, consumer):
+        with self._lock:
+            self.consumers.pop(consumer, None)
+        self.schedule()
+
+    def wanted(self):
+        """Highest requested rate per message type"""
+        rates = {}
+        with self._lock:
+            for consumer_rates in self.consumers.values():
+                for msg_type, hz in consumer_rates.items():
+                    rates[msg_type] = max(hz, rates.get(msg_type, 0))
+        return rates
+
+    def reapply(self):
+        """Forget what the vehicle was told and send every rate again"""
+        self.link.loop.call_soon_threadsafe(self.start_over)
+
+    def start_over(self):
+        self.applied = {}
+        self.enabled = True
+        self.kick()
+
+    def retarget(self, link):
+        """Negotiate with the vehicle behind link from now on"""
+        self.link.loop.call_soon_threadsafe(self.switch_to, link)
+
+    def switch_to(self, link):
+        previous, applied = self.link, self.applied
+        if link is previous:
+            return
+        self.link = link
+        self.applied = {}
+        if applied and not self.use_data_streams:
+            self.link.loop.create_task(self.restore_defaults(previous, applied))
+        self.kick()
+
+    async def restore_defaults(self, link, applied):
+        for msg_type in list(applied):
+            try:
+                await self.set_message_interval(link, msg_type, 0)
+            except Exception as e:
+                print(f"Error restoring stream rate for {msg_type}: {e}")
+
+    def schedule(self):
+        self.link.loop.call_soon_threadsafe(self.kick)
+
+    def kick(self):
+        # Rates only go out once reapply() says there is a vehicle to talk to
+        self.changed = True
+        if self.enabled and self.task is None:
+            self.task = self.link.loop.create_task(self.apply_changes())
+
+    async def apply_changes(self):
+        try:
+            while self.changed:
+                self.changed = False
+                await self.apply()
+        finally:
+            self.task = None
+
+    async def apply(self):
+        # A retarget() while this runs leaves these on the old vehicle's link
+        link, applied = self.link, self.applied
+        wanted = self.wanted()
+        # Types nobody wants any more go back to the autopilot default (0)
+        changes = {msg_type: hz for msg_type, hz in wanted.items() if applied.get(msg_type) != hz}
+        for msg_type in applied:
+            if msg_type not in wanted:
+                changes[msg_type] = 0
+        if not changes:
+            return
+        try:
+            if not self.use_data_streams:
+                for msg_type, hz in changes.items():
+                    result = await self.set_message_interval(link, msg_type, hz)
+                    if result is None:
+                        self.unanswered += 1
+                        if self.unanswered >= MAX_UNANSWERED:
+                            self.use_data_streams = True
+                        else:
+                            # Lost command or ack; what is left goes out on the retry
+                            link.loop.call_later(RETRY_DELAY, self.kick)
+                        break
+                    self.unanswered = 0
+                    if result == MAV_RESULT_UNSUPPORTED:
+                        self.use_data_streams = True
+                        break
+                    if result != MAV_RESULT_ACCEPTED:
+                        # Refused for this message only; don't ask again until it changes
+                        print(f"Error setting stream rate for {msg_type}: result {result}")
+                    if hz:
+                        applied[msg_type] = hz
+                    else:
+                        applied.pop(msg_type, None)
+            if self.use_data_streams:
+                self.request_data_streams(link, wanted)
+                applied.clear()
+                applied.update(wanted)
+        except Exception as e:
+            print(f"Error setting stream rates: {e}")
+
+    async def set_message_interval(self, link, msg_type, hz):
+        """The vehicle's MAV_RESULT for the command, None if it never answered"""
+        msg_id = getattr(mavutil.mavlink, f"MAVLINK_MSG_ID_{msg_type}")
+        # -1 disables a message, 0 restores the default; we never turn one off
+        interval_us = int(1e6 / hz) if hz > 0 else 0
+        try:
+            result = await link.command_long(MAV_CMD_SET_MESSAGE_INTERVAL, msg_id, interval_us,
+                                             timeout=0.5, retries=2)
+        except TimeoutError:
+            return None
+        return result
+
+    def request_data_streams(self, link, wanted):
+        """Fallback: one REQUEST_DATA_STREAM per group, at the fastest rate any of its messages needs"""
+        conn = link.connection
+        streams = {}
+        for msg_type, hz in wanted.items():
+            stream = DATA_STREAMS.get(msg_type)
+            if stream is not None:
+                streams[stream] = max(hz, streams.get(stream, 0))
+        for stream, hz in streams.items():
+            conn.mav.request_data_stream_send(*link.targets(), stream,
+                                              max(1, int(round(hz))), 1)
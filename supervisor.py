@@ -0,0 +1,113 @@
+import random
+import statistics
+
+# Actions returned to the driver
+REOPEN = 'reopen'
+RESYNC = 'resync'
+
+# MAVLink's nominal heartbeat period, assumed until the link shows its own
+HEARTBEAT_PERIOD = 1.0
+# Heartbeats that may go missing before a link counts as stale
+MISSED_HEARTBEATS = 3
+# Heartbeat intervals the period is the median of, so one outage doesn't stretch it
+PERIOD_SAMPLES = 5
+
+
+class Backoff:
+    """Exponential backoff with full jitter.
+
+    The nth delay is drawn uniformly from [0, min(maximum, initial * 2**n)],
+    so the first retry after a short outage comes almost at once, a link
+    that keeps failing is retried no faster than the cap allows, and
+    several links failing together never retry in lockstep.
+    """
+
+    def __init__(self, initial=0.05, maximum=5.0, rng=random.random):
+        self.initial = initial
+        self.maximum = maximum
+        self.rng = rng
+        self.attempts = 0
+
+    def next_delay(self):
+        ceiling = min(self.maximum, self.initial * (2 ** self.attempts))
+        self.attempts += 1
+        return ceiling * self.rng()
+
+    def reset(self):
+        self.attempts = 0
+
+
+class LinkSupervisor:
+    """Link liveness as a state machine with no I/O of its own.
+
+    The driver reports every read that returned traffic and polls with the
+    current time; each call returns a list of actions:
+        (REOPEN,)   the transport looks half-open: close it and reopen it
+        (RESYNC,)   traffic is back after an outage: bring the vehicle
+                    side up to date (stream rates, home, mission)
+
+    A link is stale after MISSED_HEARTBEATS heartbeat periods without
+    traffic, and never sooner than stale_after seconds: a radio dropout,
+    so the transport is kept and we keep listening. The period is
+    measured from the heartbeats the driver reports with heartbeat(), so
+    a heartbeat-only or slow link isn't called stale between beats. One
+    that stays silent for three times that, and at least reopen_after
+    seconds, and can_reopen is reopened, which catches TCP connections
+    whose peer vanished without a FIN. The
+    transport itself (LinkReader) reopens after hard failures and counts
+    them in reconnects; a change in that count also means RESYNC.
+    """
+
+    def __init__(self, stale_after=3.0, reopen_after=10.0, can_reopen=False):
+        self.min_stale_after = stale_after
+        self.min_reopen_after = reopen_after
+        self.can_reopen = can_reopen
+        self.heartbeat_period = HEARTBEAT_PERIOD
+        self.heartbeat_intervals = []
+        self.last_heartbeat = None
+        self.last_traffic = None
+        self.stale = False
+        # Earliest time for the next forced reopen while the link stays silent
+        self.next_reopen = 0.0
+        self.reconnects = 0
+
+    def traffic(self, now, reconnects=0):
+        """A read returned frames; reconnects is the transport's reopen count"""
+        actions = []
+        if self.stale or reconnects != self.reconnects:
+            actions.append((RESYNC,))
+        self.reconnects = reconnects
+        self.last_traffic = now
+        self.stale = False
+        self.next_reopen = 0.0
+        return actions
+
+    def heartbeat(self, now):
+        """The vehicle's heartbeat arrived; their spacing sets how much silence is normal"""
+        if self.last_heartbeat is not None and now > self.last_heartbeat:
+            intervals = self.heartbeat_intervals
+            intervals.append(now - self.last_heartbeat)
+            del intervals[:-PERIOD_SAMPLES]
+            self.heartbeat_period = statistics.median(intervals)
+        self.last_heartbeat = now
+
+    @property
+    def stale_after(self):
+        return max(self.min_stale_after, MISSED_HEARTBEATS * self.heartbeat_period)
+
+    @property
+    def reopen_after(self):
+        return max(self.min_reopen_after, 3 * self.stale_after)
+
+    def poll(self, now):
+        if self.last_traffic is None:
+            # Nothing heard yet: the first heartbeat does the initial sync
+            return []
+        silence = now - self.last_traffic
+        if silence > self.stale_after:
+            self.stale = True
+        reopen_after = self.reopen_after
+        if self.can_reopen and silence > reopen_after and now >= self.next_reopen:
+            self.next_reopen = now + reopen_after
+            return [(REOPEN,)]
+        return []
@@ -1,6 +1,7 @@
 from PyQt6.QtWidgets import QLabel, QFrame, QHBoxLayout, QProgressBar, QVBoxLayout, QWidget , QGraphicsDropShadowEffect
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QColor
+import vehiclestate as vs
 
 class FuturisticProgressBar(QProgressBar):
     def __init__(self, parent=None):
@@ -104,6 +105,9 @@ class DataItem(QFrame):
                 self.progress_bar.setValue(value)
 
 class TelemetryWidget(QWidget):
+    # Telemetry rates (Hz) this widget needs, see streamrates.py
+    STREAM_RATES = {'ATTITUDE': 4, 'VFR_HUD': 4, 'SYS_STATUS': 4, 'GLOBAL_POSITION_INT': 4, 'MISSION_CURRENT': 1}
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setObjectName("TelemetryWidget")
@@ -188,55 +192,54 @@ class TelemetryWidget(QWidget):
         self.calculate_distance_flag = True
         print(f"Home position set to: {lat}, {lon}")
     
-    def update_from_telemetry(self, data):
-        """Update telemetry values from actual MAVLink data"""
-        # Update telemetry values from the data dict
-        if 'alt' in data:  # Changed from 'relative_alt' to 'alt'
-            self.altitude.update_value(data['alt'], 10000)
-        
-        if 'groundspeed' in data:
+    def update_from_telemetry(self, frame):
+        """Update telemetry values from a VehicleState frame"""
+        dirty = frame.dirty
+        # Update telemetry values for the fields that changed in this frame
+        if dirty & vs.ALT:
+            self.altitude.update_value(frame.alt, 10000)
+        
+        if dirty & vs.GROUNDSPEED:
             # Keep as m/s
-            self.speed.update_value(data['groundspeed'], 100)
+            self.speed.update_value(frame.groundspeed, 100)
         
-        if 'heading' in data:
-            self.heading.update_value(data['heading'], 360)
+        if dirty & vs.HEADING:
+            self.heading.update_value(frame.heading, 360)
         
-        if 'battery' in data:
-            self.battery.update_value(data['battery'], 100)
+        if dirty & vs.BATTERY:
+            self.battery.update_value(frame.battery, 100)
         
-        if 'airspeed' in data:
+        if dirty & vs.AIRSPEED:
             # Keep as m/s
-            self.airspeed.update_value(data['airspeed'], 100)
+            self.airspeed.update_value(frame.airspeed, 100)
         
-        if 'distance' in data:
-            self.distance.update_value(data['distance'], 10000)
+        if dirty & vs.DISTANCE:
+            self.distance.update_value(frame.distance, 10000)
         
-        if 'roll' in data:
-            self.roll.update_value(data['roll'], 30)
+        if dirty & vs.ROLL:
+            self.roll.update_value(frame.roll, 30)
         
-        if 'pitch' in data:
-            self.pitch.update_value(data['pitch'], 30)
+        if dirty & vs.PITCH:
+            self.pitch.update_value(frame.pitch, 30)
         
-        if 'yaw' in data:
-            self.yaw.update_value(data['yaw'], 360)
+        if dirty & vs.YAW:
+            self.yaw.update_value(frame.yaw, 360)
         
-        if 'climb' in data:
-            self.climbrate.update_value(data['climb'], 10)
+        if dirty & vs.CLIMB:
+            self.climbrate.update_value(frame.climb, 10)
         
         # Update flight mode if available
-        if 'mode' in data:
-            self.flight_mode.update_value(data['mode'])
+        if dirty & vs.MODE:
+            self.flight_mode.update_value(frame.mode)
         
-        if 'flying_type' in data:
-            self.flying_type.update_value(data['flying_type'])
+        if dirty & vs.FLYING_TYPE:
+            self.flying_type.update_value(frame.flying_type)
             
-        if 'waypoint' in data:
-            current_wp = data['waypoint']
-            total_wp = data.get('total_waypoints', 0)
-            self.update_waypoint(current_wp, total_wp)
+        if dirty & vs.WAYPOINT:
+            self.update_waypoint(frame.waypoint, frame.total_waypoints or 0)
             
-        if 'throttle' in data:
-            self.throttle.update_value(data['throttle'], 100)
+        if dirty & vs.THROTTLE:
+            self.throttle.update_value(frame.throttle, 100)
     
     # For the create_section_header method:
     def create_section_header(self, text, color_scheme="blue"):
@@ -0,0 +1,46 @@
+import socket
+import threading
+import time
+from pymavlink import mavutil
+from transport import LinkReader
+
+FRAMES = 6000
+
+
+def attitude_frames(count):
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    frames = []
+    for i in range(count):
+        frames.append(mav.attitude_encode(i, 0.1, 0.2, 0.3, 0, 0, 0).pack(mav))
+        mav.seq = (mav.seq + 1) % 256
+    return b''.join(frames)
+
+
+def test_tcp_burst_larger_than_ring_is_delivered_whole():
+    data = attitude_frames(FRAMES)
+    assert len(data) > 65536
+    server = socket.create_server(('127.0.0.1', 0))
+    port = server.getsockname()[1]
+
+    def serve():
+        client, _ = server.accept()
+        client.sendall(data)
+        time.sleep(2)
+        client.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    conn = mavutil.mavlink_connection(f"tcp:127.0.0.1:{port}", autoreconnect=False)
+    try:
+        reader = LinkReader(conn)
+        # Let the whole burst queue up in the socket before the first read
+        time.sleep(0.3)
+        received = 0
+        deadline = time.monotonic() + 5
+        while received < FRAMES and time.monotonic() < deadline:
+            received += len(reader.read_batch(0.1))
+        assert received == FRAMES
+        assert reader.parser.skipped_bytes == 0
+    finally:
+        conn.close()
+        server.close()
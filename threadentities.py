@@ -3,30 +3,127 @@ from PyQt6.QtCore import QThread, pyqtSignal
 
 import time
 import math
+import queue
+import threading
 from PyQt6.QtCore import QThread, pyqtSignal, pyqtSlot
 from pymavlink import mavutil
+from messagebus import MessageBus
+from vehiclestate import VehicleState
+import vehiclestate as vs
+from vehicles import Vehicle
+from transport import LinkReader
+from ingestproc import RemoteConnection
+from router import RouterConnection, open_connection
+from discovery import discover
+from recorder import TlogRecorder
+from replay import ReplayConnection
+from asynclink import AsyncLink, MAV_RESULT_ACCEPTED
+from missioncache import MissionCache
+from streamrates import StreamRateManager
+from ingeststats import IngestStats
+from latency import TRACER
+from supervisor import Backoff, LinkSupervisor, REOPEN, RESYNC
+from mavframe import (MAVLinkFrameParser, FastPathDecoder, MSG_ID_HEARTBEAT, MSG_ID_GPS_RAW_INT,
+                      MSG_ID_GLOBAL_POSITION_INT, frame_source, is_vehicle_heartbeat, msg_ids_for)
 
 class MonitoringThread(QThread):
-    data_updated = pyqtSignal(dict)
+    data_updated = pyqtSignal(object)
     status_text_received = pyqtSignal(int, str)
     waypoints_updated = pyqtSignal(list)
+    mission_progress = pyqtSignal(int, int)
     connection_status_changed = pyqtSignal(bool, str)
+    # Sorted system IDs of every vehicle heard so far
+    vehicles_changed = pyqtSignal(list)
+    vehicle_focused = pyqtSignal(int)
+    # [lat, lon] points the focused vehicle had flown when a replay was seeked
+    track_replaced = pyqtSignal(list)
+
+    # Message types process_message needs decoded, whether or not anyone is subscribed
+    HANDLED_TYPES = ['STATUSTEXT', 'MISSION_CURRENT', 'HOME_POSITION']
     
-    def __init__(self, mavlink_connection):
+    def __init__(self, mavlink_connection, snapshot_rate=None, record_path=None):
         super().__init__()
         self.mavlink_connection = mavlink_connection
         self.running = False
-        self.waypoints = []
-        self.home_lat = None
-        self.home_lon = None
-        self.home_alt = None
-        self.current_waypoint = 0
-        self.total_waypoints = 0
-        self.home_emitted = False
         self.messages_widget = None
         self.connection_healthy = True
-        self.reconnect_attempts = 0
         self.last_heartbeat_time = time.time()
+        # This thread is the only reader of the connection; everything else
+        # subscribes to the messages it decodes
+        self.bus = MessageBus()
+        # Telemetry is demultiplexed by system ID into one Vehicle each.
+        # data_updated carries frames of the focused vehicle's state only,
+        # so the GUI does the same work however many vehicles are flying.
+        self.vehicles = {}
+        self.focused = None
+        # The focused vehicle's state; a blank stand-in until one is heard
+        self.state = VehicleState()
+        # Snapshot mode: emit one frame at snapshot_rate Hz instead of one
+        # data_updated per message. None keeps per-message emits.
+        self.snapshot_rate = snapshot_rate
+        self.last_snapshot_time = 0.0
+        # Raw frames are split here and the hot telemetry types decoded
+        # straight into each vehicle's state; everything else goes through pymavlink
+        self.parser = MAVLinkFrameParser()
+        # Drains the link in large reads straight into the parser's ring. With
+        # a RemoteConnection the link is read and the hot types decoded in the
+        # ingest process; this thread only merges its results.
+        self.remote = isinstance(mavlink_connection, RemoteConnection)
+        # With several endpoints the router reads them all and hands over its local share
+        self.routed = isinstance(mavlink_connection, RouterConnection)
+        # A recorded tlog played back on its own clock through this same path
+        self.replay = isinstance(mavlink_connection, ReplayConnection)
+        if self.remote or self.routed or self.replay:
+            self.reader = mavlink_connection.reader
+        else:
+            self.reader = LinkReader(mavlink_connection, self.parser)
+        # Seeks of the replay already applied to the vehicles' state
+        self.replay_seeks = 0
+        # Raw frames to a tlog, taken before the frame filter so nothing is left out
+        self.recorder = None
+        if record_path:
+            self.start_recording(record_path)
+        self.fast_path = FastPathDecoder()
+        # The filter is swapped in on the subscribing thread itself, so a
+        # reply to a request sent right after subscribing can't be dropped
+        self.filter_lock = threading.Lock()
+        self.bus.watch(self.update_frame_filter)
+        self.update_frame_filter()
+        # Request/response exchanges (mission download, commands) run as
+        # coroutines on the shared asyncio loop, fed from self.bus, so they
+        # never block this thread. Their results come back through self.calls.
+        self.link = AsyncLink(mavlink_connection)
+        self.link.attach_bus(self.bus)
+        self.calls = queue.SimpleQueue()
+        # When the current batch came off the link; stamps every field it updates
+        self.received_at = 0.0
+        # Per-message ingest counters and timings, None unless enable_stats() is called
+        self.stats = None
+        # Widgets register the rates they need here; sent to the focused vehicle once it is found
+        self.stream_rates = StreamRateManager(self.link)
+        # Tells dropouts from dead transports and says when to resync; the
+        # reader itself reopens a failed TCP or serial link with backoff
+        self.supervisor = LinkSupervisor(can_reopen=isinstance(self.reader, LinkReader) and self.reader.can_reopen())
+        # Paces retries on links that keep raising without reopening themselves
+        self.error_backoff = Backoff()
+        # Missions the vehicle confirms are unchanged load from disk on reconnect
+        try:
+            self.mission_cache = MissionCache()
+        except Exception as e:
+            print(f"Mission cache unavailable: {e}")
+            self.mission_cache = None
+        
+    def start_recording(self, path):
+        if self.remote:
+            # The ingest process reads every frame; this side only sees the forwarded ones
+            self.reader.record(path)
+            return
+        try:
+            self.recorder = TlogRecorder(path)
+        except OSError as e:
+            print(f"Error starting recording {path}: {e}")
+            return
+        self.reader.set_tap(self.recorder.record)
         
     def connect_mavlink_messages(self, messages_widget):
         self.messages_widget = messages_widget
@@ -34,29 +131,39 @@ class MonitoringThread(QThread):
     def run(self):
         self.running = True
         self.connection_status_changed.emit(True, "Connected")
-        self.request_waypoints()
-        self.request_home_position()
+        recv_timeout = 0.5
+        if self.snapshot_rate:
+            recv_timeout = min(recv_timeout, 1.0 / self.snapshot_rate)
         
         while self.running:
             try:
-                if time.time() - self.last_heartbeat_time > 5:
-                    if self.connection_healthy:
-                        self.connection_healthy = False
-                        self.connection_status_changed.emit(False, "Connection lost - waiting for heartbeat")
-                        if self.messages_widget:
-                            self.messages_widget.add_message(3, "Connection lost - waiting for heartbeat")
-                msg = self.mavlink_connection.recv_match(blocking=True, timeout=0.5)
-                
-                if msg:
-                    msg_type = msg.get_type()
-                    if msg_type == 'HEARTBEAT':
-                        self.last_heartbeat_time = time.time()
-                        if not self.connection_healthy:
-                            self.connection_healthy = True
-                            self.connection_status_changed.emit(True, "Connection restored")
-                            if self.messages_widget:
-                                self.messages_widget.add_message(7, "Connection restored")
-                    self.process_message(msg, msg_type)
+                # A paused or finished replay is not a lost link
+                if not self.replay:
+                    self.check_heartbeats()
+                while not self.calls.empty():
+                    self.calls.get()()
+                for action in self.supervisor.poll(time.monotonic()):
+                    self.supervise(action)
+                frames = self.reader.read_batch(recv_timeout)
+                self.received_at = time.monotonic()
+                if self.stats is not None:
+                    self.stats.batch(frames, self.reader.backlog())
+                if self.remote:
+                    self.merge_remote_state()
+                for msgid, frame in frames:
+                    try:
+                        self.process_frame(msgid, frame)
+                    except Exception as e:
+                        print(f"Error decoding message {msgid}: {e}")
+                if frames:
+                    self.link_alive()
+                # After the frames, so any read before the seek can't overwrite the restored state
+                if self.replay and self.reader.seeks != self.replay_seeks:
+                    self.jump_replay()
+                elif self.replay:
+                    self.follow_replay_missions(self.reader.stamp())
+                if self.state.dirty:
+                    self.publish_state()
                     
             except ConnectionError as e:
                 self.handle_connection_error(str(e))
@@ -67,194 +174,385 @@ class MonitoringThread(QThread):
                     self.messages_widget.add_message(3, f"Error in monitoring thread: {str(e)}")
                 self.msleep(100)
     
+    def update_frame_filter(self):
+        """Only let through frames that the fast path, this thread or a bus subscriber uses"""
+        with self.filter_lock:
+            wanted = msg_ids_for(set(self.HANDLED_TYPES) | self.bus.subscribed_types())
+            if self.remote:
+                self.reader.set_forwarded(wanted)
+            elif self.routed or self.replay:
+                self.reader.set_forwarded(wanted | set(self.fast_path.handlers))
+            else:
+                self.parser.wanted = wanted | set(self.fast_path.handlers)
+    
+    def jump_replay(self):
+        """The replay was seeked: put every vehicle into its recorded state at the new position"""
+        self.replay_seeks, stamp = self.reader.last_seek()
+        timeline = self.reader.timeline
+        now = time.monotonic()
+        for sysid, recorded in timeline.state_at(stamp).items():
+            known = recorded.known()
+            if not known:
+                continue
+            vehicle = self.vehicle(sysid)
+            state = vehicle.state
+            for name in vs.FIELDS:
+                setattr(state, name, getattr(recorded, name))
+            state.mark(known, now)
+            vehicle.last_heard = now
+            if known & vs.POSITION == vs.POSITION:
+                self.calculate_distance_from_home(vehicle, now)
+        for vehicle in self.vehicles.values():
+            # The recorded fields were just restored; check them against the mission again
+            vehicle.replay_mission = False
+        self.follow_replay_missions(stamp)
+        if self.focused is not None:
+            self.track_replaced.emit(timeline.track_until(self.focused.sysid, stamp))
+        self.last_snapshot_time = 0.0
+    
+    def follow_replay_missions(self, stamp):
+        """Give each vehicle the mission it had sent by log time stamp"""
+        timeline = self.reader.timeline
+        for vehicle in self.vehicles.values():
+            waypoints = timeline.mission_at(vehicle.sysid, stamp)
+            if waypoints is vehicle.replay_mission:
+                continue
+            vehicle.replay_mission = waypoints
+            if waypoints is None:
+                # Seeked back before any download: the recorded waypoint fields refer to nothing shown
+                vehicle.current_waypoint = 0
+                vehicle.state.waypoint = None
+                vehicle.state.total_waypoints = None
+                vehicle.state.mark(vs.WAYPOINT | vs.TOTAL_WAYPOINTS, time.monotonic())
+                vehicle.waypoints = []
+                vehicle.total_waypoints = 0
+                if vehicle is self.focused:
+                    self.waypoints_updated.emit([])
+            else:
+                if vehicle.state.waypoint is not None:
+                    vehicle.current_waypoint = vehicle.state.waypoint
+                self.process_mission(vehicle, waypoints)
+    
+    def merge_remote_state(self):
+        """Fold telemetry decoded by the ingest process into each vehicle's state"""
+        masks = self.reader.merge_into(lambda sysid: self.vehicle(sysid).state)
+        now = time.monotonic()
+        for sysid, mask in masks.items():
+            vehicle = self.vehicles[sysid]
+            vehicle.last_heard = now
+            if not vehicle.healthy:
+                self.restore(vehicle)
+            if mask & vs.POSITION:
+                self.check_and_add_home_position(vehicle, now)
+                self.calculate_distance_from_home(vehicle, now)
+    
+    def link_alive(self):
+        """Frames arrived: clear any link error and resync after an outage"""
+        self.error_backoff.reset()
+        for action in self.supervisor.traffic(self.received_at, getattr(self.reader, 'reconnects', 0)):
+            self.supervise(action)
+        if not self.connection_healthy and (self.focused is None or self.focused.healthy):
+            self.connection_healthy = True
+            self.connection_status_changed.emit(True, "Connection restored")
+            if self.messages_widget:
+                self.messages_widget.add_message(7, "Connection restored")
+    
+    def supervise(self, action):
+        if action[0] == REOPEN and self.reader.down is None:
+            print("No traffic on the link; reopening it")
+            self.reader.fail("no traffic")
+        elif action[0] == RESYNC:
+            for vehicle in self.vehicles.values():
+                # Vehicles that were lost resync when they are heard again
+                if vehicle.healthy and vehicle.identified:
+                    self.resync(vehicle)
+    
+    def resync(self, vehicle):
+        """Bring a vehicle back up to date after an outage without re-downloading what is unchanged"""
+        if vehicle is self.focused:
+            self.request_stream_rates()
+        self.request_home_position(vehicle)
+        # Confirmed against the mission cache; only a changed mission transfers again
+        self.request_waypoints(vehicle)
+    
+    def vehicle(self, sysid):
+        """The Vehicle for a system ID, added on first sight"""
+        vehicle = self.vehicles.get(sysid)
+        if vehicle is None:
+            vehicle = self.vehicles[sysid] = Vehicle(sysid, self.link.for_vehicle(sysid))
+            self.vehicles_changed.emit(sorted(self.vehicles))
+            if self.focused is None:
+                self.focus(sysid)
+            elif self.messages_widget:
+                self.messages_widget.add_message(6, f"Vehicle {sysid} detected")
+        return vehicle
+    
+    def set_focus(self, sysid):
+        """Show another vehicle; safe to call from any thread"""
+        self.calls.put(lambda: self.focus(sysid))
+    
+    def focus(self, sysid):
+        """Make sysid the vehicle data_updated reports, starting with everything known about it"""
+        vehicle = self.vehicles.get(sysid)
+        previous = self.focused
+        if vehicle is None or vehicle is previous:
+            return
+        self.focused = vehicle
+        self.state = vehicle.state
+        # Anything still addressing the connection directly follows the focus
+        conn = self.mavlink_connection
+        conn.target_system, conn.target_component = vehicle.sysid, vehicle.compid
+        self.stream_rates.retarget(vehicle.link)
+        self.vehicle_focused.emit(sysid)
+        if previous is not None:
+            self.connection_healthy = vehicle.healthy
+            self.connection_status_changed.emit(vehicle.healthy, "Connected" if vehicle.healthy
+                                                else "Connection lost - waiting for heartbeat")
+            self.waypoints_updated.emit(vehicle.waypoints)
+        vehicle.state.dirty |= vehicle.state.known()
+        if vehicle.state.dirty:
+            self.last_snapshot_time = 0.0
+            self.publish_state()
+    
+    def process_frame(self, msgid, frame):
+        """Decode one raw frame, through the fast path when the type is hot"""
+        conn = self.mavlink_connection
+        stats = self.stats
+        if stats is not None:
+            start = time.perf_counter_ns()
+        if self.fast_path.handles(msgid):
+            sysid, compid, _ = frame_source(frame)
+            fields = None
+            if msgid == MSG_ID_HEARTBEAT:
+                # GCSs and peripherals send heartbeats too; only an autopilot's adds a vehicle
+                fields = self.fast_path.unpack(self.fast_path.HEARTBEAT, frame)
+                vehicle = self.vehicle(sysid) if is_vehicle_heartbeat(compid, fields) else self.vehicles.get(sysid)
+            else:
+                vehicle = self.vehicle(sysid)
+            if vehicle is not None:
+                vehicle.last_heard = self.received_at
+                if not vehicle.healthy:
+                    self.restore(vehicle)
+                # With remote ingest the hot types were already applied in the ingest process
+                if not self.remote:
+                    now = self.received_at
+                    self.fast_path.decode(msgid, frame, vehicle.state, now)
+            # Only build a pymavlink object if someone on the bus wants one
+            msg_type = self.fast_path.msg_types[msgid]
+            msg = conn.mav.decode(bytearray(frame)) if self.bus.has_subscribers(msg_type) else None
+            if stats is not None:
+                decoded = time.perf_counter_ns()
+            if msgid == MSG_ID_HEARTBEAT:
+                self.process_heartbeat(vehicle, compid, fields)
+            elif not self.remote and (msgid == MSG_ID_GPS_RAW_INT or msgid == MSG_ID_GLOBAL_POSITION_INT):
+                self.check_and_add_home_position(vehicle, now)
+                self.calculate_distance_from_home(vehicle, now)
+            if msg is not None:
+                conn.post_message(msg)
+                self.bus.publish(msg, msg_type)
+        else:
+            msg = conn.mav.decode(bytearray(frame))
+            if stats is not None:
+                decoded = time.perf_counter_ns()
+            conn.post_message(msg)
+            msg_type = msg.get_type()
+            self.process_message(msg, msg_type)
+            self.bus.publish(msg, msg_type)
+        if stats is not None:
+            stats.record(msgid, len(frame), decoded - start, time.perf_counter_ns() - decoded)
+    
+    def enable_stats(self, enabled=True):
+        """Turn ingest instrumentation on or off; see ingeststats.py"""
+        if enabled and self.stats is None:
+            self.stats = IngestStats()
+            self.reader.track_sequences(True)
+        elif not enabled and self.stats is not None:
+            self.reader.track_sequences(False)
+            self.stats = None
+    
     def process_message(self, msg, msg_type):
-        """Process a MAVLink message based on its type"""
-        data = {}
+        """Process a pymavlink-decoded message based on its type"""
+        vehicle = self.vehicles.get(msg.get_srcSystem())
+        now = time.monotonic()
         
         if msg_type == 'STATUSTEXT':
-            self.process_statustext(msg)
+            self.process_statustext(msg, vehicle)
             
-        elif msg_type == 'GPS_RAW_INT':
-            data['lat'], data['lon'], data['alt'] = msg.lat / 1e7, msg.lon / 1e7, msg.alt / 1000.0
-            
-        elif msg_type == 'GLOBAL_POSITION_INT':
-            data['lat'], data['lon'], data['alt'], data['relative_alt'] = msg.lat / 1e7, msg.lon / 1e7, msg.alt / 1000.0, msg.relative_alt / 1000.0
-            
-        elif msg_type == 'ATTITUDE':
-            data['roll'], data['pitch'], data['yaw'] = math.degrees(msg.roll), math.degrees(msg.pitch), math.degrees(msg.yaw) 
-            
-        elif msg_type == 'VFR_HUD':
-            data['heading'], data['alt'], data['groundspeed'], data['airspeed'], data['climb'], data['throttle'] = msg.heading, msg.alt, msg.groundspeed, msg.airspeed, msg.climb, msg.throttle
-            
-        elif msg_type == 'SYS_STATUS':
-            self.process_sys_status(msg, data)
-        
-        elif msg_type == 'HEARTBEAT':
-            self.process_heartbeat(msg, data)
+        elif vehicle is None:
+            return
             
         elif msg_type == 'MISSION_CURRENT':
-            data['waypoint'] = msg.seq
-            self.current_waypoint = msg.seq
-            # Always include the total waypoints when we send current waypoint
-            data['total_waypoints'] = self.total_waypoints
+            vehicle.current_waypoint = msg.seq
+            # Always flag the total waypoints along with the current waypoint
+            state = vehicle.state
+            state.waypoint, state.total_waypoints = msg.seq, vehicle.total_waypoints
+            state.mark(vs.WAYPOINT | vs.TOTAL_WAYPOINTS, now)
             
-        elif msg_type == 'MISSION_COUNT':
-            data['total_waypoints'] = msg.count
-            self.total_waypoints = msg.count
-            # Also include the current waypoint when we send total waypoints
-            data['waypoint'] = self.current_waypoint
-            if msg.count > 0:
-                self.request_waypoint_details()
-        elif msg_type in ['MISSION_ITEM', 'MISSION_ITEM_INT']:
-            seq = msg.seq
-            lat = msg.x if msg_type == 'MISSION_ITEM' else msg.x / 1e7
-            lng = msg.y if msg_type == 'MISSION_ITEM' else msg.y / 1e7
-            alt = msg.z
-            self.process_waypoint(seq, lat, lng, alt)
         elif msg_type == 'HOME_POSITION':
-            self.process_home_position(msg, data)
-        self.check_and_add_home_position(data)
-        self.calculate_distance_from_home(data)
-        if data:
-            self.data_updated.emit(data)
-        if 'waypoint' in data and 'total_waypoints' not in data:
-            data['total_waypoints'] = self.total_waypoints
-        elif 'total_waypoints' in data and 'waypoint' not in data:
-            data['waypoint'] = self.current_waypoint
-    
-    def process_statustext(self, msg):
+            self.process_home_position(vehicle, msg, now)
+    
+    def publish_state(self):
+        """Emit a frame of the vehicle state, at most snapshot_rate times a second in snapshot mode"""
+        if self.snapshot_rate:
+            now = time.monotonic()
+            if now - self.last_snapshot_time < 1.0 / self.snapshot_rate:
+                return
+            self.last_snapshot_time = now
+        frame = self.state.frame()
+        stamp = frame.oldest_stamp(frame.dirty)
+        if stamp:
+            TRACER.record('monitor', 'emit', stamp)
+        self.data_updated.emit(frame)
+    
+    def process_statustext(self, msg, vehicle):
         """Process a STATUSTEXT message"""
         severity = msg.severity
         text = msg.text
         if isinstance(text, bytes):
             text = text.decode('utf-8', 'ignore')
         text = text.strip('\0')
+        if vehicle is not None and len(self.vehicles) > 1:
+            text = vehicle.label(text)
         if self.messages_widget:
             self.messages_widget.add_message(severity, text)
     
-    def process_sys_status(self, msg, data):
-        """Process a SYS_STATUS message"""
-        if hasattr(msg, 'battery_remaining'):
-            data['battery'] = msg.battery_remaining  
-        elif hasattr(msg, 'voltage_battery'):
-            voltage = msg.voltage_battery / 1000.0 
-            cell_count = 3 
-            min_voltage = 3.2 * cell_count
-            max_voltage = 4.2 * cell_count
-            if voltage > min_voltage:
-                battery_pct = ((voltage - min_voltage) / (max_voltage - min_voltage)) * 100
-                data['battery'] = min(100, max(0, battery_pct)) 
-            else:
-                data['battery'] = 0
-    
-    def process_heartbeat(self, msg, data):
-        """Process a HEARTBEAT message"""
-        if hasattr(msg, 'custom_mode'):
-            mode_mapping = {0: "STABILIZE", 1: "ACRO", 2: "ALT_HOLD", 3: "AUTO", 4: "GUIDED", 5: "LOITER", 6: "RTL", 7: "CIRCLE", 8: "POSITION", 9: "LAND", 10: "OF_LOITER",
-                        11: "DRIFT", 12: "SPORT", 13: "FLIP", 14: "AUTOTUNE", 15: "POSHOLD", 16: "BRAKE", 17: "THROW", 18: "AVOID_ADSB", 19: "GUIDED_NOGPS",
-                        20: "SMART_RTL", 21: "FLOWHOLD", 22: "FOLLOW", 23: "ZIGZAG", 24: "SYSTEMID", 25: "AUTOROTATE", 26: "AUTO_RTL"}
-            mode = mode_mapping.get(msg.custom_mode, f"UNKNOWN_{msg.custom_mode}")
-            data['mode'] = mode
-            
-            if mode in ["AUTO", "GUIDED", "RTL", "SMART_RTL", "AUTO_RTL"]:
-                data['flying_type'] = "Auto"
-            elif mode in ["LOITER", "CIRCLE", "POSHOLD"]:
-                data['flying_type'] = "Assisted"
-            elif mode == "RTL":
-                data['flying_type'] = "Return"
-            else:
-                data['flying_type'] = "Manual"
+    def check_heartbeats(self):
+        """Flag the link as lost after 5 s without a heartbeat, and each vehicle after 5 s unheard"""
+        if not self.vehicles:
+            if time.time() - self.last_heartbeat_time > 5 and self.connection_healthy:
+                self.connection_healthy = False
+                self.connection_status_changed.emit(False, "Connection lost - waiting for heartbeat")
+                if self.messages_widget:
+                    self.messages_widget.add_message(3, "Connection lost - waiting for heartbeat")
+            return
+        now = time.monotonic()
+        for vehicle in self.vehicles.values():
+            if vehicle.healthy and now - vehicle.last_heard > 5:
+                vehicle.healthy = False
+                self.report_health(vehicle, 3, "Connection lost - waiting for heartbeat")
     
-    def process_home_position(self, msg, data):
+    def report_health(self, vehicle, severity, text):
+        if vehicle is self.focused:
+            self.connection_healthy = vehicle.healthy
+            self.connection_status_changed.emit(vehicle.healthy, text)
+        if self.messages_widget:
+            self.messages_widget.add_message(severity, vehicle.label(text) if len(self.vehicles) > 1 else text)
+    
+    def restore(self, vehicle):
+        vehicle.healthy = True
+        self.report_health(vehicle, 7, "Connection restored")
+        if vehicle.identified:
+            self.resync(vehicle)
+    
+    def process_heartbeat(self, vehicle, compid, fields):
+        """Track link health and lock onto a vehicle from a fast-path HEARTBEAT"""
+        self.last_heartbeat_time = time.time()
+        if vehicle is None or not is_vehicle_heartbeat(compid, fields):
+            return
+        if self.focused is None or vehicle is self.focused:
+            # Other vehicles' heartbeats would interleave and shorten the measured period
+            self.supervisor.heartbeat(self.received_at)
+        if not vehicle.identified:
+            self.identify(vehicle, compid)
+    
+    def identify(self, vehicle, compid):
+        """First autopilot heartbeat from a vehicle: address it and fetch its mission and home"""
+        vehicle.identify(compid)
+        if vehicle is self.focused:
+            # pymavlink's post_message normally sets this; the fast path skips it
+            conn = self.mavlink_connection
+            conn.target_system, conn.target_component = vehicle.sysid, compid
+            self.request_stream_rates()
+        self.request_waypoints(vehicle)
+        self.request_home_position(vehicle)
+    
+    def process_home_position(self, vehicle, msg, now):
         """Process a HOME_POSITION message"""
-        self.home_lat = msg.latitude / 1e7
-        self.home_lon = msg.longitude / 1e7
-        self.home_alt = msg.altitude / 1000.0
-        data['home_lat'] = self.home_lat
-        data['home_lon'] = self.home_lon
-        data['home_alt'] = self.home_alt
-        self.home_emitted = True
-    
-    def check_and_add_home_position(self, data):
-        """Check if we need to add home position to the data"""
-        if ('lat' in data and 'lon' in data and 
-            self.home_lat is not None and self.home_lon is not None and not self.home_emitted):
-            data['home_lat'] = self.home_lat
-            data['home_lon'] = self.home_lon
-            data['home_alt'] = self.home_alt
-            self.home_emitted = True
-    
-    def calculate_distance_from_home(self, data):
-        """Calculate distance from home if we have position data"""
-        if ('lat' in data and 'lon' in data and 
-            self.home_lat is not None and self.home_lon is not None):
+        state = vehicle.state
+        state.home_lat = msg.latitude / 1e7
+        state.home_lon = msg.longitude / 1e7
+        state.home_alt = msg.altitude / 1000.0
+        state.mark(vs.HOME, now)
+        vehicle.home_emitted = True
+    
+    def check_and_add_home_position(self, vehicle, now):
+        """Re-flag a known home position once position data starts arriving"""
+        state = vehicle.state
+        if state.home_lat is not None and state.home_lon is not None and not vehicle.home_emitted:
+            state.mark(vs.HOME, now)
+            vehicle.home_emitted = True
+    
+    def calculate_distance_from_home(self, vehicle, now):
+        """Calculate distance from home after a position update"""
+        state = vehicle.state
+        if state.home_lat is not None and state.home_lon is not None:
             try:
                 R = 6371000 
-                lat1 = math.radians(self.home_lat)
-                lon1 = math.radians(self.home_lon)
-                lat2 = math.radians(data['lat'])
-                lon2 = math.radians(data['lon'])
+                lat1 = math.radians(state.home_lat)
+                lon1 = math.radians(state.home_lon)
+                lat2 = math.radians(state.lat)
+                lon2 = math.radians(state.lon)
                 dlat = lat2 - lat1
                 dlon = lon2 - lon1
                 a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
                 c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-                distance = R * c
-                data['distance'] = distance
+                state.distance = R * c
+                state.mark(vs.DISTANCE, now)
             except Exception as e:
                 print(f"Error calculating distance: {e}")
     
-    def request_home_position(self):
+    def request_stream_rates(self):
+        # Nothing in a recording answers SET_MESSAGE_INTERVAL; its rates are what was recorded
+        if not self.replay:
+            self.stream_rates.reapply()
+    
+    def request_home_position(self, vehicle):
+        # A recording can't be asked anything; whatever replies it holds arrive on their own
+        if not self.replay:
+            self.link.submit(self.fetch_home_position(vehicle))
+        
+    def request_waypoints(self, vehicle):
+        if not self.replay:
+            self.link.submit(self.download_mission(vehicle))
+    
+    async def fetch_home_position(self, vehicle):
+        """Ask for HOME_POSITION; the reply itself arrives through process_message"""
         try:
-            self.mavlink_connection.mav.command_long_send(
-                self.mavlink_connection.target_system,
-                self.mavlink_connection.target_component,
-                512, 
-                0,   
-                242, 
-                0, 0, 0, 0, 0, 0
-            )
+            result = await vehicle.link.request_message(242)
+            if result != MAV_RESULT_ACCEPTED:
+                print(f"Home position request rejected: {result}")
         except Exception as e:
             print(f"Error requesting home position: {e}")
             if self.messages_widget:
                 self.messages_widget.add_message(3, f"Error requesting home position: {str(e)}")
+    
+    async def download_mission(self, vehicle):
+        def progress(received, count):
+            if vehicle is self.focused:
+                self.mission_progress.emit(received, count)
         
-    def request_waypoints(self):
         try:
-            self.mavlink_connection.mav.mission_request_list_send(
-                self.mavlink_connection.target_system,
-                self.mavlink_connection.target_component
-            )
+            items = await vehicle.link.mission_download(progress=progress, cache=self.mission_cache)
         except Exception as e:
             print(f"Error requesting waypoints: {e}")
             if self.messages_widget:
                 self.messages_widget.add_message(3, f"Error requesting waypoints: {str(e)}")
+            return
+        waypoints = []
+        for item in items:
+            scale = 1e7 if item.get_type() == 'MISSION_ITEM_INT' else 1
+            waypoints.append({'lat': item.x / scale, 'lng': item.y / scale, 'alt': item.z})
+        self.calls.put(lambda: self.process_mission(vehicle, waypoints))
     
-    def request_waypoint_details(self):
-        for i in range(self.total_waypoints):
-            try:
-                self.mavlink_connection.mav.mission_request_send(
-                    self.mavlink_connection.target_system,
-                    self.mavlink_connection.target_component,
-                    i
-                )
-                self.msleep(50)
-            except Exception as e:
-                print(f"Error requesting waypoint {i}: {e}")
-                if self.messages_widget:
-                    self.messages_widget.add_message(3, f"Error requesting waypoint {i}: {str(e)}")
-    
-    def process_waypoint(self, seq, lat, lng, alt):
-        while len(self.waypoints) <= seq:
-            self.waypoints.append(None)
-        
-        self.waypoints[seq] = {
-            'lat': lat,
-            'lng': lng,
-            'alt': alt
-        }
-        
-        if None not in self.waypoints and len(self.waypoints) == self.total_waypoints:
-            self.waypoints_updated.emit(self.waypoints)
+    def process_mission(self, vehicle, waypoints):
+        """Apply a downloaded mission on this thread"""
+        vehicle.waypoints = waypoints
+        vehicle.total_waypoints = len(waypoints)
+        state = vehicle.state
+        state.waypoint, state.total_waypoints = vehicle.current_waypoint, vehicle.total_waypoints
+        state.mark(vs.WAYPOINT | vs.TOTAL_WAYPOINTS, time.monotonic())
+        if waypoints and vehicle is self.focused:
+            self.waypoints_updated.emit(vehicle.waypoints)
     
     def handle_connection_error(self, error_message):
         if self.connection_healthy:
@@ -262,47 +560,48 @@ class MonitoringThread(QThread):
             self.connection_status_changed.emit(False, f"Connection error: {error_message}")
             if self.messages_widget:
                 self.messages_widget.add_message(3, f"Connection error: {error_message}")
-        self.reconnect_attempts += 1
-        if self.reconnect_attempts > 3:
-            self.msleep(2000)
-        else:
-            self.msleep(500)
-    
-    def attempt_reconnect(self):
-        try:
-            if hasattr(self.mavlink_connection, 'close'):
-                self.mavlink_connection.close()
-            connection_string = self.mavlink_connection.address
-            self.mavlink_connection = mavutil.mavlink_connection(connection_string)
-            self.last_heartbeat_time = time.time()
-            self.connection_healthy = True
-            self.reconnect_attempts = 0
-            if self.messages_widget:
-                self.messages_widget.add_message(6, f"Attempting to reconnect to {connection_string}")
-            self.request_waypoints()
-            self.request_home_position()
-            return True
-        except Exception as e:
-            if self.messages_widget:
-                self.messages_widget.add_message(3, f"Reconnection failed: {str(e)}")
-            print(f"Reconnection failed: {e}")
-            return False
+        if getattr(self.reader, 'down', None) is None:
+            # The reader won't reopen this link itself; don't spin on the error
+            self.msleep(int(self.error_backoff.next_delay() * 1000))
     
     def stop(self):
         self.running = False
         self.wait()
+        for vehicle in self.vehicles.values():
+            vehicle.link.close()
+        self.link.close()
+        if self.recorder is not None:
+            self.recorder.close()
 
 class ConnectionThread(QThread):
     connection_result = pyqtSignal(bool, object)
     
-    def __init__(self, connection_string, timeout):
+    def __init__(self, connection_string, timeout, out_of_process=False, autoconnect=False, replay=False):
         super().__init__()
+        # One address, or a list of endpoints to route between (see router.py)
         self.connection_string = connection_string
         self.timeout = timeout
+        # Read and decode the link in a separate process (see ingestproc.py)
+        self.out_of_process = out_of_process
+        # Treat connection_string as candidates (None for the defaults) and use the first with a vehicle
+        self.autoconnect = autoconnect
+        # connection_string is a tlog to play back (see replay.py)
+        self.replay = replay
         
     def run(self):
         try:
-            connection = mavutil.mavlink_connection(self.connection_string, timeout=self.timeout)
+            if self.replay:
+                # Opening may index the log on first use, so it happens here off the GUI thread
+                self.connection_result.emit(True, ReplayConnection(self.connection_string))
+                return
+            if self.autoconnect:
+                self.connection_string = discover(self.connection_string, self.timeout)
+                print(f"Autoconnect: vehicle found on {self.connection_string}")
+            if self.out_of_process:
+                connection = RemoteConnection(self.connection_string)
+                connection.start(self.timeout)
+            else:
+                connection = open_connection(self.connection_string, self.timeout)
             self.connection_result.emit(True, connection)
         except Exception as e:
             self.connection_result.emit(False, e)
\ No newline at end of file
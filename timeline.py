@@ -0,0 +1,289 @@
+import bisect
+import math
+import struct
+from array import array
+from pymavlink import mavutil
+import vehiclestate as vs
+from vehiclestate import FIELDS, VehicleState
+from mavframe import FastPathDecoder, COPTER_MODES, flying_type_for_mode, frame_source
+from ingestproc import mode_code, MODE_INDEX, INT_FIELDS
+
+# One entry: log stamp in us, KEYFRAME or DELTA, sysid, field mask, then a value per field in mask.
+# A MISSION entry has the item count in place of the mask, then a MISSION_POINT per item.
+ENTRY = struct.Struct('<QBBI')
+MISSION_POINT = struct.Struct('<ddf')    # lat, lon, alt
+# Coordinates need doubles; float32 is plenty for everything else
+DOUBLE_FIELDS = vs.LAT | vs.LON | vs.HOME_LAT | vs.HOME_LON
+KEYFRAME = 1
+DELTA = 0
+MISSION = 2
+KEYFRAME_INTERVAL_US = 10000000
+DELTA_INTERVAL_US = 100000
+# The map track keeps one point per second; long flights are thinned further when drawn
+TRACK_INTERVAL_US = 1000000
+MAX_TRACK_POINTS = 2000
+
+MSG_ID_MISSION_CURRENT = 42
+MSG_ID_HOME_POSITION = 242
+MSG_ID_MISSION_ITEM = 39
+MSG_ID_MISSION_COUNT = 44
+MSG_ID_MISSION_ITEM_INT = 73
+MISSION_MESSAGES = (MSG_ID_MISSION_COUNT, MSG_ID_MISSION_ITEM, MSG_ID_MISSION_ITEM_INT)
+
+
+_value_structs = {}
+
+
+def values_struct(mask):
+    """Struct packing the values of the fields in mask, in FIELDS order"""
+    packer = _value_structs.get(mask)
+    if packer is None:
+        codes = ''.join('d' if DOUBLE_FIELDS & (1 << i) else 'f' for i in range(len(FIELDS)) if mask & (1 << i))
+        packer = _value_structs[mask] = struct.Struct('<' + codes)
+    return packer
+
+
+def encode_fields(state, mask):
+    values = []
+    for i, name in enumerate(FIELDS):
+        if mask & (1 << i):
+            value = getattr(state, name)
+            if i == MODE_INDEX:
+                value = mode_code(value)
+            values.append(math.nan if value is None else value)
+    return values
+
+
+def decode_fields(state, mask, values):
+    """Set the fields in mask from encoded values; flying_type follows mode"""
+    values = iter(values)
+    for i, name in enumerate(FIELDS):
+        if not mask & (1 << i):
+            continue
+        value = next(values)
+        if math.isnan(value):
+            value = None
+        elif i == MODE_INDEX:
+            code = int(value)
+            value = COPTER_MODES.get(code, f"UNKNOWN_{code}")
+            state.flying_type = flying_type_for_mode(value)
+        elif i in INT_FIELDS and value.is_integer():
+            value = int(value)
+        setattr(state, name, value)
+
+
+class TimelineBuilder:
+    """Turns a log's frames, in order, into keyframe and delta entries.
+
+    Frames are decoded into one VehicleState per system ID the way the
+    monitoring thread would decode them. Every DELTA_INTERVAL_US the
+    fields that changed are written as a DELTA; every KEYFRAME_INTERVAL_US
+    every known field of every vehicle is written as a KEYFRAME, so any
+    point in the log is one keyframe plus at most a hundred deltas away.
+    flying_type travels with mode and distance is worked out live, so
+    neither is stored. Each mission download in the log is written as a
+    MISSION entry once all its items are in, with total_waypoints set
+    to match.
+    """
+    STORED = vs.ALL & ~(vs.FLYING_TYPE | vs.DISTANCE)
+
+    def __init__(self):
+        self.decoder = FastPathDecoder()
+        self.mav = mavutil.mavlink.MAVLink(None)
+        self.states = {}
+        # sysid -> (item count, {seq: (lat, lon, alt)}) while a download is under way in the log
+        self.missions = {}
+        self.out = bytearray()
+        self.last_stamp = 0
+        self.next_delta = 0
+        self.next_keyframe = 0
+
+    def add(self, stamp, msgid, frame):
+        if stamp >= self.next_delta:
+            self.write_deltas()
+            self.next_delta = stamp + DELTA_INTERVAL_US
+        if stamp >= self.next_keyframe:
+            self.write_keyframes()
+            self.next_keyframe = stamp + KEYFRAME_INTERVAL_US
+        self.last_stamp = max(self.last_stamp, stamp)
+        if msgid == MSG_ID_MISSION_CURRENT or msgid == MSG_ID_HOME_POSITION:
+            self.add_message(msgid, frame)
+        elif msgid in MISSION_MESSAGES:
+            self.add_mission_message(msgid, frame)
+        elif self.decoder.handles(msgid):
+            state = self.state_for(frame_source(frame)[0])
+            self.decoder.decode(msgid, frame, state, 0.0)
+
+    def add_message(self, msgid, frame):
+        try:
+            msg = self.mav.decode(bytearray(frame))
+        except Exception:
+            return
+        state = self.state_for(msg.get_srcSystem())
+        if msgid == MSG_ID_MISSION_CURRENT:
+            state.waypoint = msg.seq
+            state.mark(vs.WAYPOINT, 0.0)
+        else:
+            state.home_lat = msg.latitude / 1e7
+            state.home_lon = msg.longitude / 1e7
+            state.home_alt = msg.altitude / 1000.0
+            state.mark(vs.HOME, 0.0)
+
+    def add_mission_message(self, msgid, frame):
+        try:
+            msg = self.mav.decode(bytearray(frame))
+        except Exception:
+            return
+        if getattr(msg, 'mission_type', 0):
+            # Fences and rally points aren't the mission
+            return
+        sysid = msg.get_srcSystem()
+        if msgid == MSG_ID_MISSION_COUNT:
+            self.missions[sysid] = (msg.count, {})
+            if not msg.count:
+                self.write_mission(sysid, [])
+            return
+        pending = self.missions.get(sysid)
+        if pending is None or msg.seq >= pending[0]:
+            return
+        count, points = pending
+        scale = 1e7 if msgid == MSG_ID_MISSION_ITEM_INT else 1
+        points[msg.seq] = (msg.x / scale, msg.y / scale, msg.z)
+        if len(points) == count:
+            del self.missions[sysid]
+            self.write_mission(sysid, [points[seq] for seq in range(count)])
+
+    def write_mission(self, sysid, points):
+        self.out += ENTRY.pack(self.last_stamp, MISSION, sysid, len(points))
+        for point in points:
+            self.out += MISSION_POINT.pack(*point)
+        state = self.state_for(sysid)
+        state.total_waypoints = len(points)
+        state.mark(vs.TOTAL_WAYPOINTS, 0.0)
+
+    def state_for(self, sysid):
+        state = self.states.get(sysid)
+        if state is None:
+            state = self.states[sysid] = VehicleState()
+        return state
+
+    def write(self, kind, sysid, state, mask):
+        mask &= self.STORED
+        if mask:
+            values = encode_fields(state, mask)
+            self.out += ENTRY.pack(self.last_stamp, kind, sysid, mask)
+            self.out += values_struct(mask).pack(*values)
+
+    def write_deltas(self):
+        for sysid, state in self.states.items():
+            if state.dirty:
+                self.write(DELTA, sysid, state, state.dirty)
+                state.dirty = 0
+
+    def write_keyframes(self):
+        for sysid, state in self.states.items():
+            self.write(KEYFRAME, sysid, state, state.known())
+            state.dirty = 0
+
+    def finish(self):
+        self.write_deltas()
+        return bytes(self.out)
+
+
+class StateTimeline:
+    """Recorded vehicle state at any point of a log, from TimelineBuilder entries.
+
+    state_at() bisects to the last keyframe at or before a stamp and
+    applies the deltas after it, so a seek anywhere in a multi-hour log
+    costs the same. Each vehicle's map track is sampled once per
+    TRACK_INTERVAL_US while the entries are scanned, and its recorded
+    missions are kept for mission_at().
+    """
+
+    def __init__(self, body):
+        self.body = body
+        self.stamps = array('Q')
+        self.offsets = array('Q')
+        # Stamp and entry number of the first entry of each keyframe
+        self.keyframe_stamps = []
+        self.keyframe_entries = []
+        # sysid -> (array of stamps, list of [lat, lon])
+        self.tracks = {}
+        # sysid -> (array of stamps, list of waypoint lists)
+        self.missions = {}
+        pos = 0
+        previous = (0, DELTA)
+        while pos < len(body):
+            stamp, kind, sysid, mask = ENTRY.unpack_from(body, pos)
+            if kind == MISSION:
+                pos = self.add_mission(sysid, stamp, mask, pos + ENTRY.size)
+                continue
+            if kind == KEYFRAME and previous != (stamp, KEYFRAME):
+                self.keyframe_stamps.append(stamp)
+                self.keyframe_entries.append(len(self.stamps))
+            previous = (stamp, kind)
+            self.stamps.append(stamp)
+            self.offsets.append(pos)
+            if mask & vs.POSITION == vs.POSITION:
+                # lat and lon are the first two fields, so the first two values
+                self.add_track_point(sysid, stamp, struct.unpack_from('<2d', body, pos + ENTRY.size))
+            pos += ENTRY.size + values_struct(mask).size
+
+    def add_mission(self, sysid, stamp, count, pos):
+        """Read a MISSION entry's points at pos; returns the offset after them"""
+        waypoints = []
+        for _ in range(count):
+            lat, lon, alt = MISSION_POINT.unpack_from(self.body, pos)
+            waypoints.append({'lat': lat, 'lng': lon, 'alt': alt})
+            pos += MISSION_POINT.size
+        mission = self.missions.get(sysid)
+        if mission is None:
+            mission = self.missions[sysid] = (array('Q'), [])
+        mission[0].append(stamp)
+        mission[1].append(waypoints)
+        return pos
+
+    def mission_at(self, sysid, stamp):
+        """Waypoints of the last mission sysid sent before stamp, None if none was recorded yet"""
+        mission = self.missions.get(sysid)
+        if mission is None:
+            return None
+        i = bisect.bisect_right(mission[0], stamp) - 1
+        return mission[1][i] if i >= 0 else None
+
+    def add_track_point(self, sysid, stamp, point):
+        track = self.tracks.get(sysid)
+        if track is None:
+            track = self.tracks[sysid] = (array('Q'), [])
+        stamps, points = track
+        if (not stamps or stamp - stamps[-1] >= TRACK_INTERVAL_US) and not math.isnan(point[0]):
+            stamps.append(stamp)
+            points.append(list(point))
+
+    def state_at(self, stamp):
+        """{sysid: VehicleState} as recorded at stamp"""
+        i = bisect.bisect_right(self.keyframe_stamps, stamp) - 1
+        # Before the first keyframe the deltas from the start add up to the state
+        first = self.keyframe_entries[i] if i >= 0 else 0
+        states = {}
+        body = self.body
+        for entry in range(first, len(self.stamps)):
+            if self.stamps[entry] > stamp:
+                break
+            pos = self.offsets[entry]
+            _, kind, sysid, mask = ENTRY.unpack_from(body, pos)
+            state = states.get(sysid)
+            if state is None or kind == KEYFRAME:
+                state = states[sysid] = VehicleState()
+            decode_fields(state, mask, values_struct(mask).unpack_from(body, pos + ENTRY.size))
+        return states
+
+    def track_until(self, sysid, stamp):
+        """[lat, lon] points flown by sysid up to stamp, thinned to MAX_TRACK_POINTS"""
+        track = self.tracks.get(sysid)
+        if track is None:
+            return []
+        stamps, points = track
+        end = bisect.bisect_right(stamps, stamp)
+        step = end // MAX_TRACK_POINTS + 1
+        return points[:end:step]
@@ -0,0 +1,242 @@
+import errno
+import select
+import socket
+import time
+from pymavlink import mavutil
+from mavframe import MAVLinkFrameParser
+from supervisor import Backoff
+
+# Longest a reopen may block the reading thread connecting a TCP socket
+CONNECT_TIMEOUT = 1.0
+
+
+class LinkReader:
+    """Batched input stage for a pymavlink connection.
+
+    Instead of pymavlink's one-message-per-recv path, each read_batch()
+    waits once for the link to become readable, drains everything the
+    socket or serial port has buffered straight into the parser's ring
+    with recv_into/readinto, and returns every complete frame at once.
+    UDP datagrams are received one by one into a scratch buffer and copied
+    into the ring until the socket would block.
+
+    When a TCP or serial transport fails, read_batch() closes it, raises
+    ConnectionError once, and from then on reopens it in place on a
+    jittered exponential backoff, returning no frames until it is back.
+    reconnects counts successful reopens.
+    """
+
+    def __init__(self, connection, parser=None, backoff=None):
+        self.connection = connection
+        self.parser = parser if parser is not None else MAVLinkFrameParser()
+        self.bytes_read = 0
+        self.reads = 0
+        self.backoff = backoff if backoff is not None else Backoff(maximum=2.0)
+        # Why the transport is closed, None while it is up
+        self.down = None
+        self.retry_at = 0.0
+        self.reconnects = 0
+        # UDP receive buffer, one datagram at a time, made on first use
+        self.scratch = None
+
+    def set_tap(self, tap):
+        """Hand every raw frame to tap(frame) as well, or stop with None"""
+        self.parser.tap = tap
+
+    def read_batch(self, timeout):
+        """Wait up to timeout seconds for data and return a list of (msgid, frame)"""
+        if self.down is not None and not self.retry(timeout):
+            return []
+        try:
+            return self.read_transport(timeout)
+        except OSError as e:
+            if not self.can_reopen():
+                raise
+            self.fail(str(e) or type(e).__name__)
+            raise ConnectionError(f"Link lost: {self.down}") from e
+
+    def read_transport(self, timeout):
+        conn = self.connection
+        if isinstance(conn, mavutil.mavtcp):
+            count = self.read_stream_socket(conn, timeout)
+        elif isinstance(conn, mavutil.mavudp):
+            return self.read_datagrams(conn, timeout)
+        elif isinstance(conn, mavutil.mavserial):
+            count = self.read_serial(conn, timeout)
+        else:
+            # tcpin, files, websockets...: fall back to the connection's own recv
+            data = conn.recv(4096) if conn.select(timeout) else None
+            if not data:
+                return []
+            self.check_first_byte(data)
+            self.bytes_read += len(data)
+            self.reads += 1
+            return self.parser.feed(data)
+        if not count:
+            return []
+        return self.parser.frames()
+
+    def check_first_byte(self, data):
+        conn = self.connection
+        if conn.first_byte:
+            conn.auto_mavlink_version(data)
+
+    def wait_readable(self, timeout):
+        conn = self.connection
+        if conn.fd is None:
+            return conn.select(timeout)
+        try:
+            readable, _, _ = select.select([conn.fd], [], [], timeout)
+        except (OSError, ValueError):
+            return False
+        return bool(readable)
+
+    def read_stream_socket(self, conn, timeout):
+        """Drain a non-blocking TCP socket into the ring"""
+        if conn.port is None:
+            conn.reconnect()
+            return 0
+        if not self.wait_readable(timeout):
+            return 0
+        total = 0
+        while True:
+            space = self.parser.writable()
+            try:
+                count = conn.port.recv_into(space)
+            except socket.error as e:
+                if e.errno in [errno.EAGAIN, errno.EWOULDBLOCK]:
+                    break
+                if e.errno in [errno.ECONNRESET, errno.EPIPE]:
+                    conn.handle_disconnect()
+                raise
+            if count == 0:
+                if total == 0:
+                    conn.handle_eof()
+                    if not conn.autoreconnect:
+                        # pymavlink leaves the dead socket open, and it stays readable forever
+                        raise ConnectionError("EOF on TCP socket")
+                break
+            self.commit(space, count)
+            total += count
+            # A full ring is parsed before more is read: asking for space now
+            # would throw its unparsed frames away as garbage
+            if count < len(space) or self.parser.end == len(self.parser.ring):
+                break
+        return total
+
+    def read_datagrams(self, conn, timeout):
+        """Pull every queued UDP datagram through the ring and return its frames"""
+        parser = self.parser
+        # A datagram carries whole frames, so bytes left from the last batch
+        # are a truncated frame that the next datagram can never complete
+        parser.drop_pending()
+        if not self.wait_readable(timeout):
+            return []
+        if self.scratch is None:
+            self.scratch = bytearray(mavutil.UDP_MAX_PACKET_LEN)
+        scratch = self.scratch
+        frames = []
+        while True:
+            try:
+                count, address = conn.port.recvfrom_into(scratch)
+            except socket.error as e:
+                if e.errno in [errno.EAGAIN, errno.EWOULDBLOCK, errno.ECONNREFUSED]:
+                    break
+                raise
+            # Same bookkeeping as mavudp.recv so replies reach the sender
+            if conn.udp_server:
+                conn.clients.add(address)
+                conn.clients_last_alive[address] = time.time()
+            elif conn.broadcast:
+                conn.last_address = address
+            if parser.end + count > len(parser.ring):
+                # Ring full: take its frames out before the space is reused
+                frames += [(msgid, bytes(frame)) for msgid, frame in parser.frames()]
+                parser.drop_pending()
+            space = parser.writable()
+            space[:count] = scratch[:count]
+            self.commit(space, count)
+        return frames + parser.frames()
+
+    def read_serial(self, conn, timeout):
+        """Read everything the serial driver has buffered in one call"""
+        port = conn.port
+        waiting = port.in_waiting
+        if not waiting:
+            if not self.wait_readable(timeout):
+                return 0
+            waiting = port.in_waiting
+            if not waiting:
+                return 0
+        space = self.parser.writable()
+        count = port.readinto(space[:waiting]) or 0
+        if count:
+            self.commit(space, count)
+        return count
+
+    def can_reopen(self):
+        return isinstance(self.connection, (mavutil.mavtcp, mavutil.mavserial))
+
+    def fail(self, reason):
+        """Close a failed or silent transport; read_batch() reopens it with backoff"""
+        if self.down is not None or not self.can_reopen():
+            return
+        self.down = reason
+        conn = self.connection
+        try:
+            if isinstance(conn, mavutil.mavtcp):
+                if conn.port is not None:
+                    conn.port.close()
+                    conn.port = None
+            else:
+                conn.port.close()
+        except OSError:
+            pass
+        self.retry_at = time.monotonic() + self.backoff.next_delay()
+
+    def retry(self, timeout):
+        """Reopen the transport once its backoff delay has passed; True when it is up again"""
+        wait = self.retry_at - time.monotonic()
+        if wait > 0:
+            time.sleep(min(timeout, wait))
+            if time.monotonic() < self.retry_at:
+                return False
+        try:
+            self.reopen()
+        except OSError:
+            self.retry_at = time.monotonic() + self.backoff.next_delay()
+            return False
+        self.down = None
+        self.backoff.reset()
+        self.reconnects += 1
+        return True
+
+    def reopen(self):
+        conn = self.connection
+        if isinstance(conn, mavutil.mavtcp):
+            # One bounded attempt; mavtcp.do_connect would retry and sleep here
+            sock = socket.create_connection(conn.destination_addr, timeout=CONNECT_TIMEOUT)
+            sock.setblocking(False)
+            sock.setsockopt(socket.SOL_TCP, socket.TCP_NODELAY, 1)
+            conn.port = sock
+            conn.fd = sock.fileno()
+        elif not conn.reset():
+            raise OSError(f"Could not reopen {conn.device}")
+
+    def track_sequences(self, enabled):
+        """Count received and lost frames per sender from their sequence numbers, or stop"""
+        self.parser.seq_links = {} if enabled else None
+
+    def parse_counters(self):
+        """The parser's counters; see MAVLinkFrameParser.counters()"""
+        return self.parser.counters()
+
+    def backlog(self):
+        """Bytes read but not yet parsed into complete frames"""
+        return self.parser.end - self.parser.start
+
+    def commit(self, space, count):
+        self.check_first_byte(space[:count])
+        self.parser.commit(count)
+        self.bytes_read += count
+        self.reads += 1
@@ -0,0 +1,38 @@
+import time
+from vehiclestate import VehicleState
+
+
+class Vehicle:
+    """Everything the monitoring thread tracks for one system ID on the link.
+
+    Telemetry, mission, home position and heartbeat health are kept per
+    vehicle, so vehicles sharing a radio network never write into each
+    other's state. link is an AsyncLink that only addresses this vehicle
+    and only hears its replies.
+    """
+
+    def __init__(self, sysid, link):
+        self.sysid = sysid
+        self.compid = 1
+        self.link = link
+        self.state = VehicleState()
+        self.waypoints = []
+        self.current_waypoint = 0
+        self.total_waypoints = 0
+        # Waypoints of the recorded mission a replay last applied; False before the first
+        self.replay_mission = False
+        self.home_emitted = False
+        # Set by the first HEARTBEAT from its autopilot; until then the
+        # vehicle is only a sysid that telemetry arrived from
+        self.identified = False
+        self.healthy = True
+        # Monotonic time any frame from this vehicle last arrived
+        self.last_heard = time.monotonic()
+
+    def identify(self, compid):
+        self.identified = True
+        self.compid = compid
+        self.link.target = (self.sysid, compid)
+
+    def label(self, text):
+        return f"Vehicle {self.sysid}: {text}"
@@ -0,0 +1,107 @@
+FIELDS = (
+    'lat', 'lon', 'alt', 'relative_alt',
+    'roll', 'pitch', 'yaw',
+    'heading', 'groundspeed', 'airspeed', 'climb', 'throttle',
+    'battery', 'mode', 'flying_type',
+    'waypoint', 'total_waypoints',
+    'home_lat', 'home_lon', 'home_alt', 'distance',
+)
+
+# One dirty bit per field, in FIELDS order
+LAT             = 1 << 0
+LON             = 1 << 1
+ALT             = 1 << 2
+RELATIVE_ALT    = 1 << 3
+ROLL            = 1 << 4
+PITCH           = 1 << 5
+YAW             = 1 << 6
+HEADING         = 1 << 7
+GROUNDSPEED     = 1 << 8
+AIRSPEED        = 1 << 9
+CLIMB           = 1 << 10
+THROTTLE        = 1 << 11
+BATTERY         = 1 << 12
+MODE            = 1 << 13
+FLYING_TYPE     = 1 << 14
+WAYPOINT        = 1 << 15
+TOTAL_WAYPOINTS = 1 << 16
+HOME_LAT        = 1 << 17
+HOME_LON        = 1 << 18
+HOME_ALT        = 1 << 19
+DISTANCE        = 1 << 20
+
+# Groups of fields that always change together
+POSITION = LAT | LON
+ATTITUDE = ROLL | PITCH | YAW
+HOME     = HOME_LAT | HOME_LON | HOME_ALT
+ALL      = (1 << len(FIELDS)) - 1
+
+
+class VehicleState:
+    """Latest known value of every telemetry field plus a dirty bitmask.
+
+    The monitoring thread keeps one instance, writes fields in place and
+    marks them dirty. frame() hands consumers a copy and clears the mask,
+    so each frame says exactly which fields changed since the last one.
+    """
+    __slots__ = FIELDS + ('dirty', 'stamps')
+
+    def __init__(self):
+        for name in FIELDS:
+            setattr(self, name, None)
+        self.dirty = 0
+        # Monotonic time each field was last updated, indexed like FIELDS
+        self.stamps = [0.0] * len(FIELDS)
+
+    def mark(self, mask, stamp):
+        """Flag the fields in mask as changed at monotonic time stamp"""
+        self.dirty |= mask
+        stamps = self.stamps
+        while mask:
+            low = mask & -mask
+            stamps[low.bit_length() - 1] = stamp
+            mask ^= low
+
+    def stamp(self, bit):
+        """Monotonic time the field for a single bit was last updated"""
+        return self.stamps[bit.bit_length() - 1]
+
+    def oldest_stamp(self, mask):
+        """Earliest update time among the fields in mask, 0.0 if none were ever set"""
+        oldest = 0.0
+        stamps = self.stamps
+        while mask:
+            low = mask & -mask
+            stamp = stamps[low.bit_length() - 1]
+            if stamp and (not oldest or stamp < oldest):
+                oldest = stamp
+            mask ^= low
+        return oldest
+
+    def known(self):
+        """Mask of every field that has a value"""
+        mask = 0
+        for i, name in enumerate(FIELDS):
+            if getattr(self, name) is not None:
+                mask |= 1 << i
+        return mask
+
+    def copy(self):
+        state = VehicleState.__new__(VehicleState)
+        for name in FIELDS:
+            setattr(state, name, getattr(self, name))
+        state.dirty = self.dirty
+        state.stamps = list(self.stamps)
+        return state
+
+    def frame(self):
+        """Return a copy for consumers and start a new dirty interval"""
+        state = self.copy()
+        self.dirty = 0
+        return state
+
+    def to_dict(self, mask=None):
+        """Field values as a dict, limited to the fields in mask if given"""
+        if mask is None:
+            mask = ALL
+        return {name: getattr(self, name) for i, name in enumerate(FIELDS) if mask & (1 << i)}